@@ -2,6 +2,8 @@
 Admin del app Validador.
 """
 
+import json
+
 from django.contrib import admin
 from django.contrib import messages
 from django.utils.html import format_html
@@ -12,12 +14,14 @@ from .models import (
     CategoriaConcepto,
     ConceptoCliente,
     ConceptoLibro,
+    EsquemaLibro,
     ConceptoNovedades,
     EmpleadoCierre,
     EmpleadoLibro,
     RegistroLibro,
     RegistroNovedades,
     Discrepancia,
+    HuellaComparacion,
     Incidencia,
     ComentarioIncidencia,
     ResumenConsolidado,
@@ -220,6 +224,14 @@ class ConceptoLibroAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(EsquemaLibro)
+class EsquemaLibroAdmin(admin.ModelAdmin):
+    list_display = ['cliente', 'erp', 'firma', 'fecha_actualizacion']
+    list_filter = ['erp']
+    raw_id_fields = ['cliente', 'erp']
+    readonly_fields = ['firma', 'conceptos_ids', 'fecha_actualizacion']
+
+
 @admin.register(ConceptoNovedades)
 class ConceptoNovedadesAdmin(admin.ModelAdmin):
     list_display = ['header_original_truncado', 'concepto_libro', 'cliente', 'erp', 'activo', 'fecha_mapeo']
@@ -291,6 +303,13 @@ class DiscrepanciaAdmin(BulkDeleteMixin, admin.ModelAdmin):
     raw_id_fields = ['cierre', 'concepto']
 
 
+@admin.register(HuellaComparacion)
+class HuellaComparacionAdmin(admin.ModelAdmin):
+    list_display = ['cierre', 'fecha', 'firma']
+    raw_id_fields = ['cierre']
+    readonly_fields = ['versiones', 'huellas', 'fecha', 'firma', 'resultado']
+
+
 @admin.register(Incidencia)
 class IncidenciaAdmin(admin.ModelAdmin):
     list_display = [
@@ -321,8 +340,17 @@ class ResumenCategoriaAdmin(admin.ModelAdmin):
     list_filter = ['categoria', 'cierre__cliente']
 
 
+class DatosRawDetalleMixin:
+    """Muestra la fila original del movimiento (se descomprime al abrir el detalle)."""
+    
+    @admin.display(description='Datos raw')
+    def datos_raw_detalle(self, obj):
+        datos = json.dumps(obj.obtener_datos_raw(), indent=2, ensure_ascii=False, default=str)
+        return format_html('<pre>{}</pre>', datos)
+
+
 @admin.register(MovimientoMes)
-class MovimientoMesAdmin(BulkDeleteMixin, admin.ModelAdmin):
+class MovimientoMesAdmin(DatosRawDetalleMixin, BulkDeleteMixin, admin.ModelAdmin):
     list_display = [
         'rut', 'nombre', 'tipo', 'fecha_inicio', 'fecha_fin', 
         'dias', 'tipo_contrato', 'hoja_origen', 'cierre_info'
@@ -330,7 +358,7 @@ class MovimientoMesAdmin(BulkDeleteMixin, admin.ModelAdmin):
     list_filter = [ClienteListFilter, CierreListFilter, 'tipo', 'hoja_origen']
     search_fields = ['rut', 'nombre', 'causal']
     raw_id_fields = ['cierre', 'archivo_erp']
-    readonly_fields = ['datos_raw']
+    readonly_fields = ['datos_raw_detalle']
     list_per_page = 50
     list_select_related = ['cierre', 'cierre__cliente', 'archivo_erp']
     
@@ -348,7 +376,7 @@ class MovimientoMesAdmin(BulkDeleteMixin, admin.ModelAdmin):
             'fields': ('tipo_contrato', 'causal', 'tipo_licencia')
         }),
         ('Datos Raw', {
-            'fields': ('datos_raw',),
+            'fields': ('datos_raw_detalle',),
             'classes': ('collapse',)
         }),
     )
@@ -359,7 +387,7 @@ class MovimientoMesAdmin(BulkDeleteMixin, admin.ModelAdmin):
 
 
 @admin.register(MovimientoAnalista)
-class MovimientoAnalistaAdmin(BulkDeleteMixin, admin.ModelAdmin):
+class MovimientoAnalistaAdmin(DatosRawDetalleMixin, BulkDeleteMixin, admin.ModelAdmin):
     list_display = [
         'rut', 'nombre', 'tipo', 'origen', 'fecha_inicio', 'fecha_fin',
         'dias', 'causal_truncada', 'cierre_info'
@@ -367,7 +395,7 @@ class MovimientoAnalistaAdmin(BulkDeleteMixin, admin.ModelAdmin):
     list_filter = [ClienteListFilter, CierreListFilter, 'tipo', 'origen']
     search_fields = ['rut', 'nombre', 'causal']
     raw_id_fields = ['cierre', 'archivo_analista']
-    readonly_fields = ['datos_raw']
+    readonly_fields = ['datos_raw_detalle']
     list_per_page = 50
     list_select_related = ['cierre', 'cierre__cliente', 'archivo_analista']
     
@@ -385,7 +413,7 @@ class MovimientoAnalistaAdmin(BulkDeleteMixin, admin.ModelAdmin):
             'fields': ('causal', 'tipo_ausentismo')
         }),
         ('Datos Raw', {
-            'fields': ('datos_raw',),
+            'fields': ('datos_raw_detalle',),
             'classes': ('collapse',)
         }),
     )
@@ -8,6 +8,8 @@ Incluye:
 - Categorías de conceptos
 """
 
+from decimal import Decimal
+
 from django.db import models
 
 
@@ -502,6 +504,12 @@ class TipoArchivoAnalista:
 # Umbral de variación para detectar incidencias (30%)
 UMBRAL_VARIACION_INCIDENCIA = 30.0
 
+# Diferencia máxima aceptada entre Libro y Novedades (redondeos, $1)
+TOLERANCIA_MONTO_NOVEDADES = Decimal('1')
+
+# Categorías de ConceptoLibro que no se comparan contra Novedades
+CATEGORIAS_NO_COMPARABLES = ('info_adicional', 'ignorar')
+
 # Categorías que SE EXCLUYEN de la detección de incidencias
 CATEGORIAS_EXCLUIDAS_INCIDENCIAS = [
     'informativos',
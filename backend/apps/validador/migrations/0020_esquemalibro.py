@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_add_auditlog_model'),
+        ('validador', '0019_alter_movimientoanalista_tipo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsquemaLibro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firma', models.CharField(help_text='SHA-256 de la lista ordenada de HeaderInfo', max_length=64)),
+                ('conceptos_ids', models.JSONField(default=list, help_text='IDs de ConceptoLibro (monetarios) del esquema, en orden')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='esquemas_libro', to='core.cliente')),
+                ('erp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='esquemas_libro', to='core.erp')),
+            ],
+            options={
+                'verbose_name': 'Esquema Libro',
+                'verbose_name_plural': 'Esquemas Libro',
+                'unique_together': {('cliente', 'erp')},
+            },
+        ),
+    ]
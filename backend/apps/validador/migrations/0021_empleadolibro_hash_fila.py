@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0020_esquemalibro'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleadolibro',
+            name='hash_fila',
+            field=models.CharField(blank=True, help_text='SHA-256 del contenido del empleado en el libro', max_length=64),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0021_empleadolibro_hash_fila'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoanalista',
+            name='fila_raw',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movimientomes',
+            name='fila_raw',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DatosRawArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contenido', models.BinaryField(help_text='Filas en formato columnar comprimido (zlib)')),
+                ('total_filas', models.PositiveIntegerField(default=0)),
+                ('tamano_original', models.PositiveIntegerField(default=0, help_text='Bytes del JSON antes de comprimir')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('archivo_analista', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='datos_raw', to='validador.archivoanalista')),
+                ('archivo_erp', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='datos_raw', to='validador.archivoerp')),
+            ],
+            options={
+                'verbose_name': 'Datos Raw de Archivo',
+                'verbose_name_plural': 'Datos Raw de Archivos',
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('archivo_analista__isnull', True), ('archivo_erp__isnull', False)), models.Q(('archivo_analista__isnull', False), ('archivo_erp__isnull', True)), _connector='OR'), name='datos_raw_un_solo_archivo')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0022_datos_raw_archivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HuellaComparacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versiones', models.JSONField(default=dict, help_text='Por fuente: versión de los archivos vigentes (id, versión, fecha de procesamiento)')),
+                ('huellas', models.JSONField(default=dict, help_text='Por fuente: {rut: hash del contenido}')),
+                ('fecha', models.DateTimeField(help_text='Inicio de la comparación que generó esta huella')),
+                ('cierre', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='huella_comparacion', to='validador.cierre')),
+            ],
+            options={
+                'verbose_name': 'Huella Comparación',
+                'verbose_name_plural': 'Huellas Comparación',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0023_huellacomparacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='discrepancia',
+            name='tipo',
+            field=models.CharField(choices=[('monto_diferente', 'Monto Diferente'), ('falta_en_erp', 'Falta en ERP'), ('falta_en_cliente', 'Falta en Archivos Cliente'), ('fechas_diferentes', 'Fechas Diferentes')], max_length=30),
+        ),
+    ]
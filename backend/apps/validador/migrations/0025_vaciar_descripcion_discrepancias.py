@@ -0,0 +1,29 @@
+"""
+Elimina las descripciones pre-generadas de las discrepancias.
+
+Desde ahora la descripción se genera al serializar (Discrepancia.describir()).
+"""
+from django.db import migrations
+
+
+def vaciar_descripciones(apps, schema_editor):
+    Discrepancia = apps.get_model('validador', 'Discrepancia')
+    Discrepancia.objects.exclude(descripcion='').update(descripcion='')
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0024_discrepancia_fechas_diferentes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            vaciar_descripciones,
+            reverse_code=noop,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('validador', '0025_vaciar_descripcion_discrepancias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='huellacomparacion',
+            name='firma',
+            field=models.CharField(blank=True, help_text='Hash de versiones de archivos, mapeo de conceptos y tolerancia', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='huellacomparacion',
+            name='resultado',
+            field=models.JSONField(blank=True, default=dict, help_text='Resultado de la comparación (libro y movimientos), reutilizado si la firma no cambia'),
+        ),
+    ]
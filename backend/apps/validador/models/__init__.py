@@ -5,13 +5,13 @@ Modelos del app Validador.
 from .cierre import Cierre
 from .archivo import ArchivoERP, ArchivoAnalista
 from .concepto import CategoriaConcepto, ConceptoCliente
-from .concepto_libro import ConceptoLibro
+from .concepto_libro import ConceptoLibro, EsquemaLibro
 from .concepto_novedades import ConceptoNovedades
 from .empleado import EmpleadoCierre, RegistroConcepto, RegistroNovedades
 from .empleado_libro import EmpleadoLibro
 from .registro_libro import RegistroLibro
-from .movimiento import MovimientoMes, MovimientoAnalista
-from .discrepancia import Discrepancia
+from .movimiento import MovimientoMes, MovimientoAnalista, DatosRawArchivo
+from .discrepancia import Discrepancia, HuellaComparacion
 from .incidencia import Incidencia, ComentarioIncidencia
 from .consolidacion import ResumenConsolidado, ResumenCategoria, ResumenMovimientos
 
@@ -27,6 +27,7 @@ __all__ = [
     'CategoriaConcepto',
     'ConceptoCliente',
     'ConceptoLibro',
+    'EsquemaLibro',
     'ConceptoNovedades',
     
     # Empleados y Registros
@@ -39,9 +40,11 @@ __all__ = [
     # Movimientos
     'MovimientoMes',
     'MovimientoAnalista',
+    'DatosRawArchivo',
     
     # Discrepancias
     'Discrepancia',
+    'HuellaComparacion',
     
     # Incidencias
     'Incidencia',
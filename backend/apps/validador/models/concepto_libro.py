@@ -135,3 +135,48 @@ class ConceptoLibro(models.Model):
     def clasificado(self):
         """Retorna True si el concepto ya está clasificado."""
         return bool(self.categoria)
+
+
+class EsquemaLibro(models.Model):
+    """
+    Firma del esquema de headers del libro por cliente y ERP.
+    
+    La mayoría de los clientes envía cada mes un libro con exactamente la
+    misma fila de headers. Guardando un hash ordenado de los HeaderInfo,
+    extraer_headers puede saltarse la sincronización de ConceptoLibro cuando
+    el archivo nuevo tiene la misma firma.
+    """
+    
+    cliente = models.ForeignKey(
+        'core.Cliente',
+        on_delete=models.CASCADE,
+        related_name='esquemas_libro'
+    )
+    
+    erp = models.ForeignKey(
+        'core.ERP',
+        on_delete=models.CASCADE,
+        related_name='esquemas_libro'
+    )
+    
+    firma = models.CharField(
+        max_length=64,
+        help_text='SHA-256 de la lista ordenada de HeaderInfo'
+    )
+    
+    conceptos_ids = models.JSONField(
+        default=list,
+        help_text='IDs de ConceptoLibro (monetarios) del esquema, en orden'
+    )
+    
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Esquema Libro'
+        verbose_name_plural = 'Esquemas Libro'
+        unique_together = [
+            ['cliente', 'erp'],
+        ]
+    
+    def __str__(self):
+        return f"{self.cliente_id}/{self.erp_id}: {self.firma[:12]}"
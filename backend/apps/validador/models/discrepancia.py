@@ -5,6 +5,29 @@ Resultado de comparar ERP vs Archivos del Analista.
 
 from django.db import models
 
+from .movimiento import MovimientoMes
+
+# Plantillas de Discrepancia.describir() por tipo. `d` es la discrepancia,
+# `erp` su detalle_movimiento y `cliente` las fechas informadas por el cliente
+PLANTILLAS_DESCRIPCION = {
+    'monto_diferente': (
+        "'{d.nombre_item}' (Libro) vs '{d.nombre_item_novedades}' (Novedades): "
+        "${d.monto_erp:,.0f} vs ${d.monto_cliente:,.0f} = ${d.diferencia:,.0f}"
+    ),
+    'falta_en_cliente': (
+        "El movimiento '{movimiento}' para {d.rut_empleado} ({d.nombre_empleado}) "
+        "está en ERP pero no fue reportado por el cliente"
+    ),
+    'falta_en_erp': (
+        "El movimiento '{movimiento}' para {d.rut_empleado} ({d.nombre_empleado}) "
+        "fue reportado por el cliente pero no está en ERP"
+    ),
+    'fechas_diferentes': (
+        "El movimiento '{movimiento}' para {d.rut_empleado} ({d.nombre_empleado}) "
+        "tiene fechas distintas: ERP {erp[fecha_inicio]} → {erp[fecha_fin]}, cliente {cliente}"
+    ),
+}
+
 
 class Discrepancia(models.Model):
     """
@@ -15,6 +38,7 @@ class Discrepancia(models.Model):
         ('monto_diferente', 'Monto Diferente'),
         ('falta_en_erp', 'Falta en ERP'),
         ('falta_en_cliente', 'Falta en Archivos Cliente'),
+        ('fechas_diferentes', 'Fechas Diferentes'),
     ]
     
     ORIGEN_CHOICES = [
@@ -88,7 +112,8 @@ class Discrepancia(models.Model):
     resuelta = models.BooleanField(default=False)
     fecha_resolucion = models.DateTimeField(null=True, blank=True)
     
-    # Descripción legible
+    # Descripción legible: vacía en las discrepancias detectadas, se genera
+    # al mostrarla (ver describir())
     descripcion = models.TextField(blank=True)
     
     # Timestamps
@@ -113,18 +138,94 @@ class Discrepancia(models.Model):
         if self.monto_erp is not None and self.monto_cliente is not None:
             self.diferencia = self.monto_erp - self.monto_cliente
     
-    def generar_descripcion(self):
-        """Genera una descripción legible de la discrepancia."""
-        if self.tipo == 'monto_diferente':
-            self.descripcion = (
-                f"'{self.nombre_item}' (Libro) vs '{self.nombre_item_novedades}' (Novedades): "
-                f"${self.monto_erp:,.0f} vs ${self.monto_cliente:,.0f} = ${self.diferencia:,.0f}"
-            )
-        elif self.tipo == 'falta_en_erp':
-            self.descripcion = (
-                f"El movimiento '{self.tipo_movimiento}' existe en archivos del cliente pero no en ERP."
-            )
-        elif self.tipo == 'falta_en_cliente':
-            self.descripcion = (
-                f"El movimiento '{self.tipo_movimiento}' existe en ERP pero no en archivos del cliente."
-            )
+    @classmethod
+    def plantilla_descripcion(cls, tipo: str, tipo_movimiento: str = '') -> str:
+        """
+        Plantilla str.format de la descripción para un tipo de discrepancia.
+        
+        El nombre legible del movimiento queda resuelto en la plantilla, por
+        lo que se puede cachear por (tipo, tipo_movimiento) al serializar
+        muchas discrepancias (ver DiscrepanciaSerializer).
+        """
+        plantilla = PLANTILLAS_DESCRIPCION.get(tipo, '')
+        if '{movimiento}' in plantilla:
+            movimiento = dict(MovimientoMes.TIPO_CHOICES).get(tipo_movimiento, tipo_movimiento)
+            plantilla = plantilla.replace('{movimiento}', movimiento.replace('{', '{{').replace('}', '}}'))
+        return plantilla
+    
+    def describir(self, plantilla: str = None) -> str:
+        """
+        Descripción legible de la discrepancia.
+        
+        No se guarda al detectar la discrepancia: se genera al mostrarla a
+        partir de los campos estructurados. Si `descripcion` tiene texto
+        (registros antiguos), se devuelve ese.
+        
+        Args:
+            plantilla: Resultado de plantilla_descripcion() ya calculado
+        """
+        if self.descripcion:
+            return self.descripcion
+        if plantilla is None:
+            plantilla = self.plantilla_descripcion(self.tipo, self.tipo_movimiento)
+        
+        detalle = self.detalle_movimiento or {}
+        return plantilla.format(
+            d=self,
+            erp=detalle,
+            cliente=', '.join(
+                f"{c.get('fecha_inicio')} → {c.get('fecha_fin')}" for c in detalle.get('cliente', [])
+            ),
+        )
+
+
+class HuellaComparacion(models.Model):
+    """
+    Estado de los datos de entrada en la última comparación del cierre.
+    
+    Guarda, por fuente (libro, novedades, movimientos), la versión de los
+    archivos usados y un hash del contenido de cada RUT. La siguiente
+    comparación recalcula solo los RUTs cuyo hash cambió y los conceptos
+    cuyo mapeo/clasificación se modificó después de `fecha`
+    (ver ComparacionIncremental). Si la firma de los datos de entrada no
+    cambió, se devuelve `resultado` sin volver a comparar.
+    """
+    
+    cierre = models.OneToOneField(
+        'Cierre',
+        on_delete=models.CASCADE,
+        related_name='huella_comparacion'
+    )
+    
+    versiones = models.JSONField(
+        default=dict,
+        help_text='Por fuente: versión de los archivos vigentes (id, versión, fecha de procesamiento)'
+    )
+    
+    huellas = models.JSONField(
+        default=dict,
+        help_text='Por fuente: {rut: hash del contenido}'
+    )
+    
+    fecha = models.DateTimeField(
+        help_text='Inicio de la comparación que generó esta huella'
+    )
+    
+    firma = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text='Hash de versiones de archivos, mapeo de conceptos y tolerancia'
+    )
+    
+    resultado = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Resultado de la comparación (libro y movimientos), reutilizado si la firma no cambia'
+    )
+    
+    class Meta:
+        verbose_name = 'Huella Comparación'
+        verbose_name_plural = 'Huellas Comparación'
+    
+    def __str__(self):
+        return f"Cierre {self.cierre_id}: {self.fecha:%Y-%m-%d %H:%M}"
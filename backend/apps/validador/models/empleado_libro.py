@@ -47,6 +47,13 @@ class EmpleadoLibro(models.Model):
         help_text='Nombre completo del empleado (si viene en el libro)'
     )
     
+    # Hash de la fila (nombre + conceptos/montos) para reprocesos incrementales
+    hash_fila = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text='SHA-256 del contenido del empleado en el libro'
+    )
+    
     # Timestamps
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
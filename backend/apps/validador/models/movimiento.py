@@ -3,8 +3,12 @@ Modelos de Movimientos del Mes para el Validador de Nómina.
 Maneja altas, bajas, licencias, vacaciones, etc.
 """
 
+from functools import cached_property
+
 from django.db import models
 
+from apps.validador.utils.compresion_raw import descomprimir_bloques, fila_raw
+
 
 class MovimientoMes(models.Model):
     """
@@ -62,7 +66,9 @@ class MovimientoMes(models.Model):
     # Para licencias/permisos: subtipo
     tipo_licencia = models.CharField(max_length=100, blank=True)
     
-    # Datos crudos del Excel
+    # Datos crudos del Excel: fila en DatosRawArchivo (ver obtener_datos_raw).
+    # datos_raw solo tiene contenido en movimientos anteriores al archivo comprimido.
+    fila_raw = models.PositiveIntegerField(null=True, blank=True)
     datos_raw = models.JSONField(default=dict, blank=True)
     
     # De qué hoja del Excel vino
@@ -79,6 +85,12 @@ class MovimientoMes(models.Model):
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.rut} ({self.nombre})"
+    
+    def obtener_datos_raw(self) -> dict:
+        """Fila original del Excel, descomprimida bajo demanda."""
+        if self.fila_raw is None or not self.archivo_erp_id:
+            return self.datos_raw
+        return DatosRawArchivo.fila(self.fila_raw, archivo_erp_id=self.archivo_erp_id)
 
 
 class MovimientoAnalista(models.Model):
@@ -138,7 +150,9 @@ class MovimientoAnalista(models.Model):
         help_text="Tipo de ausentismo original del archivo"
     )
     
-    # Datos crudos
+    # Datos crudos: fila en DatosRawArchivo (ver obtener_datos_raw).
+    # datos_raw solo tiene contenido en movimientos anteriores al archivo comprimido.
+    fila_raw = models.PositiveIntegerField(null=True, blank=True)
     datos_raw = models.JSONField(default=dict, blank=True)
     
     class Meta:
@@ -152,3 +166,102 @@ class MovimientoAnalista(models.Model):
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.rut} ({self.origen})"
+    
+    def obtener_datos_raw(self) -> dict:
+        """Fila original del archivo, descomprimida bajo demanda."""
+        if self.fila_raw is None or not self.archivo_analista_id:
+            return self.datos_raw
+        return DatosRawArchivo.fila(self.fila_raw, archivo_analista_id=self.archivo_analista_id)
+
+
+class DatosRawArchivo(models.Model):
+    """
+    Filas originales de un archivo de movimientos, comprimidas.
+    
+    Un registro por archivo subido (ERP o Analista) con todas sus filas en
+    formato columnar + zlib (ver utils/compresion_raw.py). Cada movimiento
+    guarda solo su posición (fila_raw) y la fila se reconstruye al pedir
+    el detalle, sin inflar las tablas que recorre la comparación.
+    """
+    
+    archivo_erp = models.OneToOneField(
+        'ArchivoERP',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='datos_raw'
+    )
+    archivo_analista = models.OneToOneField(
+        'ArchivoAnalista',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='datos_raw'
+    )
+    
+    contenido = models.BinaryField(help_text="Filas en formato columnar comprimido (zlib)")
+    total_filas = models.PositiveIntegerField(default=0)
+    tamano_original = models.PositiveIntegerField(
+        default=0,
+        help_text="Bytes del JSON antes de comprimir"
+    )
+    
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Datos Raw de Archivo'
+        verbose_name_plural = 'Datos Raw de Archivos'
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(archivo_erp__isnull=False, archivo_analista__isnull=True) |
+                    models.Q(archivo_erp__isnull=True, archivo_analista__isnull=False)
+                ),
+                name='datos_raw_un_solo_archivo',
+            ),
+        ]
+    
+    def __str__(self):
+        archivo = self.archivo_erp_id or self.archivo_analista_id
+        return f"Datos raw archivo {archivo} ({self.total_filas} filas)"
+    
+    @classmethod
+    def guardar(cls, archivo, contenido: bytes, tamano_original: int, total_filas: int):
+        """
+        Crea o reemplaza las filas raw de un archivo.
+        
+        Args:
+            archivo: ArchivoERP o ArchivoAnalista
+            contenido, tamano_original: Resultado de comprimir_filas/comprimir_dataframe
+            total_filas: Cantidad de filas comprimidas
+        """
+        campo = 'archivo_erp' if archivo._meta.model_name == 'archivoerp' else 'archivo_analista'
+        datos, _ = cls.objects.update_or_create(
+            **{campo: archivo},
+            defaults={
+                'contenido': contenido,
+                'tamano_original': tamano_original,
+                'total_filas': total_filas,
+            },
+        )
+        return datos
+    
+    @classmethod
+    def fila(cls, posicion: int, **archivo) -> dict:
+        """
+        Fila `posicion` del archivo indicado (archivo_erp_id=... o archivo_analista_id=...).
+        
+        Returns:
+            Dict columna -> valor, o {} si el archivo no tiene datos raw
+        """
+        datos = cls.objects.filter(**archivo).first()
+        return datos.obtener_fila(posicion) if datos else {}
+    
+    @cached_property
+    def bloques(self) -> list:
+        """Bloques columnares descomprimidos (se calculan una vez por instancia)."""
+        return descomprimir_bloques(self.contenido)
+    
+    def obtener_fila(self, posicion: int) -> dict:
+        """Reconstruye una fila como dict columna -> valor."""
+        return fila_raw(self.bloques, posicion)
@@ -6,6 +6,7 @@ el Libro de Remuneraciones y extraen los datos de empleados.
 """
 
 from .base import BaseLibroParser, ProcessResult
+from .libro_compacto import LibroCompacto
 from .factory import ParserFactory
 
 # Importar parsers para auto-registro
@@ -14,5 +15,6 @@ from . import talana  # noqa: F401
 __all__ = [
     'BaseLibroParser',
     'ProcessResult',
+    'LibroCompacto',
     'ParserFactory',
 ]
@@ -5,11 +5,16 @@ Define la interfaz que todos los parsers de libro deben implementar.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Sequence
 from dataclasses import dataclass
 import pandas as pd
 import logging
 
+from ..utils.cache_parseo import leer_excel_cacheado
+from ..utils.lectura_headers import leer_fila_headers, nombres_columnas_pandas
+from ..utils.normalizacion import normalizar_monto, normalizar_rut
+from ..utils.normalizacion_vectorial import normalizar_montos, normalizar_ruts
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +42,8 @@ class ProcessResult:
     
     Attributes:
         success: True si el procesamiento fue exitoso
-        data: Lista de diccionarios con datos de empleados
+        data: Empleados parseados: lista de dicts o LibroCompacto (que se
+            indexa e itera como la misma lista de dicts)
         headers: Lista de headers encontrados en el archivo
         headers_info: Lista de HeaderInfo con detalles de cada header
         error: Mensaje de error si hubo falla
@@ -45,7 +51,7 @@ class ProcessResult:
         metadata: Información adicional del procesamiento
     """
     success: bool
-    data: Optional[List[Dict]] = None
+    data: Optional[Sequence[Dict]] = None
     headers: Optional[List[str]] = None
     headers_info: Optional[List[HeaderInfo]] = None
     error: Optional[str] = None
@@ -65,7 +71,7 @@ class ProcessResult:
             self.metadata = {}
     
     @classmethod
-    def ok(cls, data: List[Dict], headers: List[str], headers_info: List['HeaderInfo'] = None, 
+    def ok(cls, data: Sequence[Dict], headers: List[str], headers_info: List['HeaderInfo'] = None, 
            warnings: List[str] = None, metadata: Dict = None):
         """Crea un resultado exitoso."""
         return cls(
@@ -91,6 +97,15 @@ class BaseLibroParser(ABC):
     e implementando los métodos abstractos.
     """
     
+    # Versión de la lectura de archivos (invalida el caché de parseo)
+    version_lectura = '1'
+    
+    # Hoja del libro (nombre o índice; si el nombre no existe se usa la primera)
+    hoja_libro = 0
+    
+    # True si el parser implementa procesar_libro_streaming
+    soporta_streaming = False
+    
     def __init__(self):
         self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
     
@@ -229,16 +244,7 @@ class BaseLibroParser(ABC):
         Returns:
             RUT normalizado: '12345678-9'
         """
-        if pd.isna(rut) or rut is None:
-            return ''
-        
-        rut = str(rut).upper().replace('.', '').replace(' ', '').strip()
-        
-        # Si no tiene guión, agregarlo antes del dígito verificador
-        if '-' not in rut and len(rut) > 1:
-            rut = f"{rut[:-1]}-{rut[-1]}"
-        
-        return rut
+        return normalizar_rut(rut)
     
     def normalizar_monto(self, monto) -> float:
         """
@@ -250,32 +256,31 @@ class BaseLibroParser(ABC):
         Returns:
             Monto como float
         """
-        if pd.isna(monto) or monto is None:
-            return 0.0
+        return normalizar_monto(monto)
+    
+    def normalizar_ruts(self, serie: pd.Series) -> pd.Series:
+        """
+        Versión columnar de normalizar_rut: normaliza una columna completa.
         
-        if isinstance(monto, (int, float)):
-            return float(monto)
+        Args:
+            serie: Columna con RUTs en cualquier formato
         
-        # Limpiar formato chileno
-        monto_str = str(monto).replace('$', '').replace(' ', '').strip()
+        Returns:
+            Serie de strings con RUT normalizado ('' si es nulo)
+        """
+        return normalizar_ruts(serie)
+    
+    def normalizar_montos(self, serie: pd.Series) -> pd.Series:
+        """
+        Versión columnar de normalizar_monto: convierte una columna completa a float.
         
-        # Detectar formato
-        if '.' in monto_str and ',' in monto_str:
-            # 1.234,56 -> 1234.56
-            monto_str = monto_str.replace('.', '').replace(',', '.')
-        elif '.' in monto_str:
-            # Si hay múltiples puntos son separadores de miles
-            if monto_str.count('.') > 1:
-                monto_str = monto_str.replace('.', '')
-        elif ',' in monto_str:
-            # 1234,56 -> 1234.56
-            monto_str = monto_str.replace(',', '.')
+        Args:
+            serie: Columna con montos en cualquier formato
         
-        try:
-            return float(monto_str)
-        except ValueError:
-            self.logger.warning(f"No se pudo convertir monto: {monto}")
-            return 0.0
+        Returns:
+            Serie float64 (0.0 para nulos o valores no convertibles)
+        """
+        return normalizar_montos(serie)
     
     def limpiar_texto(self, texto) -> str:
         """Limpia y normaliza texto."""
@@ -283,24 +288,138 @@ class BaseLibroParser(ABC):
             return ''
         return str(texto).strip()
     
-    def leer_excel(self, archivo, sheet_name=0, header=None, skiprows=None) -> pd.DataFrame:
+    def leer_excel(self, archivo, sheet_name=0, header=None, skiprows=None, **kwargs) -> pd.DataFrame:
         """
         Lee un archivo Excel con configuración estándar.
         
+        Las lecturas desde un path pasan por el caché de parseo por contenido,
+        por lo que procesar_libro y sus reintentos decodifican el workbook
+        una sola vez.
+        
         Args:
             archivo: Archivo Excel
             sheet_name: Nombre o índice de la hoja
             header: Fila del encabezado (None para no usar header)
             skiprows: Filas a saltar
+            **kwargs: Argumentos adicionales para read_excel (ej: nrows)
         
         Returns:
             DataFrame
         """
-        return pd.read_excel(
+        return leer_excel_cacheado(
             archivo,
+            version=f'{self.__class__.__name__}:{self.version_lectura}',
             sheet_name=sheet_name,
             header=header,
-            skiprows=skiprows
+            skiprows=skiprows,
+            **kwargs
+        )
+    
+    def iterar_filas_excel(self, archivo, sheet_name=0) -> Iterator[tuple]:
+        """
+        Itera las filas de un Excel (.xlsx) sin cargar el libro completo.
+        
+        Usa openpyxl en modo read_only: las filas se leen del XML a medida
+        que se consumen, por lo que la memoria no depende del tamaño del archivo.
+        
+        Args:
+            archivo: Archivo Excel (path o file-like)
+            sheet_name: Nombre o índice de la hoja. Si es un nombre que no
+                existe se usa la primera hoja (mismo criterio que extraer_headers).
+        
+        Yields:
+            Tuplas con los valores de cada fila (None para celdas vacías)
+        """
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            ws = self._resolver_hoja(wb, sheet_name)
+            for fila in ws.iter_rows(values_only=True):
+                yield fila
+        finally:
+            wb.close()
+    
+    def _resolver_hoja(self, wb, sheet_name):
+        """Obtiene la hoja por nombre o índice; si no existe usa la primera."""
+        if isinstance(sheet_name, int):
+            return wb.worksheets[sheet_name]
+        if sheet_name in wb.sheetnames:
+            return wb[sheet_name]
+        self.logger.info(f"Hoja '{sheet_name}' no encontrada, usando primera hoja")
+        return wb.worksheets[0]
+    
+    def estimar_filas_excel(self, archivo, sheet_name=0) -> int:
+        """
+        Estima la cantidad de filas de una hoja sin recorrerla.
+        
+        Usa la dimensión declarada en el XML de la hoja, por lo que puede
+        incluir filas vacías al final. Sirve para reportar progreso.
+        
+        Returns:
+            Cantidad de filas declaradas o 0 si no se puede determinar
+        """
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            return self._resolver_hoja(wb, sheet_name).max_row or 0
+        finally:
+            wb.close()
+    
+    def nombres_columnas_pandas(self, headers) -> List[str]:
+        """
+        Replica los nombres de columna que pandas asigna al leer un header.
+        
+        Permite que el modo streaming use las mismas llaves que
+        ConceptoLibro.header_pandas: celdas vacías -> 'Unnamed: N' y
+        duplicados -> 'X', 'X.1', 'X.2'...
+        """
+        return nombres_columnas_pandas(headers)
+    
+    def extraer_headers_info(self, archivo) -> List[HeaderInfo]:
+        """
+        Extrae los headers leyendo solo la fila de headers.
+        
+        No decodifica la hoja completa: en .xlsx recorre con openpyxl
+        read_only hasta fila_headers y en CSV lee solo esa línea.
+        
+        Args:
+            archivo: Path del archivo del libro
+        
+        Returns:
+            Lista de HeaderInfo (mismo resultado que analizar_headers_duplicados
+            sobre las columnas de pd.read_excel)
+        """
+        columnas = leer_fila_headers(
+            archivo,
+            fila_headers=self.fila_headers,
+            sheet_name=self.hoja_libro
+        )
+        return self.analizar_headers_duplicados(columnas)
+    
+    def procesar_libro_streaming(
+        self, 
+        archivo, 
+        conceptos_clasificados: Dict, 
+        tamano_chunk: int = 1000
+    ) -> Iterator[ProcessResult]:
+        """
+        Procesa el libro en bloques acotados de empleados.
+        
+        Solo para parsers con soporta_streaming = True, que lo sobrescriben.
+        Cada ProcessResult emitido contiene solo los empleados del bloque.
+        
+        Args:
+            archivo: Archivo Excel (path)
+            conceptos_clasificados: Dict de {header_pandas: ConceptoLibro}
+            tamano_chunk: Cantidad máxima de filas por bloque
+        
+        Yields:
+            ProcessResult por bloque; por defecto un único resultado fallido
+        """
+        yield ProcessResult.fail(
+            f"El parser '{self.erp_codigo}' no soporta procesamiento streaming"
         )
     
     def analizar_headers_duplicados(self, df_columns) -> List[HeaderInfo]:
@@ -0,0 +1,211 @@
+"""
+Representación compacta del libro parseado.
+
+Un libro de miles de empleados como lista de dicts genera cientos de miles
+de objetos Python pequeños (un dict por empleado y otro por cada registro).
+LibroCompacto guarda lo mismo en arreglos NumPy paralelos:
+
+- ruts / nombres: un elemento por empleado (strings internados)
+- empleado_idx / concepto_idx / montos: un elemento por registro, agrupados
+  por empleado y en orden de columna
+
+Para el código que espera la estructura anterior, indexar o iterar entrega
+el dict de cada empleado construido en el momento:
+
+    {'rut': '12345678-9', 'nombre': 'Juan Pérez', 'registros': [
+        {'concepto': ConceptoLibro, 'monto': 1500000.0}, ...
+    ]}
+"""
+
+import sys
+from collections.abc import Sequence
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+
+class LibroCompacto(Sequence):
+    """
+    Empleados y registros del libro en arreglos paralelos.
+    
+    Attributes:
+        ruts: Arreglo (object) de RUTs normalizados, uno por empleado
+        nombres: Arreglo (object) de nombres, uno por empleado
+        conceptos: Lista de ConceptoLibro referenciados por concepto_idx
+        empleado_idx: Posición del empleado de cada registro (no decreciente)
+        concepto_idx: Posición en `conceptos` de cada registro
+        montos: Monto (float64) de cada registro
+    """
+    
+    def __init__(
+        self,
+        ruts,
+        nombres,
+        conceptos: List,
+        empleado_idx,
+        concepto_idx,
+        montos,
+    ):
+        self.ruts = np.asarray(ruts, dtype=object)
+        self.nombres = np.asarray(nombres, dtype=object)
+        self.conceptos = list(conceptos)
+        self.empleado_idx = np.asarray(empleado_idx, dtype=np.int64)
+        self.concepto_idx = np.asarray(concepto_idx, dtype=np.int64)
+        self.montos = np.asarray(montos, dtype=np.float64)
+        self._limites = None
+    
+    @classmethod
+    def vacio(cls) -> 'LibroCompacto':
+        """Libro sin empleados."""
+        return cls([], [], [], [], [], [])
+    
+    @classmethod
+    def desde_dicts(cls, empleados: List[Dict]) -> 'LibroCompacto':
+        """
+        Convierte la estructura de lista de dicts (parsers por filas).
+        """
+        if isinstance(empleados, cls):
+            return empleados
+        
+        conceptos = []
+        posicion_concepto = {}
+        empleado_idx = []
+        concepto_idx = []
+        montos = []
+        
+        for i, emp in enumerate(empleados):
+            for reg in emp.get('registros', []):
+                concepto = reg['concepto']
+                pos = posicion_concepto.get(id(concepto))
+                if pos is None:
+                    pos = posicion_concepto[id(concepto)] = len(conceptos)
+                    conceptos.append(concepto)
+                empleado_idx.append(i)
+                concepto_idx.append(pos)
+                montos.append(float(reg['monto']))
+        
+        return cls(
+            [sys.intern(emp['rut']) for emp in empleados],
+            [sys.intern(emp.get('nombre', '')) for emp in empleados],
+            conceptos,
+            empleado_idx,
+            concepto_idx,
+            montos,
+        )
+    
+    @classmethod
+    def concatenar(cls, partes: List['LibroCompacto'], conceptos: List = None) -> 'LibroCompacto':
+        """
+        Une libros parciales (bloques de filas consecutivos) en el orden dado.
+        
+        Args:
+            partes: Libros parciales, en el orden de las filas del archivo
+            conceptos: Lista global de conceptos. Si se entrega, el `.posicion`
+                de los conceptos de cada parte indica su índice en esta lista
+                (ver ConceptoRef en el parseo paralelo); si no, las partes
+                deben compartir la misma lista de conceptos.
+        
+        Returns:
+            LibroCompacto con los empleados de todas las partes
+        """
+        if not partes:
+            return cls.vacio()
+        
+        empleado_idx = []
+        concepto_idx = []
+        desplazamiento = 0
+        
+        for parte in partes:
+            empleado_idx.append(parte.empleado_idx + desplazamiento)
+            if conceptos is not None:
+                remapeo = np.array([c.posicion for c in parte.conceptos], dtype=np.int64)
+                concepto_idx.append(remapeo[parte.concepto_idx] if len(remapeo) else parte.concepto_idx)
+            else:
+                concepto_idx.append(parte.concepto_idx)
+            desplazamiento += len(parte)
+        
+        return cls(
+            np.concatenate([p.ruts for p in partes]),
+            np.concatenate([p.nombres for p in partes]),
+            conceptos if conceptos is not None else partes[0].conceptos,
+            np.concatenate(empleado_idx),
+            np.concatenate(concepto_idx),
+            np.concatenate([p.montos for p in partes]),
+        )
+    
+    @property
+    def n_registros(self) -> int:
+        """Cantidad total de registros (conceptos con monto > 0)."""
+        return len(self.montos)
+    
+    @property
+    def limites(self) -> np.ndarray:
+        """Offsets de los registros de cada empleado (largo len(self) + 1)."""
+        if self._limites is None:
+            self._limites = np.searchsorted(
+                self.empleado_idx, np.arange(len(self.ruts) + 1)
+            )
+        return self._limites
+    
+    @property
+    def concepto_ids(self) -> np.ndarray:
+        """ID de ConceptoLibro de cada registro."""
+        ids = np.array([c.id for c in self.conceptos], dtype=np.int64)
+        return ids[self.concepto_idx]
+    
+    def registros(self, posicion: int) -> slice:
+        """Slice de los arreglos por registro que corresponde a un empleado."""
+        return slice(int(self.limites[posicion]), int(self.limites[posicion + 1]))
+    
+    def __len__(self) -> int:
+        return len(self.ruts)
+    
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return self._sub_libro(posicion)
+        
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError('LibroCompacto: índice fuera de rango')
+        
+        rango = self.registros(posicion)
+        return {
+            'rut': self.ruts[posicion],
+            'nombre': self.nombres[posicion],
+            'registros': [
+                {'concepto': self.conceptos[c], 'monto': m}
+                for c, m in zip(
+                    self.concepto_idx[rango].tolist(), self.montos[rango].tolist()
+                )
+            ],
+        }
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for posicion in range(len(self)):
+            yield self[posicion]
+    
+    def __eq__(self, other):
+        if isinstance(other, (LibroCompacto, list)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"<LibroCompacto: {len(self)} empleados, {self.n_registros} registros>"
+    
+    def _sub_libro(self, rango: slice) -> 'LibroCompacto':
+        """Bloque contiguo de empleados (comparte los arreglos por registro)."""
+        inicio, fin, paso = rango.indices(len(self))
+        if paso != 1:
+            raise ValueError('LibroCompacto solo admite slices contiguos')
+        fin = max(fin, inicio)
+        
+        desde, hasta = int(self.limites[inicio]), int(self.limites[fin])
+        return LibroCompacto(
+            self.ruts[inicio:fin],
+            self.nombres[inicio:fin],
+            self.conceptos,
+            self.empleado_idx[desde:hasta] - inicio,
+            self.concepto_idx[desde:hasta],
+            self.montos[desde:hasta],
+        )
@@ -4,12 +4,26 @@ Parser para Libro de Remuneraciones de Talana.
 Talana exporta el libro en formato Excel con una estructura específica.
 """
 
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import Iterator, List, Dict
 from decimal import Decimal
+import billiard
+from django.conf import settings
 
 from .base import BaseLibroParser, ProcessResult
 from .factory import ParserFactory
+from .libro_compacto import LibroCompacto
+from ..utils.normalizacion_vectorial import validar_dv_ruts
+
+
+# Referencia liviana a un ConceptoLibro para los procesos del parseo paralelo:
+# posición en la lista global de conceptos y la categoría (lo único que lee el parser)
+ConceptoRef = namedtuple('ConceptoRef', ['posicion', 'categoria'])
 
 
 @ParserFactory.register('talana')
@@ -59,6 +73,24 @@ class TalanaLibroParser(BaseLibroParser):
         7: 'info_adicional',  # Días Trabajados
     }
     
+    # Hoja donde Talana exporta el libro
+    hoja_libro = 'Libro'
+    
+    # procesar_libro_streaming lee la hoja por bloques (openpyxl read_only)
+    soporta_streaming = True
+    
+    # Columnas que se concatenan para formar el nombre (Nombre, Apellido Paterno, Materno)
+    COLUMNAS_NOMBRE = (4, 5, 6)
+    
+    # Categorías válidas para guardar en RegistroLibro
+    CATEGORIAS_REGISTRO = frozenset({
+        'haberes_imponibles',
+        'haberes_no_imponibles',
+        'descuentos_legales',
+        'otros_descuentos',
+        'aportes_patronales',
+    })
+    
     @property
     def erp_codigo(self) -> str:
         return 'talana'
@@ -121,16 +153,8 @@ class TalanaLibroParser(BaseLibroParser):
             Lista de headers (strings) - incluye duplicados con sufijos
         """
         try:
-            # Intentar leer hoja "Libro"
-            try:
-                df = self.leer_excel(archivo, sheet_name='Libro', header=self.fila_headers)
-            except ValueError:
-                # Si no existe, usar primera hoja
-                df = self.leer_excel(archivo, sheet_name=0, header=self.fila_headers)
-                self.logger.info("Hoja 'Libro' no encontrada, usando primera hoja")
-            
-            # Analizar headers y detectar duplicados
-            headers_info = self.analizar_headers_duplicados(df.columns)
+            # Solo la fila de headers de la hoja "Libro" (o la primera hoja)
+            headers_info = self.extraer_headers_info(archivo)
             
             # Retornar lista de nombres de pandas (con .1, .2 si hay duplicados)
             headers = [info.pandas_name for info in headers_info]
@@ -184,15 +208,6 @@ class TalanaLibroParser(BaseLibroParser):
             'registros': [],  # Lista de {concepto, monto}
         }
         
-        # Categorías válidas para guardar en RegistroLibro
-        CATEGORIAS_VALIDAS = {
-            'haberes_imponibles',
-            'haberes_no_imponibles',
-            'descuentos_legales',
-            'otros_descuentos',
-            'aportes_patronales',
-        }
-        
         # Usar columnas ordenadas si se proporcionan, sino usar keys del dict
         columnas = columnas_ordenadas if columnas_ordenadas else list(fila.keys())
         
@@ -214,7 +229,7 @@ class TalanaLibroParser(BaseLibroParser):
         
         # Extraer nombre concatenando columnas 4, 5, 6 (Nombre, Apellido Paterno, Materno)
         nombre_partes = []
-        for idx in [4, 5, 6]:
+        for idx in self.COLUMNAS_NOMBRE:
             if len(columnas) > idx:
                 col = columnas[idx]
                 valor = fila.get(col)
@@ -239,7 +254,7 @@ class TalanaLibroParser(BaseLibroParser):
             categoria = concepto.categoria
             
             # Solo procesar categorías válidas (no info_adicional, no ignorar)
-            if categoria not in CATEGORIAS_VALIDAS:
+            if categoria not in self.CATEGORIAS_REGISTRO:
                 continue
             
             # Normalizar monto
@@ -254,13 +269,25 @@ class TalanaLibroParser(BaseLibroParser):
         
         return empleado_data
     
-    def procesar_libro(self, archivo, conceptos_clasificados: Dict) -> ProcessResult:
+    def procesar_libro(
+        self, 
+        archivo, 
+        conceptos_clasificados: Dict, 
+        columnar: bool = True
+    ) -> ProcessResult:
         """
         Procesa el libro completo de Talana.
         
+        Por defecto usa el modo columnar (_parsear_columnar), que normaliza
+        columnas completas en vez de recorrer fila por fila. Libros sobre
+        LIBRO_PARALELO_MIN_FILAS se reparten en bloques de filas entre
+        LIBRO_PARALELO_PROCESOS procesos. El modo por filas (parsear_empleado
+        sobre iterrows) se mantiene como referencia.
+        
         Args:
             archivo: Archivo Excel del libro
             conceptos_clasificados: Dict de {pandas_name: ConceptoLibro}
+            columnar: True para el motor columnar, False para el recorrido por filas
         
         Returns:
             ProcessResult con lista de empleados procesados
@@ -282,35 +309,23 @@ class TalanaLibroParser(BaseLibroParser):
             # Analizar headers para detectar duplicados
             headers_info = self.analizar_headers_duplicados(df.columns)
             
-            self.logger.info(f"Procesando {len(df)} filas del libro Talana")
-            
-            # Procesar cada fila
-            empleados = []
-            errores_fila = []
+            procesos = self.procesos_paralelos(len(df)) if columnar else 1
             
-            # Obtener orden real de columnas del DataFrame
-            columnas_ordenadas = list(df.columns)
+            self.logger.info(
+                f"Procesando {len(df)} filas del libro Talana "
+                f"(modo {'columnar' if columnar else 'filas'}, {procesos} procesos)"
+            )
             
-            for idx, row in df.iterrows():
-                try:
-                    # Convertir fila a dict
-                    fila_dict = row.to_dict()
-                    
-                    # Parsear empleado (pasamos columnas ordenadas)
-                    empleado_data = self.parsear_empleado(
-                        fila_dict, conceptos_clasificados, headers_info, columnas_ordenadas
-                    )
-                    
-                    # Validar que tenga RUT (obligatorio)
-                    if not empleado_data['rut']:
-                        errores_fila.append(f"Fila {idx + 2}: No se encontró RUT")
-                        continue
-                    
-                    empleados.append(empleado_data)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error procesando fila {idx + 2}: {e}")
-                    errores_fila.append(f"Fila {idx + 2}: {str(e)}")
+            if procesos > 1:
+                empleados, errores_fila = self._parsear_columnar_paralelo(
+                    df, conceptos_clasificados, procesos
+                )
+            elif columnar:
+                empleados, errores_fila = self._parsear_columnar(df, conceptos_clasificados)
+            else:
+                empleados, errores_fila = self._parsear_filas(
+                    df, conceptos_clasificados, headers_info
+                )
             
             # Agregar errores como warnings
             if errores_fila:
@@ -325,11 +340,18 @@ class TalanaLibroParser(BaseLibroParser):
                     "Verifique que los headers estén clasificados correctamente."
                 )
             
+            # RUTs con dígito verificador inválido: se procesan igual, solo se informan
+            ruts = empleados.ruts if isinstance(empleados, LibroCompacto) else [e['rut'] for e in empleados]
+            dv_invalidos = int((~validar_dv_ruts(pd.Series(ruts, dtype=object))).sum())
+            if dv_invalidos:
+                warnings.append(f"{dv_invalidos} RUTs con dígito verificador inválido")
+            
             metadata = {
                 'total_filas': len(df),
                 'empleados_procesados': len(empleados),
                 'errores': len(errores_fila),
                 'headers_duplicados': len([h for h in headers_info if h.is_duplicate]),
+                'ruts_dv_invalido': dv_invalidos,
             }
             
             self.logger.info(
@@ -350,3 +372,302 @@ class TalanaLibroParser(BaseLibroParser):
         except Exception as e:
             self.logger.error(f"Error procesando libro Talana: {e}")
             return ProcessResult.fail(f"Error al procesar archivo: {str(e)}")
+    
+    def procesar_libro_streaming(
+        self, 
+        archivo, 
+        conceptos_clasificados: Dict, 
+        tamano_chunk: int = 1000
+    ) -> Iterator[ProcessResult]:
+        """
+        Procesa el libro de Talana en bloques sin cargarlo completo en memoria.
+        
+        Lee las filas con openpyxl en modo read_only y cada `tamano_chunk`
+        filas arma un DataFrame pequeño que se parsea con _parsear_columnar.
+        El índice de cada bloque es el mismo que asignaría pandas, por lo que
+        los mensajes "Fila N" coinciden con procesar_libro.
+        
+        Args:
+            archivo: Path del archivo Excel (.xlsx)
+            conceptos_clasificados: Dict de {pandas_name: ConceptoLibro}
+            tamano_chunk: Cantidad máxima de filas por bloque
+        
+        Yields:
+            ProcessResult por bloque. metadata incluye 'total_filas',
+            'empleados_procesados', 'errores' y 'fila_hasta' del bloque.
+        """
+        filas = self.iterar_filas_excel(archivo, sheet_name=self.hoja_libro)
+        
+        # Saltar hasta la fila de headers
+        headers_raw = None
+        for i, fila in enumerate(filas):
+            if i == self.fila_headers:
+                headers_raw = fila
+                break
+        
+        if headers_raw is None:
+            yield ProcessResult.fail("El archivo no contiene headers")
+            return
+        
+        columnas = self.nombres_columnas_pandas(headers_raw)
+        headers_info = self.analizar_headers_duplicados(columnas)
+        n_columnas = len(columnas)
+        
+        buffer = []
+        indices = []
+        
+        def _procesar_buffer():
+            df = pd.DataFrame(buffer, columns=columnas, index=indices)
+            empleados, errores_fila = self._parsear_columnar(df, conceptos_clasificados)
+            return ProcessResult.ok(
+                data=empleados,
+                headers=columnas,
+                headers_info=headers_info,
+                warnings=errores_fila,
+                metadata={
+                    'total_filas': len(df),
+                    'empleados_procesados': len(empleados),
+                    'errores': len(errores_fila),
+                    'fila_hasta': indices[-1] + 2,
+                }
+            )
+        
+        # Índice estilo pandas: fila de datos 0 = fila Excel fila_headers + 2
+        for idx, fila in enumerate(filas):
+            # Las filas completamente vacías se descartan (igual que pandas)
+            if all(valor is None or valor == '' for valor in fila):
+                continue
+            
+            if len(fila) < n_columnas:
+                fila = fila + (None,) * (n_columnas - len(fila))
+            buffer.append(fila[:n_columnas])
+            indices.append(idx)
+            
+            if len(buffer) >= tamano_chunk:
+                yield _procesar_buffer()
+                buffer, indices = [], []
+        
+        if buffer:
+            yield _procesar_buffer()
+    
+    def procesos_paralelos(self, n_filas: int) -> int:
+        """
+        Cantidad de procesos para parsear un libro de n_filas.
+        
+        LIBRO_PARALELO_PROCESOS=1 desactiva el parseo paralelo y 0 usa
+        todos los núcleos. Libros bajo LIBRO_PARALELO_MIN_FILAS siempre se
+        parsean en el proceso actual (el costo de enviar los bloques no se
+        compensa).
+        """
+        procesos = settings.LIBRO_PARALELO_PROCESOS or os.cpu_count() or 1
+        if procesos <= 1 or n_filas < settings.LIBRO_PARALELO_MIN_FILAS:
+            return 1
+        return procesos
+    
+    def _parsear_columnar_paralelo(
+        self, 
+        df: pd.DataFrame, 
+        conceptos_clasificados: Dict,
+        procesos: int
+    ) -> tuple[LibroCompacto, list[str]]:
+        """
+        Parsea el libro en bloques de filas con un pool de procesos.
+        
+        Cada proceso recibe solo las columnas que usa _parsear_columnar
+        (datos del empleado + conceptos que se registran) y ConceptoRef en
+        vez de instancias de ConceptoLibro. Los bloques se unen en el orden
+        de las filas, así que el resultado es idéntico al del modo secuencial.
+        
+        Los procesos son de billiard (el multiprocessing de Celery): los
+        workers prefork son procesos daemon y multiprocessing /
+        ProcessPoolExecutor no les permite crear hijos. Cada proceso parsea
+        un bloque y lo devuelve por un Pipe. Si un proceso no se puede crear
+        o termina sin resultado se parsea en el proceso actual.
+        
+        Returns:
+            Tuple (LibroCompacto, errores_fila)
+        """
+        # RUT y nombre se leen por posición: conservar las primeras columnas
+        n_fijas = max(self.COLUMNA_RUT_TRABAJADOR, *self.COLUMNAS_NOMBRE) + 1
+        columnas = list(df.columns[:n_fijas])
+        conceptos = []
+        conceptos_ref = {}
+        
+        for posicion, col in enumerate(df.columns):
+            concepto = conceptos_clasificados.get(col)
+            if concepto and concepto.categoria in self.CATEGORIAS_REGISTRO:
+                conceptos_ref[col] = ConceptoRef(len(conceptos), concepto.categoria)
+                conceptos.append(concepto)
+                if posicion >= n_fijas:
+                    columnas.append(col)
+        
+        df_reducido = df[columnas]
+        limites = np.linspace(0, len(df), procesos + 1).astype(int)
+        bloques = [
+            df_reducido.iloc[inicio:fin]
+            for inicio, fin in zip(limites[:-1], limites[1:])
+            if fin > inicio
+        ]
+        
+        procesos_bloque = []
+        try:
+            for bloque in bloques:
+                lectura, escritura = billiard.Pipe(duplex=False)
+                proceso = billiard.Process(
+                    target=_parsear_bloque_columnar,
+                    args=(escritura, bloque, conceptos_ref),
+                    daemon=True,
+                )
+                proceso.start()
+                escritura.close()
+                procesos_bloque.append((proceso, lectura))
+            # Leer antes de join: un hijo no termina hasta que se lee su resultado
+            resultados = [lectura.recv() for _, lectura in procesos_bloque]
+        except (OSError, EOFError) as e:
+            self.logger.warning(f"Parseo paralelo no disponible ({e!r}), usando un proceso")
+            return self._parsear_columnar(df, conceptos_clasificados)
+        finally:
+            for proceso, lectura in procesos_bloque:
+                lectura.close()
+                proceso.join(timeout=5)
+        
+        empleados = LibroCompacto.concatenar([libro for libro, _ in resultados], conceptos)
+        errores_fila = [error for _, errores in resultados for error in errores]
+        
+        return empleados, errores_fila
+    
+    def _parsear_filas(
+        self, 
+        df: pd.DataFrame, 
+        conceptos_clasificados: Dict, 
+        headers_info: List
+    ) -> tuple[list[dict], list[str]]:
+        """
+        Parsea el libro fila por fila con parsear_empleado.
+        
+        Returns:
+            Tuple (empleados, errores_fila)
+        """
+        empleados = []
+        errores_fila = []
+        
+        # Obtener orden real de columnas del DataFrame
+        columnas_ordenadas = list(df.columns)
+        
+        for idx, row in df.iterrows():
+            try:
+                # Convertir fila a dict
+                fila_dict = row.to_dict()
+                
+                # Parsear empleado (pasamos columnas ordenadas)
+                empleado_data = self.parsear_empleado(
+                    fila_dict, conceptos_clasificados, headers_info, columnas_ordenadas
+                )
+                
+                # Validar que tenga RUT (obligatorio)
+                if not empleado_data['rut']:
+                    errores_fila.append(f"Fila {idx + 2}: No se encontró RUT")
+                    continue
+                
+                empleados.append(empleado_data)
+                
+            except Exception as e:
+                self.logger.error(f"Error procesando fila {idx + 2}: {e}")
+                errores_fila.append(f"Fila {idx + 2}: {str(e)}")
+        
+        return empleados, errores_fila
+    
+    def _parsear_columnar(
+        self, 
+        df: pd.DataFrame, 
+        conceptos_clasificados: Dict
+    ) -> tuple[LibroCompacto, list[str]]:
+        """
+        Parsea el libro completo con operaciones columnares.
+        
+        1. Selecciona una sola vez las columnas de conceptos clasificados
+        2. Normaliza los montos columna por columna (normalizar_montos)
+        3. Pasa la matriz ancha a formato largo (fila, concepto, monto)
+           filtrando monto > 0 en un solo paso
+        4. Descarta las filas sin RUT y deja el formato largo como
+           LibroCompacto (indexarlo entrega la estructura de parsear_empleado)
+        
+        Returns:
+            Tuple (LibroCompacto, errores_fila)
+        """
+        n_filas = len(df)
+        
+        # RUT por posición (columna 3)
+        if len(df.columns) > self.COLUMNA_RUT_TRABAJADOR:
+            rut_raw = df.iloc[:, self.COLUMNA_RUT_TRABAJADOR]
+            ruts = self.normalizar_ruts(rut_raw).where(
+                rut_raw.notna() & rut_raw.astype(bool), ''
+            )
+        else:
+            ruts = pd.Series('', index=df.index)
+        
+        # Nombre concatenando columnas 4, 5, 6
+        nombres = pd.Series('', index=df.index)
+        tiene_nombre = pd.Series(False, index=df.index)
+        for idx in self.COLUMNAS_NOMBRE:
+            if len(df.columns) <= idx:
+                continue
+            parte_raw = df.iloc[:, idx]
+            valida = parte_raw.notna() & parte_raw.astype(bool)
+            parte = parte_raw.astype(str).str.strip()
+            nombres = nombres.mask(valida & tiene_nombre, nombres + ' ' + parte)
+            nombres = nombres.mask(valida & ~tiene_nombre, parte)
+            tiene_nombre |= valida
+        
+        # Columnas de conceptos con categoría que se guarda en RegistroLibro
+        columnas_concepto = []
+        conceptos = []
+        for col in df.columns:
+            concepto = conceptos_clasificados.get(col)
+            if concepto and concepto.categoria in self.CATEGORIAS_REGISTRO:
+                columnas_concepto.append(col)
+                conceptos.append(concepto)
+        
+        # Matriz de montos (filas x conceptos) normalizada por columna
+        if columnas_concepto:
+            montos = np.column_stack([
+                self.normalizar_montos(df[col]).to_numpy() for col in columnas_concepto
+            ])
+        else:
+            montos = np.zeros((n_filas, 0))
+        
+        # Formato largo: np.nonzero recorre en orden fila-mayor, por lo que
+        # los registros quedan agrupados por fila y en orden de columna
+        filas_idx, conceptos_idx = np.nonzero(montos > 0)
+        montos_largo = montos[filas_idx, conceptos_idx]
+        
+        # Filas sin RUT no son empleados
+        ruts_lista = ruts.tolist()
+        validas = np.fromiter((bool(r) for r in ruts_lista), dtype=bool, count=n_filas)
+        errores_fila = [
+            f"Fila {idx + 2}: No se encontró RUT"
+            for idx in df.index[~validas]
+        ]
+        
+        # Posición de cada fila válida dentro del libro compacto
+        posicion_empleado = np.cumsum(validas) - 1
+        registros_validos = validas[filas_idx]
+        
+        empleados = LibroCompacto(
+            [sys.intern(r) for r, valida in zip(ruts_lista, validas) if valida],
+            [sys.intern(n) for n, valida in zip(nombres.tolist(), validas) if valida],
+            conceptos,
+            posicion_empleado[filas_idx[registros_validos]],
+            conceptos_idx[registros_validos],
+            montos_largo[registros_validos],
+        )
+        
+        return empleados, errores_fila
+
+
+def _parsear_bloque_columnar(conexion, bloque: pd.DataFrame, conceptos_ref: Dict):
+    """Parsea un bloque de filas en un proceso hijo (ver _parsear_columnar_paralelo)."""
+    try:
+        conexion.send(TalanaLibroParser()._parsear_columnar(bloque, conceptos_ref))
+    finally:
+        conexion.close()
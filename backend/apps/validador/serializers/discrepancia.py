@@ -11,6 +11,7 @@ class DiscrepanciaSerializer(serializers.ModelSerializer):
     
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     origen_display = serializers.CharField(source='get_origen_display', read_only=True)
+    descripcion = serializers.SerializerMethodField()
     
     class Meta:
         model = Discrepancia
@@ -24,6 +25,23 @@ class DiscrepanciaSerializer(serializers.ModelSerializer):
             'resuelta', 'fecha_resolucion',
             'descripcion', 'fecha_deteccion',
         ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._plantillas_descripcion = {}
+    
+    def get_descripcion(self, obj):
+        """
+        Descripción generada al serializar (no se guarda en la BD).
+        
+        Las plantillas se cachean por (tipo, tipo_movimiento) en la instancia
+        del serializer, que con many=True es una sola por request.
+        """
+        plantillas = self._plantillas_descripcion
+        clave = (obj.tipo, obj.tipo_movimiento)
+        if clave not in plantillas:
+            plantillas[clave] = Discrepancia.plantilla_descripcion(*clave)
+        return obj.describir(plantillas[clave])
 
 
 class DiscrepanciaResumenSerializer(serializers.Serializer):
@@ -42,6 +42,10 @@ from .archivo_service import ArchivoService
 from .incidencia_service import IncidenciaService
 from .equipo_service import EquipoService
 from .libro_service import LibroService
+from .bulk_loader import BulkLoader
+from .catalogo_service import CatalogoService
+from .sugerencias_mapeo import SugerenciasMapeoService
+from .previsualizacion_tolerancia import PrevisualizacionTolerancia
 
 # ERP Factory/Strategy
 from .erp import ERPFactory, ERPStrategy, ParseResult, FormatoEsperado
@@ -58,6 +62,10 @@ __all__ = [
     'IncidenciaService',
     'EquipoService',
     'LibroService',
+    'BulkLoader',
+    'CatalogoService',
+    'SugerenciasMapeoService',
+    'PrevisualizacionTolerancia',
     
     # ERP Factory/Strategy
     'ERPFactory',
@@ -0,0 +1,165 @@
+"""
+Carga masiva de registros con COPY de PostgreSQL.
+
+Los procesos de ingesta (libro, novedades, movimientos) terminan insertando
+cientos de miles de filas hoja (RegistroLibro, RegistroNovedades,
+MovimientoMes, MovimientoAnalista). Con bulk_create cada lote es un INSERT
+con miles de parámetros; COPY FROM STDIN envía las filas como texto plano
+en un solo stream y es varias veces más rápido.
+
+En backends distintos de PostgreSQL (SQLite en tests) se usa bulk_create.
+
+Uso:
+    from apps.validador.services.bulk_loader import BulkLoader
+    
+    BulkLoader.cargar(RegistroLibro, registros)
+"""
+
+import io
+import json
+import logging
+from typing import Iterable
+
+from django.db import connections, models, router
+
+logger = logging.getLogger(__name__)
+
+
+class BulkLoader:
+    """
+    Inserta instancias de un modelo sin necesitar sus IDs de vuelta.
+    
+    Solo para modelos hoja: COPY no retorna las PKs generadas, por lo que
+    los padres que se referencian después (ej: EmpleadoLibro) deben seguir
+    usando bulk_create.
+    """
+    
+    # Filas por cada COPY (acota el tamaño del buffer en memoria)
+    BATCH_SIZE = 10000
+    
+    # Lote para el fallback bulk_create
+    BATCH_SIZE_FALLBACK = 1000
+    
+    @classmethod
+    def cargar(cls, modelo, objetos: Iterable[models.Model], batch_size: int = None) -> int:
+        """
+        Inserta las instancias en la tabla del modelo.
+        
+        Args:
+            modelo: Clase del modelo Django
+            objetos: Iterable de instancias no guardadas (puede ser un generador)
+            batch_size: Filas por lote (default BATCH_SIZE / BATCH_SIZE_FALLBACK)
+        
+        Returns:
+            Cantidad de filas insertadas
+        """
+        connection = connections[router.db_for_write(modelo)]
+        
+        if connection.vendor != 'postgresql':
+            return cls._cargar_bulk_create(
+                modelo, objetos, batch_size or cls.BATCH_SIZE_FALLBACK
+            )
+        
+        return cls._cargar_copy(
+            modelo, objetos, connection, batch_size or cls.BATCH_SIZE
+        )
+    
+    @classmethod
+    def _cargar_bulk_create(cls, modelo, objetos, batch_size: int) -> int:
+        """Fallback para backends sin COPY."""
+        total = 0
+        lote = []
+        
+        for obj in objetos:
+            lote.append(obj)
+            if len(lote) >= batch_size:
+                modelo.objects.bulk_create(lote, batch_size=batch_size)
+                total += len(lote)
+                lote = []
+        
+        if lote:
+            modelo.objects.bulk_create(lote, batch_size=batch_size)
+            total += len(lote)
+        
+        return total
+    
+    @classmethod
+    def _cargar_copy(cls, modelo, objetos, connection, batch_size: int) -> int:
+        """Envía las filas con COPY ... FROM STDIN en formato texto."""
+        opts = modelo._meta
+        campos = [
+            f for f in opts.concrete_fields
+            if not (f.primary_key and isinstance(f, models.AutoField))
+        ]
+        qn = connection.ops.quote_name
+        sql = (
+            f"COPY {qn(opts.db_table)} "
+            f"({', '.join(qn(f.column) for f in campos)}) FROM STDIN"
+        )
+        
+        total = 0
+        buffer = io.StringIO()
+        filas_buffer = 0
+        
+        with connection.cursor() as cursor:
+            for obj in objetos:
+                buffer.write(cls._serializar_fila(obj, campos, connection))
+                filas_buffer += 1
+                
+                if filas_buffer >= batch_size:
+                    cls._enviar(cursor, sql, buffer)
+                    total += filas_buffer
+                    buffer = io.StringIO()
+                    filas_buffer = 0
+            
+            if filas_buffer:
+                cls._enviar(cursor, sql, buffer)
+                total += filas_buffer
+        
+        logger.debug(f"COPY {opts.db_table}: {total} filas")
+        return total
+    
+    @staticmethod
+    def _enviar(cursor, sql: str, buffer: io.StringIO):
+        """Ejecuta el COPY con el contenido del buffer (psycopg2)."""
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+    
+    @classmethod
+    def _serializar_fila(cls, obj, campos, connection) -> str:
+        """Convierte una instancia en una línea del formato texto de COPY."""
+        valores = []
+        
+        for field in campos:
+            valor = field.pre_save(obj, add=True)
+            
+            if valor is None:
+                valores.append('\\N')
+                continue
+            
+            if isinstance(field, models.JSONField):
+                texto = json.dumps(valor, cls=field.encoder)
+            else:
+                valor = field.get_db_prep_save(valor, connection)
+                if valor is None:
+                    valores.append('\\N')
+                    continue
+                if isinstance(valor, bool):
+                    texto = 't' if valor else 'f'
+                else:
+                    texto = str(valor)
+            
+            valores.append(cls._escapar(texto))
+        
+        return '\t'.join(valores) + '\n'
+    
+    @staticmethod
+    def _escapar(texto: str) -> str:
+        """Escapa los caracteres especiales del formato texto de COPY."""
+        return (
+            texto
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+        )
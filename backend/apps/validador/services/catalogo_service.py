@@ -0,0 +1,162 @@
+"""
+Sincronización masiva de catálogos de conceptos.
+
+ConceptoLibro, ConceptoNovedades y ConceptoCliente se alimentan desde los
+headers de cada archivo. En vez de un get_or_create por header, el
+catálogo se sincroniza con un número constante de queries:
+
+1. Un SELECT del catálogo existente (cliente/erp) a un dict por clave
+2. Un bulk_create con los headers nuevos
+3. Un bulk_update con los que cambiaron
+4. Un SELECT para obtener los IDs de los recién creados (solo si hubo nuevos)
+
+Uso:
+    from apps.validador.services.catalogo_service import CatalogoService
+    
+    resultado = CatalogoService.sincronizar(
+        ConceptoNovedades,
+        filtro={'cliente': cliente, 'erp': erp},
+        campos_clave=('header_normalizado',),
+        entradas=[{'header_normalizado': 'bono', 'header_original': 'Bono', 'orden': 1}],
+        campos_actualizables=['orden'],
+    )
+    concepto = resultado.objetos[('bono',)]
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from django.utils import timezone
+
+from .base import BaseService
+
+
+@dataclass
+class ResultadoCatalogo:
+    """
+    Resultado de una sincronización de catálogo.
+    
+    Attributes:
+        objetos: Dict {clave: instancia} con todas las entradas del archivo
+            (existentes y creadas), en el orden de las entradas
+        creados: Cantidad de entradas nuevas
+        actualizados: Cantidad de entradas existentes modificadas
+        existentes: Dict {clave: instancia} con todo el catálogo previo
+    """
+    objetos: Dict[tuple, object] = field(default_factory=dict)
+    creados: int = 0
+    actualizados: int = 0
+    existentes: Dict[tuple, object] = field(default_factory=dict)
+    
+    @property
+    def ids(self) -> List[int]:
+        """IDs de las entradas del archivo, en orden."""
+        return [obj.pk for obj in self.objetos.values()]
+
+
+class CatalogoService(BaseService):
+    """
+    Upsert por conjuntos para catálogos de conceptos.
+    """
+    
+    @classmethod
+    def sincronizar(
+        cls,
+        modelo,
+        filtro: Dict,
+        campos_clave: Sequence[str],
+        entradas: List[Dict],
+        campos_actualizables: Sequence[str] = (),
+        defaults: Dict = None,
+    ) -> ResultadoCatalogo:
+        """
+        Crea las entradas que no existen y actualiza las que cambiaron.
+        
+        bulk_create no llama a save(), por lo que las entradas deben traer
+        cualquier campo que el modelo calcule en save() (ej: header_normalizado).
+        bulk_update tampoco aplica auto_now: esos campos (fecha_actualizacion)
+        se asignan aquí en las entradas que cambiaron.
+        
+        Args:
+            modelo: Clase del modelo del catálogo
+            filtro: Campos que acotan el catálogo (ej: {'cliente': c, 'erp': e})
+            campos_clave: Campos que identifican una entrada dentro del filtro
+            entradas: Dicts con los valores de cada entrada (incluye campos_clave).
+                Si hay claves repetidas se usa la primera.
+            campos_actualizables: Campos que se actualizan si difieren
+            defaults: Valores adicionales solo para las entradas nuevas
+        
+        Returns:
+            ResultadoCatalogo
+        """
+        campos_clave = tuple(campos_clave)
+        defaults = defaults or {}
+        
+        def clave_de(valores) -> tuple:
+            if isinstance(valores, dict):
+                return tuple(valores[c] for c in campos_clave)
+            return tuple(getattr(valores, c) for c in campos_clave)
+        
+        # 1. Catálogo existente en una sola query
+        existentes = {}
+        for obj in modelo.objects.filter(**filtro).order_by():
+            existentes.setdefault(clave_de(obj), obj)
+        
+        objetos = {}
+        nuevos = []
+        actualizados = []
+        
+        for entrada in entradas:
+            clave = clave_de(entrada)
+            if clave in objetos:
+                continue
+            
+            obj = existentes.get(clave)
+            if obj is None:
+                obj = modelo(**filtro, **defaults, **entrada)
+                nuevos.append(obj)
+            else:
+                cambio = False
+                for campo in campos_actualizables:
+                    if campo in entrada and getattr(obj, campo) != entrada[campo]:
+                        setattr(obj, campo, entrada[campo])
+                        cambio = True
+                if cambio:
+                    actualizados.append(obj)
+            
+            objetos[clave] = obj
+        
+        # 2. Inserts y updates en bloque
+        if nuevos:
+            modelo.objects.bulk_create(nuevos, ignore_conflicts=True)
+        if actualizados:
+            campos_auto_now = [
+                f.name for f in modelo._meta.concrete_fields if getattr(f, 'auto_now', False)
+            ]
+            ahora = timezone.now()
+            for obj in actualizados:
+                for campo in campos_auto_now:
+                    setattr(obj, campo, ahora)
+            modelo.objects.bulk_update(
+                actualizados, list(campos_actualizables) + campos_auto_now
+            )
+        
+        # 3. Con ignore_conflicts los nuevos no traen PK: recargarlos
+        if nuevos:
+            claves_nuevas = {clave_de(obj) for obj in nuevos}
+            for obj in modelo.objects.filter(**filtro).order_by():
+                clave = clave_de(obj)
+                if clave in claves_nuevas and objetos[clave].pk is None:
+                    objetos[clave] = obj
+        
+        cls.get_logger().debug(
+            f"Catálogo {modelo.__name__}: {len(nuevos)} nuevos, "
+            f"{len(actualizados)} actualizados de {len(objetos)} entradas"
+        )
+        
+        return ResultadoCatalogo(
+            objetos=objetos,
+            creados=len(nuevos),
+            actualizados=len(actualizados),
+            existentes=existentes,
+        )
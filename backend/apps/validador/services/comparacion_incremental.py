@@ -0,0 +1,327 @@
+"""
+Recomputación incremental de discrepancias.
+
+En la corrección de discrepancias el analista re-sube un archivo y vuelve
+a comparar, típicamente decenas de veces por cierre. En vez de borrar y
+recalcular todas las discrepancias, se recalcula solo la parte del cierre
+afectada por los cambios desde la comparación anterior:
+
+1. Versiones de archivos: por fuente (libro, novedades, movimientos ERP,
+   movimientos analista) se compara la versión vigente de sus archivos con
+   la de la última comparación. Si no cambió, la fuente no aporta cambios
+2. Hash por RUT: para las fuentes cuyos archivos cambiaron se calcula un
+   hash del contenido de cada RUT; los RUTs con hash distinto (o nuevos o
+   eliminados) son los cambiados
+3. Timestamps de mapeo: ConceptoLibro y ConceptoNovedades del cliente
+   modificados después de la comparación anterior (clasificación o mapeo)
+   afectan a todos los RUTs de ese concepto
+
+Las discrepancias fuera de ese alcance se conservan tal cual, incluidas las
+resueltas. La primera comparación del cierre (sin HuellaComparacion) es
+completa.
+
+Si nada cambió (misma firma: versiones de archivos, versión de las tablas
+de mapeo y tolerancia) ni siquiera se prepara el alcance: se devuelve el
+resultado guardado de la comparación anterior.
+
+Uso:
+    from apps.validador.services.comparacion_incremental import ComparacionIncremental
+    
+    resultado = ComparacionIncremental.resultado_memorizado(cierre)
+    if resultado is None:
+        alcance = ComparacionIncremental.preparar(cierre)
+        ...  # comparar según alcance
+        ComparacionIncremental.guardar(cierre, alcance, inicio, resultado)
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Dict, Optional, Set
+
+from django.db.models import Count, Max, Q
+
+from apps.validador.constants import TOLERANCIA_MONTO_NOVEDADES
+
+from .base import BaseService
+
+# Fuente -> (modelo de archivo, tipos de archivo)
+ARCHIVOS_FUENTE = {
+    'libro': ('ArchivoERP', ('libro_remuneraciones',)),
+    'movimientos_mes': ('ArchivoERP', ('movimientos_mes',)),
+    'novedades': ('ArchivoAnalista', ('novedades',)),
+    'movimientos_analista': ('ArchivoAnalista', ('asistencias', 'finiquitos', 'ingresos')),
+}
+
+# Sobre esta cantidad de RUTs cambiados conviene recalcular todo
+# (y se evita un IN con miles de parámetros)
+MAX_RUTS_INCREMENTAL = 2000
+
+
+@dataclass
+class AlcanceComparacion:
+    """
+    Parte del cierre a recomputar.
+    
+    Attributes:
+        completo: Recalcular todo el cierre (los demás conjuntos se ignoran)
+        ruts_libro: RUTs con cambios en libro o novedades
+        conceptos_libro: IDs de ConceptoLibro cuyo mapeo o categoría cambió
+        headers_libro: header_original de esos conceptos (Discrepancia.nombre_item)
+        headers_novedades: header_original de los ConceptoNovedades cuyo
+            mapeo cambió (Discrepancia.nombre_item_novedades)
+        ruts_movimientos: RUTs con cambios en movimientos ERP o analista
+        versiones: Versiones de archivos actuales (para guardar)
+        huellas: Hashes por RUT actuales (para guardar)
+        firma: Firma de los datos de entrada actuales (para guardar)
+    """
+    completo: bool = True
+    ruts_libro: Set[str] = field(default_factory=set)
+    conceptos_libro: Set[int] = field(default_factory=set)
+    headers_libro: Set[str] = field(default_factory=set)
+    headers_novedades: Set[str] = field(default_factory=set)
+    ruts_movimientos: Set[str] = field(default_factory=set)
+    versiones: Dict[str, list] = field(default_factory=dict)
+    huellas: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    firma: str = ''
+    
+    @property
+    def libro_sin_cambios(self) -> bool:
+        return not self.completo and not (self.ruts_libro or self.conceptos_libro or self.headers_novedades)
+    
+    @property
+    def movimientos_sin_cambios(self) -> bool:
+        return not self.completo and not self.ruts_movimientos
+    
+    def filtro_discrepancias_libro(self) -> Q:
+        """Discrepancias libro_vs_novedades dentro del alcance."""
+        return (
+            Q(rut_empleado__in=self.ruts_libro)
+            | Q(nombre_item__in=self.headers_libro)
+            | Q(nombre_item_novedades__in=self.headers_novedades)
+        )
+
+
+class ComparacionIncremental(BaseService):
+    """
+    Detección de cambios entre comparaciones de un cierre.
+    """
+    
+    @classmethod
+    def resultado_memorizado(cls, cierre, completa: bool = False) -> Optional[dict]:
+        """
+        Resultado de la comparación anterior si los datos de entrada no cambiaron.
+        
+        Args:
+            cierre: Cierre a comparar
+            completa: Forzar recomputación (nunca hay resultado memorizado)
+        
+        Returns:
+            Dict con 'libro' y 'movimientos' guardado por guardar(), o None
+        """
+        from apps.validador.models import HuellaComparacion
+        
+        if completa:
+            return None
+        anterior = HuellaComparacion.objects.filter(cierre=cierre).first()
+        if anterior is None or not anterior.firma or not anterior.resultado:
+            return None
+        
+        if cls.firma_actual(cierre) != anterior.firma:
+            return None
+        return anterior.resultado
+    
+    @classmethod
+    def firma_actual(cls, cierre) -> str:
+        """Firma de los datos de entrada vigentes del cierre."""
+        versiones = {fuente: cls._version_archivos(cierre, fuente) for fuente in ARCHIVOS_FUENTE}
+        return cls._firma(cierre, versiones)
+    
+    @classmethod
+    def preparar(cls, cierre, completa: bool = False) -> AlcanceComparacion:
+        """
+        Calcula el alcance de la comparación e invalida la huella guardada.
+        
+        La huella se elimina antes de comparar: si la comparación falla a
+        medias, la siguiente es completa.
+        
+        Args:
+            cierre: Cierre a comparar
+            completa: Forzar recomputación completa
+        """
+        from apps.validador.models import HuellaComparacion
+        
+        anterior = HuellaComparacion.objects.filter(cierre=cierre).first()
+        if anterior is not None:
+            anterior.delete()
+        if completa:
+            anterior = None
+        
+        previas = anterior.huellas if anterior else {}
+        versiones = {}
+        huellas = {}
+        cambiados = {}
+        for fuente in ARCHIVOS_FUENTE:
+            versiones[fuente] = cls._version_archivos(cierre, fuente)
+            if anterior is not None and anterior.versiones.get(fuente) == versiones[fuente]:
+                huellas[fuente] = previas.get(fuente, {})
+                cambiados[fuente] = set()
+                continue
+            
+            huellas[fuente] = cls._huellas_por_rut(cierre, fuente)
+            previa = previas.get(fuente, {})
+            cambiados[fuente] = {
+                rut for rut in huellas[fuente].keys() | previa.keys()
+                if huellas[fuente].get(rut) != previa.get(rut)
+            }
+        
+        firma = cls._firma(cierre, versiones)
+        alcance = AlcanceComparacion(versiones=versiones, huellas=huellas, firma=firma)
+        if anterior is None:
+            return alcance
+        
+        alcance.ruts_libro = cambiados['libro'] | cambiados['novedades']
+        alcance.ruts_movimientos = cambiados['movimientos_mes'] | cambiados['movimientos_analista']
+        if max(len(alcance.ruts_libro), len(alcance.ruts_movimientos)) > MAX_RUTS_INCREMENTAL:
+            return AlcanceComparacion(versiones=versiones, huellas=huellas, firma=firma)
+        
+        cls._conceptos_modificados(cierre, anterior.fecha, alcance)
+        alcance.completo = False
+        
+        cls.get_logger().info(
+            f"Comparación incremental cierre {cierre.id}: "
+            f"{len(alcance.ruts_libro)} RUTs libro/novedades, "
+            f"{len(alcance.conceptos_libro)} conceptos, "
+            f"{len(alcance.ruts_movimientos)} RUTs movimientos"
+        )
+        return alcance
+    
+    @classmethod
+    def guardar(cls, cierre, alcance: AlcanceComparacion, inicio, resultado: dict = None) -> None:
+        """
+        Guarda la huella de una comparación terminada.
+        
+        Args:
+            resultado: Dict con 'libro' y 'movimientos' a devolver mientras
+                la firma no cambie (resultado_memorizado)
+        """
+        from apps.validador.models import HuellaComparacion
+        
+        HuellaComparacion.objects.update_or_create(
+            cierre=cierre,
+            defaults={
+                'versiones': alcance.versiones,
+                'huellas': alcance.huellas,
+                'fecha': inicio,
+                'firma': alcance.firma,
+                'resultado': resultado or {},
+            },
+        )
+    
+    @classmethod
+    def _firma(cls, cierre, versiones: dict) -> str:
+        """Hash de las versiones de archivos, el mapeo de conceptos y la tolerancia."""
+        contenido = json.dumps({
+            'archivos': versiones,
+            'mapeo': cls._version_mapeo(cierre),
+            'tolerancia': str(TOLERANCIA_MONTO_NOVEDADES),
+        }, sort_keys=True)
+        return hashlib.sha256(contenido.encode()).hexdigest()
+    
+    @classmethod
+    def _version_mapeo(cls, cierre) -> dict:
+        """
+        Versión de ConceptoLibro y ConceptoNovedades del cliente.
+        
+        Cantidad (detecta eliminaciones) y última modificación (clasificación
+        o mapeo) de cada tabla.
+        """
+        from apps.validador.models import ConceptoLibro, ConceptoNovedades
+        
+        version = {}
+        for modelo in (ConceptoLibro, ConceptoNovedades):
+            datos = modelo.objects.filter(cliente_id=cierre.cliente_id).aggregate(
+                cantidad=Count('id'), ultima=Max('fecha_actualizacion'),
+            )
+            version[modelo.__name__] = [
+                datos['cantidad'], datos['ultima'].isoformat() if datos['ultima'] else None,
+            ]
+        return version
+    
+    @classmethod
+    def _version_archivos(cls, cierre, fuente: str) -> list:
+        """[id, versión, fecha de procesamiento] de los archivos vigentes de la fuente."""
+        from apps.validador import models
+        
+        nombre_modelo, tipos = ARCHIVOS_FUENTE[fuente]
+        archivos = getattr(models, nombre_modelo).objects.filter(
+            cierre=cierre, tipo__in=tipos, es_version_actual=True,
+        ).order_by('id').values_list('id', 'version', 'fecha_procesamiento')
+        return [
+            [id_, version, fecha.isoformat() if fecha else None]
+            for id_, version, fecha in archivos
+        ]
+    
+    @classmethod
+    def _filas_fuente(cls, cierre, fuente: str):
+        """Filas (rut, ...) que alimentan la comparación, ordenadas por RUT."""
+        from apps.validador.models import (
+            MovimientoAnalista, MovimientoMes, RegistroLibro, RegistroNovedades,
+        )
+        
+        if fuente == 'libro':
+            return RegistroLibro.objects.filter(cierre=cierre).order_by(
+                'empleado__rut', 'empleado_id', 'concepto_id'
+            ).values_list('empleado__rut', 'empleado__nombre', 'concepto_id', 'monto')
+        if fuente == 'novedades':
+            return RegistroNovedades.objects.filter(cierre=cierre).order_by(
+                'rut_empleado', 'id'
+            ).values_list('rut_empleado', 'nombre_empleado', 'concepto_novedades_id', 'monto')
+        
+        modelo, extra = (
+            (MovimientoMes, 'hoja_origen') if fuente == 'movimientos_mes'
+            else (MovimientoAnalista, 'origen')
+        )
+        return modelo.objects.filter(cierre=cierre).order_by('rut', 'id').values_list(
+            'rut', 'tipo', 'nombre', 'fecha_inicio', 'fecha_fin', 'dias', extra
+        )
+    
+    @classmethod
+    def _huellas_por_rut(cls, cierre, fuente: str) -> Dict[str, str]:
+        """Hash corto del contenido de cada RUT de la fuente."""
+        huellas = {}
+        filas = cls._filas_fuente(cierre, fuente).iterator(chunk_size=5000)
+        for rut, grupo in groupby(filas, key=lambda fila: fila[0]):
+            contenido = repr([fila[1:] for fila in grupo]).encode()
+            huellas[rut] = hashlib.sha256(contenido).hexdigest()[:16]
+        return huellas
+    
+    @classmethod
+    def _conceptos_modificados(cls, cierre, desde, alcance: AlcanceComparacion) -> None:
+        """Agrega al alcance los conceptos clasificados/mapeados después de `desde`."""
+        from apps.validador.models import ConceptoLibro, ConceptoNovedades
+        
+        headers_libro = set(
+            ConceptoLibro.objects.filter(
+                cliente_id=cierre.cliente_id, fecha_actualizacion__gt=desde,
+            ).values_list('header_original', flat=True)
+        )
+        
+        # Un mapeo nuevo afecta al concepto destino; el destino anterior se
+        # cubre borrando por header de novedades
+        for header, header_libro in ConceptoNovedades.objects.filter(
+            cliente_id=cierre.cliente_id, fecha_actualizacion__gt=desde,
+        ).values_list('header_original', 'concepto_libro__header_original'):
+            alcance.headers_novedades.add(header)
+            if header_libro is not None:
+                headers_libro.add(header_libro)
+        
+        # Discrepancia guarda el header, no el concepto: un header repetido
+        # (ocurrencias) arrastra a todos sus conceptos
+        alcance.headers_libro = headers_libro
+        alcance.conceptos_libro = set(
+            ConceptoLibro.objects.filter(
+                cliente_id=cierre.cliente_id, header_original__in=headers_libro,
+            ).values_list('id', flat=True)
+        ) if headers_libro else set()
@@ -0,0 +1,213 @@
+"""
+Comparación Libro vs Novedades ejecutada en la base de datos.
+
+El motor en Python trae a memoria todos los RegistroNovedades y
+RegistroLibro del cierre, los agrupa en dicts y crea las discrepancias con
+bulk_create. Este motor hace lo mismo en una sola sentencia
+INSERT INTO ... SELECT:
+
+1. novedades: monto sumado por (RUT, concepto_libro); nombre del empleado e
+   item de novedades tomados del primer registro (menor id)
+2. libro: un registro por (RUT, concepto); si el RUT se repite gana el del
+   último empleado (mayor id), igual que el dict del motor en Python
+3. pares: join de ambos lados por (RUT, concepto_libro)
+4. Se insertan las diferencias cuyo valor absoluto supera la tolerancia
+   (sin descripción: se genera al mostrarla, ver Discrepancia.describir())
+
+Python solo orquesta (borra las anteriores, reporta progreso). El SQL es
+estándar (CTEs y window functions) salvo el JSON vacío, que depende del
+motor. Soporta PostgreSQL (producción) y SQLite.
+
+Uso:
+    from apps.validador.services.comparacion_sql import ComparacionSQL
+    
+    if ComparacionSQL.disponible():
+        resultado = ComparacionSQL.comparar_libro_novedades(cierre)
+        # {'discrepancias': 12, 'pares_comparados': 3400}
+"""
+
+import logging
+from decimal import Decimal
+from typing import Optional, Set
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+from apps.validador.constants import CATEGORIAS_NO_COMPARABLES, TOLERANCIA_MONTO_NOVEDADES
+
+logger = logging.getLogger(__name__)
+
+# Fragmentos SQL que difieren entre motores
+_DIALECTOS = {
+    'postgresql': {
+        'json_vacio': "'{}'::jsonb",
+    },
+    'sqlite': {
+        'json_vacio': "'{}'",
+    },
+}
+
+
+class ComparacionSQL:
+    """
+    Comparación por conjuntos de Libro vs Novedades (push-down a la BD).
+    """
+    
+    @classmethod
+    def _conexion(cls):
+        from apps.validador.models import Discrepancia
+        return connections[router.db_for_write(Discrepancia)]
+    
+    @classmethod
+    def disponible(cls) -> bool:
+        """True si está activado (COMPARACION_SQL) y el motor de BD es soportado."""
+        return settings.COMPARACION_SQL and cls._conexion().vendor in _DIALECTOS
+    
+    @classmethod
+    def comparar_libro_novedades(
+        cls,
+        cierre,
+        tolerancia: Decimal = TOLERANCIA_MONTO_NOVEDADES,
+        ruts: Optional[Set[str]] = None,
+        conceptos: Optional[Set[int]] = None,
+    ) -> dict:
+        """
+        Crea las discrepancias monto_diferente del cierre.
+        
+        No borra las discrepancias anteriores (lo hace el llamador).
+        
+        Args:
+            cierre: Cierre a comparar
+            tolerancia: Diferencia absoluta máxima aceptada
+            ruts, conceptos: Si se indican, solo los pares cuyo RUT o
+                concepto del libro esté en alguno de los dos conjuntos
+        
+        Returns:
+            Dict con 'discrepancias' (insertadas) y 'pares_comparados'
+        """
+        conexion = cls._conexion()
+        dialecto = _DIALECTOS[conexion.vendor]
+        
+        ctes, params_ctes = cls._sql_pares(cierre.id, ruts, conceptos)
+        
+        with conexion.cursor() as cursor:
+            cursor.execute(f'{ctes} SELECT COUNT(*) FROM pares', params_ctes)
+            pares_comparados = cursor.fetchone()[0]
+            
+            # INSERT antes del WITH: así el driver informa las filas insertadas
+            insert, select, params_select = cls._sql_insert(dialecto, cierre.id, conexion, tolerancia)
+            cursor.execute(f'{insert} {ctes} {select}', params_ctes + params_select)
+            discrepancias = cursor.rowcount
+        
+        logger.info(
+            f"Comparación SQL libro vs novedades cierre {cierre.id}: "
+            f"{pares_comparados} pares comparados, {discrepancias} discrepancias"
+        )
+        
+        return {'discrepancias': discrepancias, 'pares_comparados': pares_comparados}
+    
+    @classmethod
+    def _sql_pares(cls, cierre_id: int, ruts=None, conceptos=None) -> tuple:
+        """CTEs novedades, libro y pares (RUT + concepto presentes en ambos lados)."""
+        from apps.validador.models import (
+            ConceptoLibro, ConceptoNovedades, EmpleadoLibro, RegistroLibro, RegistroNovedades,
+        )
+        
+        categorias = ', '.join(['%s'] * len(CATEGORIAS_NO_COMPARABLES))
+        filtro_novedades, params_novedades = cls._sql_alcance('rn.rut_empleado', 'cn.concepto_libro_id', ruts, conceptos)
+        filtro_libro, params_libro = cls._sql_alcance('el.rut', 'rl.concepto_id', ruts, conceptos)
+        sql = f"""
+            WITH novedades AS (
+                SELECT
+                    rn.rut_empleado AS rut,
+                    cn.concepto_libro_id AS concepto_id,
+                    SUM(rn.monto) OVER (
+                        PARTITION BY rn.rut_empleado, cn.concepto_libro_id
+                    ) AS monto,
+                    rn.nombre_empleado AS nombre_empleado,
+                    cn.header_original AS nombre_item,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY rn.rut_empleado, cn.concepto_libro_id ORDER BY rn.id
+                    ) AS posicion
+                FROM {RegistroNovedades._meta.db_table} rn
+                JOIN {ConceptoNovedades._meta.db_table} cn ON cn.id = rn.concepto_novedades_id
+                WHERE rn.cierre_id = %s AND cn.concepto_libro_id IS NOT NULL{filtro_novedades}
+            ),
+            libro AS (
+                SELECT
+                    el.rut AS rut,
+                    rl.concepto_id AS concepto_id,
+                    rl.monto AS monto,
+                    el.nombre AS nombre_empleado,
+                    cl.header_original AS nombre_item,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY el.rut, rl.concepto_id ORDER BY rl.empleado_id DESC
+                    ) AS posicion
+                FROM {RegistroLibro._meta.db_table} rl
+                JOIN {EmpleadoLibro._meta.db_table} el ON el.id = rl.empleado_id
+                JOIN {ConceptoLibro._meta.db_table} cl ON cl.id = rl.concepto_id
+                WHERE rl.cierre_id = %s
+                  AND (cl.categoria IS NULL OR cl.categoria NOT IN ({categorias})){filtro_libro}
+            ),
+            pares AS (
+                SELECT
+                    l.rut AS rut,
+                    COALESCE(NULLIF(l.nombre_empleado, ''), n.nombre_empleado) AS nombre_empleado,
+                    l.nombre_item AS nombre_item,
+                    n.nombre_item AS nombre_item_novedades,
+                    l.monto AS monto_erp,
+                    n.monto AS monto_cliente,
+                    l.monto - n.monto AS diferencia
+                FROM libro l
+                JOIN novedades n ON n.rut = l.rut AND n.concepto_id = l.concepto_id
+                WHERE l.posicion = 1 AND n.posicion = 1
+            )
+        """
+        params = [cierre_id, *params_novedades, cierre_id, *CATEGORIAS_NO_COMPARABLES, *params_libro]
+        return sql, params
+    
+    @staticmethod
+    def _sql_alcance(columna_rut: str, columna_concepto: str, ruts, conceptos) -> tuple:
+        """Condición AND (rut IN ... OR concepto IN ...); vacía si no hay alcance."""
+        if ruts is None and conceptos is None:
+            return '', []
+        
+        condiciones = []
+        params = []
+        for columna, valores in ((columna_rut, ruts), (columna_concepto, conceptos)):
+            if valores:
+                condiciones.append(f"{columna} IN ({', '.join(['%s'] * len(valores))})")
+                params.extend(sorted(valores))
+        if not condiciones:
+            return ' AND 1 = 0', []
+        return f" AND ({' OR '.join(condiciones)})", params
+    
+    @classmethod
+    def _sql_insert(cls, dialecto: dict, cierre_id: int, conexion, tolerancia: Decimal) -> tuple:
+        """
+        INSERT (columnas) y SELECT de las diferencias sobre la tolerancia.
+        
+        Se devuelven por separado para intercalar las CTEs entre ambos.
+        """
+        from apps.validador.models import Discrepancia
+        
+        insert = f"""
+            INSERT INTO {Discrepancia._meta.db_table} (
+                cierre_id, tipo, origen, rut_empleado, nombre_empleado, concepto_id,
+                nombre_item, nombre_item_novedades, monto_erp, monto_cliente, diferencia,
+                tipo_movimiento, detalle_movimiento, resuelta, fecha_resolucion,
+                descripcion, fecha_deteccion
+            )
+        """
+        select = f"""
+            SELECT
+                %s, 'monto_diferente', 'libro_vs_novedades', rut, nombre_empleado, NULL,
+                nombre_item, nombre_item_novedades, monto_erp, monto_cliente, diferencia,
+                '', {dialecto['json_vacio']}, FALSE, NULL,
+                '', %s
+            FROM pares
+            WHERE ABS(diferencia) > CAST(%s AS NUMERIC)
+        """
+        ahora = conexion.ops.adapt_datetimefield_value(timezone.now())
+        return insert, select, [cierre_id, ahora, tolerancia]
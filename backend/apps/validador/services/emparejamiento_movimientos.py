@@ -0,0 +1,219 @@
+"""
+Emparejamiento de movimientos ERP vs Analista por solapamiento de fechas.
+
+Cada movimiento es un intervalo de días [inicio, fin] dentro de un grupo
+(RUT, familia de movimiento). Un movimiento del ERP:
+
+- sin intervalos del analista que lo solapen → falta en cliente
+- solapado por exactamente un intervalo idéntico → cuadra
+- solapado de otra forma (fechas distintas, partido en varios) → parcial
+
+y un movimiento del analista que no solapa ninguno del ERP → falta en ERP.
+
+El conteo de solapamientos es vectorial: con los inicios y los fines del
+otro lado ordenados por (grupo, día), los intervalos que solapan
+[ini, fin] son los que empiezan <= fin menos los que terminan < ini, dos
+np.searchsorted por movimiento (O(n log n) en total). Los grupos se
+codifican en la misma clave: grupo * ESCALA_GRUPO + día.
+
+Uso:
+    from apps.validador.services.emparejamiento_movimientos import EmparejamientoMovimientos
+    
+    resultado = EmparejamientoMovimientos.emparejar(df_erp, df_analista, primer_dia, ultimo_dia)
+    resultado.solo_erp          # posiciones en df_erp sin par
+    resultado.parciales         # {posición ERP: [posiciones analista que la solapan]}
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Tipo de movimiento (ERP o analista) -> familia comparable.
+# El ERP informa ingreso/finiquito/asistencia y los archivos del analista
+# alta/baja/licencia/permiso/ausencia.
+FAMILIAS_MOVIMIENTO = {
+    'ingreso': 'ingreso',
+    'alta': 'ingreso',
+    'finiquito': 'finiquito',
+    'baja': 'finiquito',
+    'vacaciones': 'vacaciones',
+    'asistencia': 'asistencia',
+    'licencia': 'asistencia',
+    'permiso': 'asistencia',
+    'ausencia': 'asistencia',
+    'otro': 'asistencia',
+}
+
+# Familias con duración: se recortan al mes del cierre y se ignoran si no
+# lo tocan. Las demás (ingreso, finiquito) son eventos de un día y se
+# emparejan dentro del mes sin importar la fecha; si difiere es parcial.
+FAMILIAS_PERIODO = ('vacaciones', 'asistencia')
+
+# Mayor que cualquier ordinal de fecha (date.max.toordinal() = 3.652.059)
+ESCALA_GRUPO = 4_000_000
+
+
+@dataclass
+class ResultadoEmparejamiento:
+    """
+    Resultado por posición (0..n-1) en los DataFrames de entrada.
+    
+    Attributes:
+        solo_erp: Movimientos ERP sin solapamiento en el analista
+        solo_analista: Movimientos del analista sin solapamiento en el ERP
+        parciales: Movimiento ERP -> movimientos del analista que lo solapan
+            sin ser idénticos
+        ignorados_erp, ignorados_analista: Máscaras de movimientos fuera del mes
+    """
+    solo_erp: np.ndarray
+    solo_analista: np.ndarray
+    parciales: Dict[int, List[int]] = field(default_factory=dict)
+    ignorados_erp: np.ndarray = None
+    ignorados_analista: np.ndarray = None
+
+
+class EmparejamientoMovimientos:
+    """
+    Motor de emparejamiento por intervalos.
+    """
+    
+    @classmethod
+    def emparejar(
+        cls,
+        erp: pd.DataFrame,
+        analista: pd.DataFrame,
+        desde: date,
+        hasta: date,
+    ) -> ResultadoEmparejamiento:
+        """
+        Empareja movimientos ERP y del analista del mes [desde, hasta].
+        
+        Args:
+            erp, analista: DataFrames con columnas rut, tipo, fecha_inicio y
+                fecha_fin (date o None)
+            desde, hasta: Primer y último día del mes del cierre
+        
+        Returns:
+            ResultadoEmparejamiento (posiciones, no labels del índice)
+        """
+        grupos = cls._codificar_grupos(erp, analista)
+        e = cls._intervalos(erp, grupos[:len(erp)], desde, hasta)
+        a = cls._intervalos(analista, grupos[len(erp):], desde, hasta)
+        
+        solapes_erp = cls._contar_solapes(e, a)
+        solapes_analista = cls._contar_solapes(a, e)
+        
+        validos_e = ~e['ignorado']
+        validos_a = ~a['ignorado']
+        
+        # Idéntico: mismo grupo y mismas fechas reales (recortadas)
+        claves_a = pd.MultiIndex.from_arrays([a[k][validos_a] for k in ('grupo', 'inicio', 'fin')])
+        identico = pd.MultiIndex.from_arrays([e['grupo'], e['inicio'], e['fin']]).isin(claves_a)
+        
+        solo_erp = np.flatnonzero(validos_e & (solapes_erp == 0))
+        solo_analista = np.flatnonzero(validos_a & (solapes_analista == 0))
+        parcial = np.flatnonzero(validos_e & (solapes_erp > 0) & ~((solapes_erp == 1) & identico))
+        
+        return ResultadoEmparejamiento(
+            solo_erp=solo_erp,
+            solo_analista=solo_analista,
+            parciales=cls._detalle_parciales(parcial, e, a),
+            ignorados_erp=e['ignorado'],
+            ignorados_analista=a['ignorado'],
+        )
+    
+    @staticmethod
+    def _codificar_grupos(erp: pd.DataFrame, analista: pd.DataFrame) -> np.ndarray:
+        """Código de grupo (RUT, familia) común a ambos lados."""
+        ruts = pd.concat([erp['rut'], analista['rut']], ignore_index=True).astype(str)
+        tipos = pd.concat([erp['tipo'], analista['tipo']], ignore_index=True)
+        familias = tipos.map(FAMILIAS_MOVIMIENTO).fillna(tipos).astype(str)
+        codigos, _ = pd.factorize(ruts + '|' + familias)
+        return codigos.astype(np.int64)
+    
+    @staticmethod
+    def _intervalos(df: pd.DataFrame, grupos: np.ndarray, desde: date, hasta: date) -> dict:
+        """
+        Arrays del intervalo de cada movimiento (días como ordinales).
+        
+        inicio/fin: fechas reales recortadas al mes (para comparar);
+        solape_*: intervalo usado para detectar solapamiento (el mes
+        completo en eventos de un día o sin fechas).
+        """
+        n = len(df)
+        mes_ini, mes_fin = desde.toordinal(), hasta.toordinal()
+        
+        def ordinales(serie):
+            return np.array(
+                [d.toordinal() if d is not None and not pd.isna(d) else -1 for d in serie],
+                dtype=np.int64,
+            )
+        
+        ini = ordinales(df['fecha_inicio']) if n else np.empty(0, np.int64)
+        fin = ordinales(df['fecha_fin']) if n else np.empty(0, np.int64)
+        # Con una sola fecha el movimiento dura un día
+        ini = np.where(ini < 0, fin, ini)
+        fin = np.where(fin < 0, ini, fin)
+        fin = np.maximum(fin, ini)
+        sin_fechas = ini < 0
+        
+        familias = df['tipo'].map(FAMILIAS_MOVIMIENTO).fillna(df['tipo']).to_numpy() if n else np.empty(0)
+        periodo = np.isin(familias, FAMILIAS_PERIODO)
+        
+        ignorado = periodo & ~sin_fechas & ((fin < mes_ini) | (ini > mes_fin))
+        ini = np.where(sin_fechas, mes_ini, ini)
+        fin = np.where(sin_fechas, mes_fin, fin)
+        inicio = np.where(periodo, np.clip(ini, mes_ini, mes_fin), ini)
+        termino = np.where(periodo, np.clip(fin, mes_ini, mes_fin), fin)
+        
+        return {
+            'grupo': grupos,
+            'inicio': inicio,
+            'fin': termino,
+            'solape_inicio': np.where(periodo, inicio, mes_ini),
+            'solape_fin': np.where(periodo, termino, mes_fin),
+            'ignorado': ignorado,
+        }
+    
+    @staticmethod
+    def _claves_ordenadas(lado: dict):
+        """Inicios y fines (válidos) del lado como claves grupo/día ordenadas."""
+        validos = ~lado['ignorado']
+        base = lado['grupo'][validos] * ESCALA_GRUPO
+        inicios = np.sort(base + lado['solape_inicio'][validos])
+        fines = np.sort(base + lado['solape_fin'][validos])
+        return inicios, fines
+    
+    @classmethod
+    def _contar_solapes(cls, lado: dict, otro: dict) -> np.ndarray:
+        """Cantidad de intervalos de `otro` que solapan cada intervalo de `lado`."""
+        inicios, fines = cls._claves_ordenadas(otro)
+        base = lado['grupo'] * ESCALA_GRUPO
+        empiezan_antes = np.searchsorted(inicios, base + lado['solape_fin'], side='right')
+        terminan_antes = np.searchsorted(fines, base + lado['solape_inicio'], side='left')
+        # Los anteriores al grupo se cancelan: cada intervalo aporta un inicio y un fin
+        return empiezan_antes - terminan_antes
+    
+    @staticmethod
+    def _detalle_parciales(posiciones: np.ndarray, e: dict, a: dict) -> Dict[int, List[int]]:
+        """Movimientos del analista que solapan cada movimiento ERP parcial."""
+        if not len(posiciones):
+            return {}
+        
+        validos = np.flatnonzero(~a['ignorado'])
+        orden = validos[np.lexsort((a['solape_inicio'][validos], a['grupo'][validos]))]
+        claves = a['grupo'][orden] * ESCALA_GRUPO + a['solape_inicio'][orden]
+        
+        parciales = {}
+        for pos in posiciones:
+            base = e['grupo'][pos] * ESCALA_GRUPO
+            desde = np.searchsorted(claves, base, side='left')
+            hasta = np.searchsorted(claves, base + e['solape_fin'][pos], side='right')
+            candidatos = orden[desde:hasta]
+            parciales[int(pos)] = [
+                int(c) for c in candidatos if a['solape_fin'][c] >= e['solape_inicio'][pos]
+            ]
+        return parciales
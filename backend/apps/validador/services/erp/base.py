@@ -20,6 +20,10 @@ from dataclasses import dataclass
 import pandas as pd
 import logging
 
+from apps.validador.utils.cache_parseo import leer_excel_cacheado
+from apps.validador.utils.normalizacion import normalizar_monto, normalizar_rut
+from apps.validador.utils.normalizacion_vectorial import normalizar_montos, normalizar_ruts
+
 if TYPE_CHECKING:
     from apps.core.models import ERP
 
@@ -71,10 +75,12 @@ class ERPStrategy(ABC):
         erp_slug: Slug único del ERP (asignado por Factory.register)
         nombre_display: Nombre para mostrar del ERP
         config: Configuración de parseo del modelo ERP
+        version_lectura: Versión de la lectura de archivos (invalida el caché de parseo)
     """
     
     erp_slug: str = None
     nombre_display: str = None
+    version_lectura: str = '1'
     
     def __init__(self, erp_config: dict = None):
         """
@@ -155,16 +161,7 @@ class ERPStrategy(ABC):
             >>> strategy.normalizar_rut('123456789')
             '12345678-9'
         """
-        if pd.isna(rut) or rut is None:
-            return ''
-        
-        rut = str(rut).upper().replace('.', '').replace(' ', '').strip()
-        
-        # Si no tiene guión, agregarlo antes del dígito verificador
-        if '-' not in rut and len(rut) > 1:
-            rut = f"{rut[:-1]}-{rut[-1]}"
-        
-        return rut
+        return normalizar_rut(rut)
     
     def normalizar_monto(self, monto) -> float:
         """
@@ -182,35 +179,15 @@ class ERPStrategy(ABC):
             >>> strategy.normalizar_monto('1234,56')
             1234.56
         """
-        if pd.isna(monto) or monto is None:
-            return 0.0
-        
-        if isinstance(monto, (int, float)):
-            return float(monto)
-        
-        # Limpiar formato chileno: $1.234.567 -> 1234567
-        monto_str = str(monto).replace('$', '').replace(' ', '').strip()
-        
-        # Detectar formato: si tiene punto como separador de miles
-        # El formato chileno usa punto para miles y coma para decimales
-        if '.' in monto_str and ',' in monto_str:
-            # Tiene ambos: 1.234,56 -> quitar puntos, coma a punto
-            monto_str = monto_str.replace('.', '').replace(',', '.')
-        elif '.' in monto_str:
-            # Solo puntos: podría ser 1.234.567 (miles) o 1234.56 (decimal)
-            # Contar puntos: si hay más de uno, son separadores de miles
-            if monto_str.count('.') > 1:
-                monto_str = monto_str.replace('.', '')
-            # Si solo hay un punto, asumimos que es decimal (formato internacional)
-        elif ',' in monto_str:
-            # Solo coma: 1234,56 -> 1234.56
-            monto_str = monto_str.replace(',', '.')
-        
-        try:
-            return float(monto_str)
-        except ValueError:
-            self.logger.warning(f"No se pudo convertir monto: {monto}")
-            return 0.0
+        return normalizar_monto(monto)
+    
+    def normalizar_ruts(self, serie: pd.Series) -> pd.Series:
+        """Versión columnar de normalizar_rut (columna completa)."""
+        return normalizar_ruts(serie)
+    
+    def normalizar_montos(self, serie: pd.Series) -> pd.Series:
+        """Versión columnar de normalizar_monto (columna completa)."""
+        return normalizar_montos(serie)
     
     def normalizar_fecha(self, fecha, formato: str = None) -> Optional[str]:
         """
@@ -252,8 +229,10 @@ class ERPStrategy(ABC):
         """
         Lee un archivo Excel con configuración estándar.
         
+        Las lecturas desde un path pasan por el caché de parseo por contenido.
+        
         Args:
-            file: Archivo Excel
+            file: Archivo Excel (path, pd.ExcelFile o file-like)
             sheet_name: Nombre o índice de la hoja
             header: Fila del encabezado
             **kwargs: Argumentos adicionales para read_excel
@@ -261,8 +240,9 @@ class ERPStrategy(ABC):
         Returns:
             DataFrame
         """
-        return pd.read_excel(
+        return leer_excel_cacheado(
             file,
+            version=f'{self.__class__.__name__}:{self.version_lectura}',
             sheet_name=sheet_name,
             header=header,
             **kwargs
@@ -126,10 +126,10 @@ class BukStrategy(ERPStrategy):
     def _normalizar_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normaliza las columnas estándar del DataFrame."""
         if 'rut' in df.columns:
-            df['rut'] = df['rut'].apply(self.normalizar_rut)
+            df['rut'] = self.normalizar_ruts(df['rut'])
         
         if 'monto' in df.columns:
-            df['monto'] = df['monto'].apply(self.normalizar_monto)
+            df['monto'] = self.normalizar_montos(df['monto'])
         
         for col in ['nombre', 'concepto']:
             if col in df.columns:
@@ -11,6 +11,8 @@ Asume un formato básico de Excel con columnas estándar.
 import pandas as pd
 from typing import Optional
 
+from apps.validador.utils.deteccion_csv import detectar_formato_csv
+
 from .base import ERPStrategy, ParseResult, FormatoEsperado
 from .factory import ERPFactory
 
@@ -152,50 +154,52 @@ class GenericStrategy(ERPStrategy):
             
             for hoja in hojas:
                 if hoja.lower() in hojas_prioritarias:
-                    return pd.read_excel(file, sheet_name=hoja)
+                    return self.leer_excel(file, sheet_name=hoja)
             
             # Si no encuentra, usar primera hoja
-            return pd.read_excel(file, sheet_name=0)
+            return self.leer_excel(file, sheet_name=0)
             
         except Exception:
             # Fallback simple
             return self.leer_excel(file, sheet_name=0)
     
-    def _leer_csv_inteligente(self, file) -> pd.DataFrame:
+    def _leer_csv_inteligente(self, file, chunksize: int = None):
         """
-        Lee CSV detectando automáticamente delimitador y encoding.
+        Lee CSV detectando automáticamente delimitador, encoding y fila de header.
+        
+        La detección usa solo los primeros KB del archivo (detectar_formato_csv);
+        el archivo se parsea una sola vez con el formato detectado.
+        
+        Args:
+            file: Archivo CSV (path o file-like)
+            chunksize: Si se entrega, retorna un iterador de DataFrames por lotes
+        
+        Returns:
+            DataFrame, o TextFileReader si chunksize
         """
-        # Intentar diferentes configuraciones
-        configuraciones = [
-            {'delimiter': ',', 'encoding': 'utf-8'},
-            {'delimiter': ';', 'encoding': 'utf-8'},
-            {'delimiter': ',', 'encoding': 'latin-1'},
-            {'delimiter': ';', 'encoding': 'latin-1'},
-            {'delimiter': '\t', 'encoding': 'utf-8'},
-        ]
-        
-        for config in configuraciones:
-            try:
-                file.seek(0)  # Resetear posición del archivo
-                df = self.leer_csv(file, **config)
-                if len(df.columns) > 1:  # Si parseó correctamente
-                    return df
-            except Exception:
-                continue
-        
-        # Último intento con configuración por defecto
-        file.seek(0)
-        return self.leer_csv(file)
+        formato = detectar_formato_csv(file)
+        self.logger.debug(
+            f"CSV detectado: delimitador={formato.delimitador!r}, "
+            f"encoding={formato.encoding}, header={formato.fila_header}"
+        )
+        
+        return self.leer_csv(
+            file,
+            delimiter=formato.delimitador,
+            encoding=formato.encoding,
+            header=formato.fila_header,
+            chunksize=chunksize,
+        )
     
     def _normalizar_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normaliza las columnas estándar del DataFrame."""
         # Normalizar RUT
         if 'rut' in df.columns:
-            df['rut'] = df['rut'].apply(self.normalizar_rut)
+            df['rut'] = self.normalizar_ruts(df['rut'])
         
         # Normalizar montos
         if 'monto' in df.columns:
-            df['monto'] = df['monto'].apply(self.normalizar_monto)
+            df['monto'] = self.normalizar_montos(df['monto'])
         
         # Limpiar textos
         for col in ['nombre', 'concepto']:
@@ -134,7 +134,7 @@ class SAPStrategy(ERPStrategy):
             df['rut'] = df['rut'].apply(self._normalizar_identificador_sap)
         
         if 'monto' in df.columns:
-            df['monto'] = df['monto'].apply(self.normalizar_monto)
+            df['monto'] = self.normalizar_montos(df['monto'])
         
         for col in ['nombre', 'concepto']:
             if col in df.columns:
@@ -10,9 +10,12 @@ Tipos de archivo soportados:
 - centralizado: Centralizado de nómina
 """
 
+import numpy as np
 import pandas as pd
 from typing import Optional
-from datetime import datetime
+
+from apps.validador.utils.normalizacion import parse_fecha
+from apps.validador.utils.normalizacion_vectorial import parse_fechas
 
 from .base import ERPStrategy, ParseResult, FormatoEsperado
 from .factory import ERPFactory
@@ -186,6 +189,9 @@ class TalanaStrategy(ERPStrategy):
         - Datos desde fila 4 (índice 3)
         - Hojas: "Altas y Bajas", "Ausentismos", "Vacaciones"
         
+        Las tres hojas se leen en una sola pasada y cada una se procesa por
+        columnas (sin iterrows).
+        
         Retorna dict con listas de registros normalizados por tipo.
         """
         warnings = []
@@ -204,38 +210,42 @@ class TalanaStrategy(ERPStrategy):
         except Exception as e:
             return ParseResult.fail(f"Error al abrir archivo Excel: {str(e)}")
         
-        # Procesar hoja Altas y Bajas
-        if self.HOJA_ALTAS_BAJAS in hojas_disponibles:
-            try:
-                registros, warns = self._parse_hoja_altas_bajas(excel_file)
-                resultado['altas_bajas'] = registros
-                warnings.extend(warns)
-            except Exception as e:
-                warnings.append(f"Error procesando '{self.HOJA_ALTAS_BAJAS}': {str(e)}")
-        else:
-            warnings.append(f"Hoja '{self.HOJA_ALTAS_BAJAS}' no encontrada")
-        
-        # Procesar hoja Ausentismos
-        if self.HOJA_AUSENTISMOS in hojas_disponibles:
-            try:
-                registros, warns = self._parse_hoja_ausentismos(excel_file)
-                resultado['ausentismos'] = registros
-                warnings.extend(warns)
-            except Exception as e:
-                warnings.append(f"Error procesando '{self.HOJA_AUSENTISMOS}': {str(e)}")
-        else:
-            warnings.append(f"Hoja '{self.HOJA_AUSENTISMOS}' no encontrada")
+        parsers_hoja = [
+            (self.HOJA_ALTAS_BAJAS, 'altas_bajas', self._parse_hoja_altas_bajas),
+            (self.HOJA_AUSENTISMOS, 'ausentismos', self._parse_hoja_ausentismos),
+            (self.HOJA_VACACIONES, 'vacaciones', self._parse_hoja_vacaciones),
+        ]
         
-        # Procesar hoja Vacaciones
-        if self.HOJA_VACACIONES in hojas_disponibles:
+        # Una sola lectura para todas las hojas presentes
+        hojas = [hoja for hoja, _, _ in parsers_hoja if hoja in hojas_disponibles]
+        try:
+            dataframes = self.leer_excel(
+                excel_file,
+                sheet_name=hojas,
+                header=self.MOVIMIENTOS_HEADER_ROW
+            ) if hojas else {}
+        except Exception:
+            # Alguna hoja no se pudo leer: se leen por separado para aislar el error
+            dataframes = {}
+        
+        for hoja, clave, parser in parsers_hoja:
+            if hoja not in hojas_disponibles:
+                warnings.append(f"Hoja '{hoja}' no encontrada")
+                continue
+            
             try:
-                registros, warns = self._parse_hoja_vacaciones(excel_file)
-                resultado['vacaciones'] = registros
+                df = dataframes.get(hoja)
+                if df is None:
+                    df = self.leer_excel(
+                        excel_file,
+                        sheet_name=hoja,
+                        header=self.MOVIMIENTOS_HEADER_ROW
+                    )
+                registros, warns = parser(df)
+                resultado[clave] = registros
                 warnings.extend(warns)
             except Exception as e:
-                warnings.append(f"Error procesando '{self.HOJA_VACACIONES}': {str(e)}")
-        else:
-            warnings.append(f"Hoja '{self.HOJA_VACACIONES}' no encontrada")
+                warnings.append(f"Error procesando '{hoja}': {str(e)}")
         
         resultado['warnings'] = warnings
         
@@ -254,180 +264,195 @@ class TalanaStrategy(ERPStrategy):
         
         return ParseResult.ok(resultado, warnings)
     
-    def _parse_hoja_altas_bajas(self, excel_file: pd.ExcelFile) -> tuple[list[dict], list[str]]:
+    def _parse_hoja_altas_bajas(self, df: pd.DataFrame) -> tuple[list[dict], list[str]]:
         """
         Parsea hoja "Altas y Bajas".
         
         Aplica regla RN-001: Si baja + plazo fijo + sin motivo → ignorar
         """
-        warnings = []
-        registros = []
+        df = self.mapear_columnas(df, self.MAPEO_ALTAS_BAJAS)
+        filas = self._filas_excel(df)
         
-        df = pd.read_excel(
-            excel_file,
-            sheet_name=self.HOJA_ALTAS_BAJAS,
-            header=self.MOVIMIENTOS_HEADER_ROW
-        )
+        ruts = self.normalizar_ruts(self._columna(df, 'rut', ''))
+        con_rut = ruts != ''
         
-        # Mapear columnas
-        df = self.mapear_columnas(df, self.MAPEO_ALTAS_BAJAS)
+        tipo_mov = self._columna(df, 'tipo_movimiento', '').astype(str).str.strip().str.lower()
+        tipo_contrato = self._columna(df, 'tipo_contrato', '').astype(str).str.strip()
+        causal = self._textos(self._columna(df, 'causal'))
         
-        for idx, row in df.iterrows():
-            rut = self.normalizar_rut(row.get('rut', ''))
-            if not rut:
-                continue
-            
-            nombre = self.limpiar_texto(row.get('nombre', ''))
-            tipo_mov = str(row.get('tipo_movimiento', '')).strip().lower()
-            tipo_contrato = str(row.get('tipo_contrato', '')).strip()
-            causal = str(row.get('causal', '')).strip() if pd.notna(row.get('causal')) else ''
-            
-            # Determinar tipo (ingreso o finiquito)
-            if tipo_mov == 'alta':
-                tipo = 'ingreso'
-                fecha_inicio = self._parse_fecha(row.get('fecha_inicio'))
-                fecha_fin = None
-            elif tipo_mov == 'baja':
-                tipo = 'finiquito'
-                fecha_inicio = None
-                fecha_fin = self._parse_fecha(row.get('fecha_fin'))
-                
-                # Regla RN-001: Ignorar baja de plazo fijo sin motivo
-                if tipo_contrato.lower() == 'plazo fijo' and not causal:
-                    warnings.append(
-                        f"Ignorando baja fila {idx + self.MOVIMIENTOS_HEADER_ROW + 2}: "
-                        f"Plazo Fijo sin motivo (vencimiento contrato)"
-                    )
-                    continue
-            else:
-                warnings.append(f"Tipo de movimiento desconocido en fila {idx + self.MOVIMIENTOS_HEADER_ROW + 2}: '{tipo_mov}'")
-                continue
-            
-            registros.append({
-                'tipo': tipo,
-                'rut': rut,
-                'nombre': nombre,
-                'fecha_inicio': fecha_inicio,
-                'fecha_fin': fecha_fin,
-                'tipo_contrato': tipo_contrato,
-                'causal': causal,
-                'tipo_licencia': '',
-                'dias': None,
-                'hoja_origen': self.HOJA_ALTAS_BAJAS,
-                'datos_raw': row.to_dict() if hasattr(row, 'to_dict') else dict(row),
-            })
+        es_alta = con_rut & (tipo_mov == 'alta')
+        es_baja = con_rut & (tipo_mov == 'baja')
+        
+        # Regla RN-001: Ignorar baja de plazo fijo sin motivo
+        rn001 = es_baja & (tipo_contrato.str.lower() == 'plazo fijo') & (causal == '')
+        desconocido = con_rut & ~es_alta & ~es_baja
+        
+        avisos = {
+            fila: f"Ignorando baja fila {fila}: Plazo Fijo sin motivo (vencimiento contrato)"
+            for fila in filas[rn001]
+        }
+        avisos.update(
+            (fila, f"Tipo de movimiento desconocido en fila {fila}: '{tipo}'")
+            for fila, tipo in zip(filas[desconocido], tipo_mov[desconocido])
+        )
+        warnings = [avisos[fila] for fila in sorted(avisos)]
+        
+        validos = es_alta | (es_baja & ~rn001)
+        
+        # Ingresos solo tienen fecha de inicio y finiquitos solo de término
+        fecha_inicio = pd.Series([None] * len(df), index=df.index, dtype=object)
+        fecha_inicio[es_alta] = self._parse_fechas(self._columna(df, 'fecha_inicio')[es_alta])
+        fecha_fin = pd.Series([None] * len(df), index=df.index, dtype=object)
+        fecha_fin[es_baja] = self._parse_fechas(self._columna(df, 'fecha_fin')[es_baja])
+        
+        registros = self._registros_movimiento(
+            df,
+            validos,
+            tipo=es_alta.map({True: 'ingreso', False: 'finiquito'}),
+            rut=ruts,
+            nombre=self._textos(self._columna(df, 'nombre')),
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            tipo_contrato=tipo_contrato,
+            causal=causal,
+            tipo_licencia='',
+            dias=None,
+            hoja_origen=self.HOJA_ALTAS_BAJAS,
+        )
         
         return registros, warnings
     
-    def _parse_hoja_ausentismos(self, excel_file: pd.ExcelFile) -> tuple[list[dict], list[str]]:
+    def _parse_hoja_ausentismos(self, df: pd.DataFrame) -> tuple[list[dict], list[str]]:
         """Parsea hoja "Ausentismos" (licencias, permisos, ausencias)."""
-        warnings = []
-        registros = []
+        df = self.mapear_columnas(df, self.MAPEO_AUSENTISMOS)
+        filas = self._filas_excel(df)
         
-        df = pd.read_excel(
-            excel_file,
-            sheet_name=self.HOJA_AUSENTISMOS,
-            header=self.MOVIMIENTOS_HEADER_ROW
-        )
+        ruts = self.normalizar_ruts(self._columna(df, 'rut', ''))
+        con_rut = ruts != ''
         
-        df = self.mapear_columnas(df, self.MAPEO_AUSENTISMOS)
+        tipo_ausentismo_raw = (
+            self._columna(df, 'tipo_ausentismo', '').astype(str).str.strip().str.lower()
+        )
         
-        for idx, row in df.iterrows():
-            rut = self.normalizar_rut(row.get('rut', ''))
-            if not rut:
-                continue
-            
-            nombre = self.limpiar_texto(row.get('nombre', ''))
-            tipo_ausentismo_raw = str(row.get('tipo_ausentismo', '')).strip().lower()
-            
-            # Mapear tipo de ausentismo
-            tipo, tipo_licencia = self.MAPEO_TIPO_AUSENTISMO.get(
-                tipo_ausentismo_raw, ('otro', tipo_ausentismo_raw)
-            )
-            
-            if tipo == 'otro':
-                warnings.append(
-                    f"Tipo de ausentismo no reconocido en fila {idx + self.MOVIMIENTOS_HEADER_ROW + 2}: "
-                    f"'{tipo_ausentismo_raw}'"
-                )
-            
-            dias = self._parse_int(row.get('dias'))
-            
-            registros.append({
-                'tipo': tipo,
-                'rut': rut,
-                'nombre': nombre,
-                'fecha_inicio': self._parse_fecha(row.get('fecha_inicio')),
-                'fecha_fin': self._parse_fecha(row.get('fecha_fin')),
-                'tipo_contrato': '',
-                'causal': '',
-                'tipo_licencia': tipo_licencia,
-                'dias': dias,
-                'hoja_origen': self.HOJA_AUSENTISMOS,
-                'datos_raw': row.to_dict() if hasattr(row, 'to_dict') else dict(row),
-            })
+        # Mapear tipo de ausentismo
+        tipo = tipo_ausentismo_raw.map(
+            {raw: tipo for raw, (tipo, _) in self.MAPEO_TIPO_AUSENTISMO.items()}
+        ).fillna('otro')
+        tipo_licencia = tipo_ausentismo_raw.map(
+            {raw: licencia for raw, (_, licencia) in self.MAPEO_TIPO_AUSENTISMO.items()}
+        ).fillna(tipo_ausentismo_raw)
+        
+        no_reconocido = con_rut & (tipo == 'otro')
+        warnings = [
+            f"Tipo de ausentismo no reconocido en fila {fila}: '{raw}'"
+            for fila, raw in zip(filas[no_reconocido], tipo_ausentismo_raw[no_reconocido])
+        ]
+        
+        registros = self._registros_movimiento(
+            df,
+            con_rut,
+            tipo=tipo,
+            rut=ruts,
+            nombre=self._textos(self._columna(df, 'nombre')),
+            fecha_inicio=self._parse_fechas(self._columna(df, 'fecha_inicio')),
+            fecha_fin=self._parse_fechas(self._columna(df, 'fecha_fin')),
+            tipo_contrato='',
+            causal='',
+            tipo_licencia=tipo_licencia,
+            dias=self._parse_ints(self._columna(df, 'dias')),
+            hoja_origen=self.HOJA_AUSENTISMOS,
+        )
         
         return registros, warnings
     
-    def _parse_hoja_vacaciones(self, excel_file: pd.ExcelFile) -> tuple[list[dict], list[str]]:
+    def _parse_hoja_vacaciones(self, df: pd.DataFrame) -> tuple[list[dict], list[str]]:
         """Parsea hoja "Vacaciones"."""
-        warnings = []
-        registros = []
-        
-        df = pd.read_excel(
-            excel_file,
-            sheet_name=self.HOJA_VACACIONES,
-            header=self.MOVIMIENTOS_HEADER_ROW
-        )
-        
         df = self.mapear_columnas(df, self.MAPEO_VACACIONES)
         
-        for idx, row in df.iterrows():
-            rut = self.normalizar_rut(row.get('rut', ''))
-            if not rut:
-                continue
-            
-            nombre = self.limpiar_texto(row.get('nombre', ''))
-            dias = self._parse_int(row.get('dias'))
-            
-            registros.append({
-                'tipo': 'vacaciones',
-                'rut': rut,
-                'nombre': nombre,
-                'fecha_inicio': self._parse_fecha(row.get('fecha_inicio')),
-                'fecha_fin': self._parse_fecha(row.get('fecha_fin')),
-                'tipo_contrato': '',
-                'causal': '',
-                'tipo_licencia': '',
-                'dias': dias,
-                'hoja_origen': self.HOJA_VACACIONES,
-                'datos_raw': row.to_dict() if hasattr(row, 'to_dict') else dict(row),
-            })
+        ruts = self.normalizar_ruts(self._columna(df, 'rut', ''))
+        
+        registros = self._registros_movimiento(
+            df,
+            ruts != '',
+            tipo='vacaciones',
+            rut=ruts,
+            nombre=self._textos(self._columna(df, 'nombre')),
+            fecha_inicio=self._parse_fechas(self._columna(df, 'fecha_inicio')),
+            fecha_fin=self._parse_fechas(self._columna(df, 'fecha_fin')),
+            tipo_contrato='',
+            causal='',
+            tipo_licencia='',
+            dias=self._parse_ints(self._columna(df, 'dias')),
+            hoja_origen=self.HOJA_VACACIONES,
+        )
         
-        return registros, warnings
+        return registros, []
     
-    def _parse_fecha(self, valor) -> Optional[str]:
-        """Convierte valor a fecha ISO (YYYY-MM-DD) o None."""
-        if pd.isna(valor) or valor is None or str(valor).strip() == '':
-            return None
-        
-        if isinstance(valor, datetime):
-            return valor.strftime('%Y-%m-%d')
+    def _registros_movimiento(self, df: pd.DataFrame, mascara: pd.Series, **campos) -> list[dict]:
+        """
+        Arma los registros normalizados de las filas seleccionadas.
         
-        if isinstance(valor, pd.Timestamp):
-            return valor.strftime('%Y-%m-%d')
+        Args:
+            df: Hoja con columnas ya mapeadas (fuente de datos_raw)
+            mascara: Filas a emitir
+            **campos: Serie alineada con df o valor constante por campo
         
-        # Intentar parsear string
-        valor_str = str(valor).strip()
-        formatos = ['%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d']
+        Returns:
+            Lista de dicts (uno por fila) con los campos y 'datos_raw'
+        """
+        filas = df[mascara]
+        
+        # Columnas como listas y un zip por fila: evita to_dict('records'),
+        # que convierte celda por celda
+        valores = {}
+        for campo, valor in campos.items():
+            if isinstance(valor, pd.Series):
+                valor = valor[mascara]
+                # Nulos como None (no NaN), igual que el parseo por fila
+                valores[campo] = valor.astype(object).where(valor.notna(), None).tolist()
+            else:
+                valores[campo] = [valor] * len(filas)
         
-        for fmt in formatos:
-            try:
-                return datetime.strptime(valor_str, fmt).strftime('%Y-%m-%d')
-            except ValueError:
-                continue
+        columnas_raw = list(filas.columns)
+        valores['datos_raw'] = [
+            dict(zip(columnas_raw, fila))
+            for fila in zip(*(filas[col].tolist() for col in columnas_raw))
+        ] if columnas_raw else [{} for _ in range(len(filas))]
         
-        return None
+        nombres = list(valores)
+        return [dict(zip(nombres, fila)) for fila in zip(*valores.values())]
+    
+    def _columna(self, df: pd.DataFrame, nombre: str, default=None) -> pd.Series:
+        """Columna de la hoja, o `default` en todas las filas si no existe."""
+        if nombre in df.columns:
+            return df[nombre]
+        return pd.Series(default, index=df.index, dtype=object)
+    
+    def _filas_excel(self, df: pd.DataFrame) -> pd.Series:
+        """Número de fila en Excel (1-based, contando headers) de cada fila."""
+        return pd.Series(df.index + self.MOVIMIENTOS_HEADER_ROW + 2, index=df.index)
+    
+    def _textos(self, serie: pd.Series) -> pd.Series:
+        """Versión columnar de limpiar_texto."""
+        return serie.astype(str).str.strip().where(serie.notna(), '')
+    
+    def _parse_fechas(self, serie: pd.Series) -> pd.Series:
+        """Versión columnar de _parse_fecha: fecha ISO (YYYY-MM-DD) o None."""
+        return parse_fechas(serie).map(lambda fecha: fecha.isoformat() if fecha else None)
+    
+    def _parse_ints(self, serie: pd.Series) -> pd.Series:
+        """Versión columnar de _parse_int: entero o None."""
+        numeros = pd.to_numeric(serie, errors='coerce').astype('float64')
+        validos = np.isfinite(numeros)
+        
+        resultado = pd.Series([None] * len(serie), index=serie.index, dtype=object)
+        resultado[validos] = np.trunc(numeros[validos]).astype(np.int64).tolist()
+        return resultado
+    
+    def _parse_fecha(self, valor) -> Optional[str]:
+        """Convierte valor a fecha ISO (YYYY-MM-DD) o None."""
+        fecha = parse_fecha(valor)
+        return fecha.isoformat() if fecha else None
     
     def _parse_int(self, valor) -> Optional[int]:
         """Convierte valor a entero o None."""
@@ -451,10 +476,10 @@ class TalanaStrategy(ERPStrategy):
         
         # Para centralizado, normalizar montos pero RUT puede no existir
         if 'monto' in df.columns:
-            df['monto'] = df['monto'].apply(self.normalizar_monto)
+            df['monto'] = self.normalizar_montos(df['monto'])
         
         if 'rut' in df.columns:
-            df['rut'] = df['rut'].apply(self.normalizar_rut)
+            df['rut'] = self.normalizar_ruts(df['rut'])
         
         es_valido, errores = self.validar_estructura(df, 'centralizado')
         if not es_valido:
@@ -466,11 +491,11 @@ class TalanaStrategy(ERPStrategy):
         """Normaliza las columnas estándar del DataFrame."""
         # Normalizar RUT
         if 'rut' in df.columns:
-            df['rut'] = df['rut'].apply(self.normalizar_rut)
+            df['rut'] = self.normalizar_ruts(df['rut'])
         
         # Normalizar montos
         if 'monto' in df.columns:
-            df['monto'] = df['monto'].apply(self.normalizar_monto)
+            df['monto'] = self.normalizar_montos(df['monto'])
         
         # Limpiar textos
         if 'nombre' in df.columns:
@@ -535,7 +560,7 @@ class TalanaStrategy(ERPStrategy):
         if tipo_archivo in ['libro_remuneraciones', 'movimientos_mes']:
             # Verificar que hay RUTs válidos
             if 'rut' in df.columns:
-                ruts_validos = df['rut'].apply(lambda x: bool(x) and len(str(x)) > 5)
+                ruts_validos = df['rut'].notna() & (df['rut'].astype(str).str.len() > 5)
                 if not ruts_validos.any():
                     errores.append("No se encontraron RUTs válidos en el archivo")
         
@@ -0,0 +1,302 @@
+"""
+Ingesta declarativa de archivos de movimientos del analista.
+
+Asistencias, Finiquitos e Ingresos comparten el mismo flujo: detectar
+columnas por substrings del header, normalizar RUT, parsear fechas,
+clasificar el tipo de movimiento y cargar MovimientoAnalista. Cada tipo de
+archivo se describe con una EspecificacionMovimientos (configuración) y el
+motor lo procesa por columnas: un tipo nuevo de archivo del analista solo
+requiere agregar su especificación a ESPECIFICACIONES_MOVIMIENTOS.
+
+Uso:
+    from apps.validador.services.ingesta_movimientos import (
+        ESPECIFICACIONES_MOVIMIENTOS, IngestaMovimientos,
+    )
+    
+    especificacion = ESPECIFICACIONES_MOVIMIENTOS['finiquitos']
+    resultado = IngestaMovimientos.cargar(archivo, df, especificacion)
+    # {'filas': 120, 'omitidas': 3}
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from apps.validador.services.bulk_loader import BulkLoader
+from apps.validador.utils.normalizacion_vectorial import normalizar_ruts, parse_fechas
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ColumnaMovimiento:
+    """
+    Regla de detección de una columna del archivo.
+    
+    Un header (en minúsculas) corresponde al campo si contiene todos los
+    substrings de `contiene` y, si `alguno` no está vacío, al menos uno de
+    ellos.
+    
+    Attributes:
+        campo: Campo de MovimientoAnalista que alimenta la columna
+        contiene: Substrings obligatorios del header
+        alguno: Substrings alternativos (basta uno)
+        tipo: Conversión de la columna: 'rut', 'texto' o 'fecha'
+    """
+    campo: str
+    contiene: Tuple[str, ...] = ()
+    alguno: Tuple[str, ...] = ()
+    tipo: str = 'texto'
+    
+    def coincide(self, header: str) -> bool:
+        return (
+            all(s in header for s in self.contiene)
+            and (not self.alguno or any(s in header for s in self.alguno))
+        )
+
+
+@dataclass(frozen=True)
+class EspecificacionMovimientos:
+    """
+    Descripción de un tipo de archivo de movimientos del analista.
+    
+    Attributes:
+        origen: Valor de MovimientoAnalista.origen
+        columnas: Reglas de detección, en orden de prioridad por header
+        tipo: Tipo de movimiento fijo (si el archivo no lo informa por fila)
+        campo_clasificacion: Campo cuyo texto determina el tipo por fila
+        clasificacion: Pares (substring, tipo) en orden de prioridad
+        tipo_defecto: Tipo cuando ningún substring coincide
+        calcular_dias: Calcular días entre fecha_inicio y fecha_fin (inclusive)
+    """
+    origen: str
+    columnas: Tuple[ColumnaMovimiento, ...]
+    tipo: Optional[str] = None
+    campo_clasificacion: Optional[str] = None
+    clasificacion: Tuple[Tuple[str, str], ...] = ()
+    tipo_defecto: str = 'otro'
+    calcular_dias: bool = False
+
+
+# Tipo de ausentismo informado por el cliente -> tipo de movimiento
+MAPEO_TIPO_AUSENTISMO = (
+    ('licencia', 'licencia'),
+    ('licencia medica', 'licencia'),
+    ('licencia médica', 'licencia'),
+    ('licencia maternal', 'licencia'),
+    ('vacacion', 'vacaciones'),
+    ('vacaciones', 'vacaciones'),
+    ('permiso', 'permiso'),
+    ('permiso con goce', 'permiso'),
+    ('permiso sin goce', 'permiso'),
+    ('ausencia', 'ausencia'),
+    ('ausencia no justificada', 'ausencia'),
+    ('ausencia injustificada', 'ausencia'),
+    ('falta', 'ausencia'),
+)
+
+COLUMNA_RUT = ColumnaMovimiento('rut', contiene=('rut',), tipo='rut')
+COLUMNA_NOMBRE = ColumnaMovimiento('nombre', contiene=('nombre',))
+
+ESPECIFICACIONES_MOVIMIENTOS: Dict[str, EspecificacionMovimientos] = {
+    'asistencias': EspecificacionMovimientos(
+        origen='asistencias',
+        columnas=(
+            COLUMNA_RUT,
+            COLUMNA_NOMBRE,
+            ColumnaMovimiento('fecha_inicio', contiene=('inicio',), alguno=('fecha', 'ausencia'), tipo='fecha'),
+            ColumnaMovimiento('fecha_fin', contiene=('fin',), alguno=('fecha', 'ausencia'), tipo='fecha'),
+            ColumnaMovimiento('tipo_ausentismo', contiene=('tipo', 'ausentismo')),
+        ),
+        campo_clasificacion='tipo_ausentismo',
+        clasificacion=MAPEO_TIPO_AUSENTISMO,
+        calcular_dias=True,
+    ),
+    'finiquitos': EspecificacionMovimientos(
+        origen='finiquitos',
+        columnas=(
+            COLUMNA_RUT,
+            COLUMNA_NOMBRE,
+            # fecha_fin = fecha de retiro
+            ColumnaMovimiento('fecha_fin', contiene=('fecha', 'retiro'), tipo='fecha'),
+            ColumnaMovimiento('causal', alguno=('motivo', 'causal')),
+        ),
+        tipo='baja',
+    ),
+    'ingresos': EspecificacionMovimientos(
+        origen='ingresos',
+        columnas=(
+            COLUMNA_RUT,
+            COLUMNA_NOMBRE,
+            # fecha_inicio = fecha de ingreso
+            ColumnaMovimiento('fecha_inicio', contiene=('fecha', 'ingreso'), tipo='fecha'),
+        ),
+        tipo='alta',
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _compilar_clasificacion(clasificacion: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[re.Pattern, str], ...]:
+    """
+    Una regex por tipo con todos sus substrings, en el orden en que aparece
+    cada tipo (mismo resultado que recorrer los pares en orden).
+    """
+    substrings_por_tipo: Dict[str, list] = {}
+    for substring, tipo in clasificacion:
+        substrings_por_tipo.setdefault(tipo, []).append(re.escape(substring))
+    return tuple(
+        (re.compile('|'.join(substrings)), tipo)
+        for tipo, substrings in substrings_por_tipo.items()
+    )
+
+
+class IngestaMovimientos:
+    """
+    Motor de ingesta por columnas de archivos de movimientos del analista.
+    """
+    
+    @classmethod
+    def detectar_columnas(cls, columnas: Iterable, especificacion: EspecificacionMovimientos) -> Dict[str, str]:
+        """
+        Asigna cada header a la primera regla que coincide.
+        
+        Returns:
+            Dict campo -> nombre de columna (si varias coinciden, la última)
+        """
+        col_map = {}
+        for col in columnas:
+            header = str(col).lower().strip()
+            for regla in especificacion.columnas:
+                if regla.coincide(header):
+                    col_map[regla.campo] = col
+                    break
+        return col_map
+    
+    @classmethod
+    def clasificar(cls, textos: pd.Series, especificacion: EspecificacionMovimientos) -> pd.Series:
+        """
+        Tipo de movimiento de cada texto según la tabla de clasificación.
+        
+        Se clasifica cada valor distinto una sola vez.
+        """
+        patrones = _compilar_clasificacion(especificacion.clasificacion)
+        codigos, unicos = pd.factorize(textos.str.lower())
+        
+        tipos_unicos = []
+        for texto in unicos:
+            tipos_unicos.append(next(
+                (tipo for patron, tipo in patrones if patron.search(texto)),
+                especificacion.tipo_defecto,
+            ))
+        
+        tipos = np.array(tipos_unicos + [especificacion.tipo_defecto], dtype=object)
+        return pd.Series(tipos[codigos], index=textos.index, dtype=object)
+    
+    @classmethod
+    def extraer(cls, df: pd.DataFrame, especificacion: EspecificacionMovimientos) -> Tuple[pd.DataFrame, int]:
+        """
+        Convierte el archivo en columnas de MovimientoAnalista.
+        
+        Args:
+            df: Archivo leído (header en la primera fila)
+            especificacion: Descripción del tipo de archivo
+        
+        Returns:
+            Tuple (DataFrame con un campo por columna más 'tipo' y 'fila_raw',
+            solo filas con RUT; cantidad de filas omitidas sin RUT)
+        
+        Raises:
+            ValueError: Si no se encuentra la columna de RUT
+        """
+        col_map = cls.detectar_columnas(df.columns, especificacion)
+        if 'rut' not in col_map:
+            raise ValueError("No se encontró columna de RUT")
+        
+        ruts = normalizar_ruts(df[col_map['rut']])
+        con_rut = (ruts != '').to_numpy()
+        df = df[con_rut]
+        
+        campos = {
+            'rut': ruts[con_rut],
+            # Posición de la fila en el archivo (ver DatosRawArchivo)
+            'fila_raw': pd.Series(np.flatnonzero(con_rut), index=df.index),
+        }
+        for regla in especificacion.columnas:
+            if regla.tipo == 'rut':
+                continue
+            col = col_map.get(regla.campo)
+            if regla.tipo == 'fecha':
+                campos[regla.campo] = (
+                    parse_fechas(df[col]) if col is not None
+                    else pd.Series([None] * len(df), index=df.index, dtype=object)
+                )
+            else:
+                campos[regla.campo] = (
+                    df[col].where(df[col].notna(), '').astype(str).str.strip() if col is not None
+                    else pd.Series('', index=df.index, dtype=object)
+                )
+        
+        if especificacion.campo_clasificacion:
+            campos['tipo'] = cls.clasificar(campos[especificacion.campo_clasificacion], especificacion)
+        else:
+            campos['tipo'] = pd.Series(especificacion.tipo, index=df.index, dtype=object)
+        
+        if especificacion.calcular_dias:
+            campos['dias'] = cls._dias(campos['fecha_inicio'], campos['fecha_fin'])
+        
+        return pd.DataFrame(campos), int((~con_rut).sum())
+    
+    @classmethod
+    def cargar(cls, archivo, df: pd.DataFrame, especificacion: EspecificacionMovimientos) -> Dict[str, int]:
+        """
+        Reemplaza los MovimientoAnalista del archivo por los de `df`.
+        
+        Args:
+            archivo: ArchivoAnalista de origen
+            df: Archivo leído
+            especificacion: Descripción del tipo de archivo
+        
+        Returns:
+            Dict con 'filas' (movimientos creados) y 'omitidas' (sin RUT)
+        """
+        from apps.validador.models import MovimientoAnalista
+        
+        campos, omitidas = cls.extraer(df, especificacion)
+        
+        # Eliminar movimientos anteriores de este archivo (para re-procesamiento)
+        MovimientoAnalista.objects.filter(archivo_analista=archivo).delete()
+        
+        cierre = archivo.cierre
+        columnas = {campo: campos[campo].tolist() for campo in campos.columns}
+        movimientos = (
+            MovimientoAnalista(
+                cierre=cierre,
+                archivo_analista=archivo,
+                origen=especificacion.origen,
+                **dict(zip(columnas, valores)),
+            )
+            for valores in zip(*columnas.values())
+        )
+        
+        # Carga masiva (COPY en PostgreSQL)
+        filas = BulkLoader.cargar(MovimientoAnalista, movimientos) if len(campos) else 0
+        
+        return {'filas': filas, 'omitidas': omitidas}
+    
+    @staticmethod
+    def _dias(inicio: pd.Series, fin: pd.Series) -> pd.Series:
+        """Días entre fechas (inclusive), None si falta alguna."""
+        dias = pd.Series([None] * len(inicio), index=inicio.index, dtype=object)
+        ambas = (inicio.notna() & fin.notna()).to_numpy()
+        if ambas.any():
+            # datetime64[D] cubre fechas fuera del rango de pd.Timestamp
+            desde = np.array(inicio[ambas].tolist(), dtype='datetime64[D]')
+            hasta = np.array(fin[ambas].tolist(), dtype='datetime64[D]')
+            dias[ambas] = ((hasta - desde).astype(np.int64) + 1).tolist()
+        return dias
@@ -7,14 +7,22 @@ Maneja la lógica de negocio para:
 - Procesamiento del libro completo
 """
 
-from typing import List, Dict, Optional
+import hashlib
+import json
+import os
+from typing import List, Dict, Optional, Sequence
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
+from django.utils.text import slugify
 
 from .base import BaseService, ServiceResult
-from ..models import ArchivoERP, ConceptoLibro, EmpleadoLibro, Cierre
-from ..parsers import ParserFactory
+from .bulk_loader import BulkLoader
+from .catalogo_service import CatalogoService
+from ..models import ArchivoERP, ConceptoLibro, EmpleadoLibro, EsquemaLibro, Cierre
+from ..parsers import LibroCompacto, ParserFactory
+from ..parsers.base import HeaderInfo
 from ..constants import EstadoArchivoLibro, CategoriaConceptoLibro
 
 
@@ -75,8 +83,9 @@ class LibroService(BaseService):
                 archivo_erp.save(update_fields=['estado', 'error_mensaje'])
                 return ServiceResult.fail("No hay parser disponible para este ERP")
             
-            # Extraer headers
-            headers = parser.extraer_headers(archivo_erp.archivo.path)
+            # Extraer headers (solo la fila de headers, sin decodificar la hoja)
+            headers_info = parser.extraer_headers_info(archivo_erp.archivo.path)
+            headers = [info.pandas_name for info in headers_info]
             
             logger.info(f"Extraídos {len(headers)} headers de {archivo_erp}")
             
@@ -95,29 +104,22 @@ class LibroService(BaseService):
             else:
                 headers_monetarios = headers
             
-            # Actualizar archivo con conteo de headers que requieren clasificación
-            archivo_erp.headers_total = len(headers_monetarios)
-            archivo_erp.estado = EstadoArchivoLibro.PENDIENTE_CLASIFICACION
-            archivo_erp.save(update_fields=['headers_total', 'estado'])
-            
-            # Crear/actualizar conceptos en BD (solo monetarios)
-            cls._sincronizar_conceptos(archivo_erp, headers)
+            # Crear/actualizar conceptos en BD (solo monetarios).
+            # Si la firma del esquema no cambió respecto al último libro, no se toca la BD.
+            sincronizacion = cls._sincronizar_conceptos(archivo_erp, headers_info, parser)
             
-            # Contar clasificados (de los que se registraron en BD)
-            config_erp = cierre.cliente.configuraciones_erp.filter(activo=True).first()
-            headers_clasificados = ConceptoLibro.objects.filter(
-                cliente=cierre.cliente,
-                erp=config_erp.erp,
-                categoria__isnull=False
-            ).count()
+            # Contar clasificados entre los conceptos de este esquema
+            headers_clasificados = cls._contar_clasificados(sincronizacion['conceptos_ids'])
             
+            archivo_erp.headers_total = len(headers_monetarios)
             archivo_erp.headers_clasificados = headers_clasificados
-            archivo_erp.save(update_fields=['headers_clasificados'])
             
-            # Si todos están clasificados, cambiar a LISTO
+            # Si todos están clasificados, pasar directo a LISTO
             if headers_clasificados >= len(headers_monetarios):
                 archivo_erp.estado = EstadoArchivoLibro.LISTO
-                archivo_erp.save(update_fields=['estado'])
+            else:
+                archivo_erp.estado = EstadoArchivoLibro.PENDIENTE_CLASIFICACION
+            archivo_erp.save(update_fields=['headers_total', 'headers_clasificados', 'estado'])
             
             return ServiceResult.ok(headers_monetarios)
             
@@ -128,91 +130,161 @@ class LibroService(BaseService):
             archivo_erp.save(update_fields=['estado', 'error_mensaje'])
             return ServiceResult.fail(f"Error extrayendo headers: {str(e)}")
     
+    @classmethod
+    def calcular_firma_esquema(cls, headers_info: List[HeaderInfo]) -> str:
+        """
+        Hash ordenado de la lista de HeaderInfo.
+        
+        Dos libros con la misma fila de headers (mismos nombres, mismo orden
+        y mismos duplicados) tienen la misma firma.
+        """
+        contenido = json.dumps(
+            [
+                [info.original, info.pandas_name, info.occurrence, info.is_duplicate]
+                for info in headers_info
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+    
     @classmethod
     @transaction.atomic
-    def _sincronizar_conceptos(cls, archivo_erp: ArchivoERP, headers: List[str]):
+    def _sincronizar_conceptos(
+        cls, 
+        archivo_erp: ArchivoERP, 
+        headers_info: List[HeaderInfo],
+        parser
+    ) -> Dict:
         """
         Crea o actualiza ConceptoLibro para cada header encontrado.
         Maneja headers duplicados correctamente.
         
+        Si la firma del esquema coincide con la guardada para (cliente, erp),
+        no se consulta ni modifica ningún concepto. Si difiere, se calcula
+        el diff contra los conceptos existentes y se aplican solo los
+        headers nuevos (bulk_create) y los que cambiaron de posición o
+        nombre pandas (bulk_update).
+        
         Args:
             archivo_erp: Archivo de donde vienen los headers
-            headers: Lista de headers a sincronizar (nombres como pandas los lee)
+            headers_info: HeaderInfo de cada header (parser.extraer_headers_info)
+            parser: Parser del ERP (define qué headers son datos de empleado)
+        
+        Returns:
+            Dict con 'conceptos_ids' (monetarios, en orden), 'sin_cambios',
+            'nuevos', 'actualizados' y 'removidos'
         """
+        logger = cls.get_logger()
         cierre = archivo_erp.cierre
-        config_erp = cierre.cliente.configuraciones_erp.filter(activo=True).first()
+        config_erp = cierre.cliente.configuraciones_erp.filter(
+            activo=True
+        ).select_related('erp').first()
+        
+        resultado = {
+            'conceptos_ids': [],
+            'sin_cambios': False,
+            'nuevos': 0,
+            'actualizados': 0,
+            'removidos': 0,
+        }
         
         if not config_erp:
-            return
+            return resultado
         
-        # Re-extraer headers con info de duplicados
-        parser = ParserFactory.get_parser_for_cliente(cierre.cliente)
-        if not parser:
-            return
+        cliente = cierre.cliente
+        erp = config_erp.erp
+        firma = cls.calcular_firma_esquema(headers_info)
         
-        try:
-            # Leer archivo para analizar headers
-            if archivo_erp.archivo.path.endswith('.csv'):
-                import pandas as pd
-                df = pd.read_csv(archivo_erp.archivo.path, nrows=0)
-            else:
-                df = parser.leer_excel(archivo_erp.archivo.path, sheet_name=0, header=0, nrows=0)
-            
-            headers_info = parser.analizar_headers_duplicados(df.columns)
-        except Exception as e:
-            cls.get_logger().warning(f"No se pudo analizar headers para duplicados: {e}")
-            # Fallback: tratar todos como únicos
-            from ..parsers.base import HeaderInfo
-            headers_info = [
-                HeaderInfo(original=h, pandas_name=h, occurrence=1, is_duplicate=False)
-                for h in headers
-            ]
-        
-        # Contador de headers omitidos (datos de empleado)
+        # 1. Mismo esquema que el último libro: nada que sincronizar
+        esquema = EsquemaLibro.objects.filter(cliente=cliente, erp=erp).first()
+        if esquema and esquema.firma == firma:
+            ids = esquema.conceptos_ids
+            if ConceptoLibro.objects.filter(id__in=ids).count() == len(ids):
+                logger.info(f"Esquema sin cambios para {archivo_erp}, se omite sincronización")
+                resultado['conceptos_ids'] = ids
+                resultado['sin_cambios'] = True
+                return resultado
+        
+        # 2. Upsert por conjuntos contra el catálogo existente
+        entradas = []
         headers_omitidos = 0
         
         for orden, header_info in enumerate(headers_info):
             # Si el parser indica que es un header de empleado (no monetario), omitirlo
             # Estos datos se usarán al procesar el libro para crear EmpleadoLibro
-            if hasattr(parser, 'es_header_empleado') and parser.es_header_empleado(orden):
+            if parser.es_header_empleado(orden):
                 headers_omitidos += 1
                 continue
             
-            # Crear o actualizar concepto (solo conceptos monetarios)
-            concepto, created = ConceptoLibro.objects.get_or_create(
-                cliente=cierre.cliente,
-                erp=config_erp.erp,
-                header_original=header_info.original,
-                ocurrencia=header_info.occurrence,
-                defaults={
-                    'header_pandas': header_info.pandas_name,
-                    'es_duplicado': header_info.is_duplicate,
-                    'orden': orden,
-                    'activo': True,
-                }
-            )
-            
-            if not created:
-                # Actualizar campos si cambió algo
-                updated = False
-                if concepto.orden != orden:
-                    concepto.orden = orden
-                    updated = True
-                if concepto.header_pandas != header_info.pandas_name:
-                    concepto.header_pandas = header_info.pandas_name
-                    updated = True
-                if concepto.es_duplicado != header_info.is_duplicate:
-                    concepto.es_duplicado = header_info.is_duplicate
-                    updated = True
-                
-                if updated:
-                    concepto.save(update_fields=['orden', 'header_pandas', 'es_duplicado'])
+            entradas.append({
+                'header_original': header_info.original,
+                'ocurrencia': header_info.occurrence,
+                'header_pandas': header_info.pandas_name,
+                'es_duplicado': header_info.is_duplicate,
+                # bulk_create no llama save(): header_normalizado se asigna aquí
+                'header_normalizado': slugify(header_info.original),
+                'orden': orden,
+                'activo': True,
+            })
         
-        if headers_omitidos:
-            cls.get_logger().info(
-                f"Omitidos {headers_omitidos} headers de empleado para {archivo_erp}"
-            )
-
+        catalogo = CatalogoService.sincronizar(
+            ConceptoLibro,
+            filtro={'cliente': cliente, 'erp': erp},
+            campos_clave=('header_original', 'ocurrencia'),
+            entradas=entradas,
+            campos_actualizables=['orden', 'header_pandas', 'es_duplicado'],
+        )
+        
+        # Los conceptos que ya no vienen en el archivo se conservan (su
+        # clasificación sirve si el header vuelve en meses siguientes)
+        removidos = [
+            clave for clave, c in catalogo.existentes.items()
+            if c.activo and clave not in catalogo.objetos
+        ]
+        
+        conceptos_ids = catalogo.ids
+        
+        EsquemaLibro.objects.update_or_create(
+            cliente=cliente,
+            erp=erp,
+            defaults={'firma': firma, 'conceptos_ids': conceptos_ids}
+        )
+        
+        logger.info(
+            f"Esquema sincronizado para {archivo_erp}: {catalogo.creados} nuevos, "
+            f"{catalogo.actualizados} actualizados, {len(removidos)} ausentes, "
+            f"{headers_omitidos} headers de empleado omitidos"
+        )
+        
+        resultado.update({
+            'conceptos_ids': conceptos_ids,
+            'nuevos': catalogo.creados,
+            'actualizados': catalogo.actualizados,
+            'removidos': len(removidos),
+        })
+        return resultado
+    
+    @classmethod
+    def _conceptos_esquema(cls, cliente, erp) -> List[int]:
+        """
+        IDs de los conceptos monetarios del libro, según el esquema guardado
+        al extraer sus headers. Sin esquema (libros extraídos antes de
+        EsquemaLibro) se usan los conceptos activos del cliente/ERP.
+        """
+        esquema = EsquemaLibro.objects.filter(cliente=cliente, erp=erp).first()
+        if esquema:
+            return esquema.conceptos_ids
+        return list(ConceptoLibro.objects.filter(
+            cliente=cliente, erp=erp, activo=True
+        ).values_list('id', flat=True))
+    
+    @classmethod
+    def _contar_clasificados(cls, conceptos_ids: List[int]) -> int:
+        """Cuántos de los conceptos indicados ya tienen categoría."""
+        return ConceptoLibro.objects.filter(
+            id__in=conceptos_ids,
+            categoria__isnull=False
+        ).count()
     
     @classmethod
     @transaction.atomic
@@ -310,11 +382,9 @@ class LibroService(BaseService):
             logger.info(f"Clasificados {clasificados} conceptos para {archivo_erp}")
             
             # Actualizar contador en archivo
-            archivo_erp.headers_clasificados = ConceptoLibro.objects.filter(
-                cliente=cierre.cliente,
-                erp=config_erp.erp,
-                categoria__isnull=False
-            ).count()
+            archivo_erp.headers_clasificados = cls._contar_clasificados(
+                cls._conceptos_esquema(cierre.cliente, config_erp.erp)
+            )
             
             # Si todos están clasificados, cambiar estado a LISTO
             if archivo_erp.todos_headers_clasificados:
@@ -355,6 +425,11 @@ class LibroService(BaseService):
         - EmpleadoLibro: identificación del empleado (rut, nombre)
         - RegistroLibro: un registro por cada concepto con monto > 0
         
+        Si el archivo ya tiene empleados (reproceso) solo se reescriben los
+        empleados cuya fila cambió. Si existe una versión anterior procesada,
+        los empleados sin cambios se copian de ella en bloque (sin volver a
+        calcular sus registros) y la versión anterior queda intacta.
+        
         Args:
             archivo_erp: Archivo del libro a procesar
             progress_callback: Función opcional para reportar progreso.
@@ -364,10 +439,9 @@ class LibroService(BaseService):
                 - empleados: cantidad de empleados procesados (opcional)
         
         Returns:
-            ServiceResult con estadísticas o error
+            ServiceResult con estadísticas o error. 'diff' resume qué empleados
+            cambiaron respecto a la carga previa (ver _guardar_empleados)
         """
-        from apps.validador.models import RegistroLibro
-        
         logger = cls.get_logger()
         
         def report_progress(progreso: int, mensaje: str, empleados: int = 0):
@@ -426,6 +500,12 @@ class LibroService(BaseService):
             
             report_progress(15, "Parseando empleados del libro...")
             
+            # Libros grandes: procesar por bloques sin cargar todo en memoria
+            if cls._usar_streaming(parser, archivo_erp.archivo.path):
+                return cls._procesar_libro_streaming(
+                    archivo_erp, parser, conceptos_clasificados, report_progress
+                )
+            
             # Procesar libro
             result = parser.procesar_libro(
                 archivo_erp.archivo.path,
@@ -441,81 +521,33 @@ class LibroService(BaseService):
             total_empleados = len(result.data)
             report_progress(30, f"Procesando {total_empleados} empleados...", 0)
             
-            # Limpiar empleados y registros previos de este archivo
-            EmpleadoLibro.objects.filter(
-                cierre=cierre,
-                archivo_erp=archivo_erp
-            ).delete()
-            
-            report_progress(35, "Creando registros de empleados...")
-            
-            # 1. Crear EmpleadoLibro para cada empleado (solo rut, nombre)
-            empleados_a_crear = []
-            for emp_data in result.data:
-                empleado = EmpleadoLibro(
-                    cierre=cierre,
-                    archivo_erp=archivo_erp,
-                    rut=emp_data['rut'],
-                    nombre=emp_data.get('nombre', ''),
-                )
-                empleados_a_crear.append(empleado)
-            
-            # Bulk create empleados (PostgreSQL retorna IDs)
-            empleados_creados = EmpleadoLibro.objects.bulk_create(
-                empleados_a_crear, 
-                batch_size=500
-            )
-            
-            report_progress(50, f"{len(empleados_creados)} empleados creados, procesando conceptos...", len(empleados_creados))
+            # Empleados ya cargados (reproceso o versión anterior) para el diff
+            previos = cls._empleados_previos(archivo_erp)
+            diff = cls._nuevo_diff()
             
-            # 2. Mapear RUT → EmpleadoLibro para asignar FK a registros
-            empleados_por_rut = {e.rut: e for e in empleados_creados}
+            report_progress(35, "Guardando empleados modificados...")
             
-            # 3. Crear RegistroLibro para cada concepto con monto > 0
-            registros_a_crear = []
+            # Guardar por bloques para reportar progreso de 35% a 90%
+            tamano_bloque = settings.LIBRO_STREAMING_CHUNK_SIZE
             total_registros = 0
-            empleados_procesados = 0
-            
-            for idx, emp_data in enumerate(result.data):
-                empleado = empleados_por_rut.get(emp_data['rut'])
-                if not empleado:
-                    continue
-                
-                for reg in emp_data.get('registros', []):
-                    registro = RegistroLibro(
-                        cierre=cierre,
-                        empleado=empleado,
-                        concepto=reg['concepto'],
-                        monto=reg['monto'],
-                    )
-                    registros_a_crear.append(registro)
-                    total_registros += 1
+            for inicio in range(0, total_empleados, tamano_bloque):
+                bloque = result.data[inicio:inicio + tamano_bloque]
+                total_registros += cls._guardar_empleados(archivo_erp, bloque, previos, diff)
                 
-                empleados_procesados += 1
-                
-                # Reportar progreso cada 50 empleados o al final
-                if empleados_procesados % 50 == 0 or empleados_procesados == total_empleados:
-                    # Progreso de 50% a 90% proporcional a empleados procesados
-                    progreso = 50 + int((empleados_procesados / total_empleados) * 40)
-                    report_progress(
-                        progreso, 
-                        f"Procesando conceptos: {empleados_procesados}/{total_empleados} empleados...",
-                        empleados_procesados
-                    )
-            
-            report_progress(90, f"Guardando {total_registros} registros en base de datos...")
-            
-            # Bulk create registros
-            if registros_a_crear:
-                RegistroLibro.objects.bulk_create(
-                    registros_a_crear, 
-                    batch_size=1000
+                empleados_procesados = inicio + len(bloque)
+                progreso = 35 + int((empleados_procesados / total_empleados) * 55)
+                report_progress(
+                    progreso,
+                    f"Procesando empleados: {empleados_procesados}/{total_empleados}...",
+                    empleados_procesados
                 )
             
+            cls._eliminar_ausentes(previos, diff)
+            
             report_progress(95, "Finalizando procesamiento...")
             
             # Actualizar archivo
-            archivo_erp.empleados_procesados = len(empleados_creados)
+            archivo_erp.empleados_procesados = total_empleados
             archivo_erp.estado = EstadoArchivoLibro.PROCESADO
             archivo_erp.fecha_procesamiento = timezone.now()
             archivo_erp.save(update_fields=[
@@ -523,8 +555,8 @@ class LibroService(BaseService):
             ])
             
             logger.info(
-                f"Libro procesado: {len(empleados_creados)} empleados, "
-                f"{total_registros} registros creados"
+                f"Libro procesado: {total_empleados} empleados, "
+                f"{total_registros} registros creados ({cls.resumen_diff(diff)})"
             )
             
             cls.log_action(
@@ -533,20 +565,22 @@ class LibroService(BaseService):
                 archivo_erp.id,
                 None,
                 {
-                    'empleados_procesados': len(empleados_creados),
+                    'empleados_procesados': total_empleados,
                     'registros_creados': total_registros,
-                    'warnings': len(result.warnings)
+                    'warnings': len(result.warnings),
+                    'diff': cls.resumen_diff(diff),
                 }
             )
             
-            report_progress(100, "Procesamiento completado", len(empleados_creados))
+            report_progress(100, "Procesamiento completado", total_empleados)
             
             return ServiceResult.ok({
-                'empleados_procesados': len(empleados_creados),
+                'empleados_procesados': total_empleados,
                 'registros_creados': total_registros,
                 'total_filas': result.metadata.get('total_filas', 0),
                 'errores': result.metadata.get('errores', 0),
                 'warnings': result.warnings,
+                'diff': diff,
             })
             
         except Exception as e:
@@ -556,6 +590,362 @@ class LibroService(BaseService):
             archivo_erp.save(update_fields=['estado', 'error_mensaje'])
             return ServiceResult.fail(f"Error procesando libro: {str(e)}")
     
+    @classmethod
+    def _usar_streaming(cls, parser, path: str) -> bool:
+        """
+        Decide si el libro se procesa en modo streaming.
+        
+        Aplica a archivos .xlsx/.xlsm sobre LIBRO_STREAMING_MIN_SIZE cuando
+        el parser lo soporta (openpyxl read_only no lee .xls ni CSV).
+        """
+        if not parser.soporta_streaming:
+            return False
+        if os.path.splitext(path)[1].lower() not in ('.xlsx', '.xlsm'):
+            return False
+        return os.path.getsize(path) >= settings.LIBRO_STREAMING_MIN_SIZE
+    
+    @classmethod
+    def _procesar_libro_streaming(
+        cls,
+        archivo_erp: ArchivoERP,
+        parser,
+        conceptos_clasificados: Dict,
+        report_progress: callable
+    ) -> ServiceResult:
+        """
+        Procesa el libro por bloques de empleados (modo streaming).
+        
+        Cada bloque entregado por parser.procesar_libro_streaming se inserta
+        de inmediato (EmpleadoLibro + RegistroLibro) y se descarta, por lo que
+        la memoria queda acotada por LIBRO_STREAMING_CHUNK_SIZE. Si el libro
+        no produce empleados se revierte todo (los datos previos se conservan).
+        """
+        logger = cls.get_logger()
+        path = archivo_erp.archivo.path
+        
+        total_estimado = max(
+            parser.estimar_filas_excel(path, sheet_name=parser.hoja_libro) - parser.fila_datos_inicio, 1
+        )
+        logger.info(
+            f"Procesando libro en modo streaming (~{total_estimado} filas, "
+            f"bloques de {settings.LIBRO_STREAMING_CHUNK_SIZE})"
+        )
+        
+        total_empleados = 0
+        total_registros = 0
+        total_filas = 0
+        errores_fila = []
+        
+        with transaction.atomic():
+            # Empleados ya cargados (reproceso o versión anterior) para el diff
+            previos = cls._empleados_previos(archivo_erp)
+            diff = cls._nuevo_diff()
+            
+            report_progress(30, "Procesando empleados por bloques...", 0)
+            
+            bloques = parser.procesar_libro_streaming(
+                path,
+                conceptos_clasificados,
+                tamano_chunk=settings.LIBRO_STREAMING_CHUNK_SIZE
+            )
+            
+            for bloque in bloques:
+                if not bloque.success:
+                    raise ValueError(bloque.error)
+                
+                total_registros += cls._guardar_empleados(archivo_erp, bloque.data, previos, diff)
+                total_empleados += len(bloque.data)
+                total_filas += bloque.metadata.get('total_filas', 0)
+                errores_fila.extend(bloque.warnings)
+                
+                # Progreso de 30% a 90% según filas leídas
+                progreso = 30 + int(min(total_filas / total_estimado, 1) * 60)
+                report_progress(
+                    progreso,
+                    f"Procesando empleados: {total_empleados} guardados...",
+                    total_empleados
+                )
+            
+            if total_empleados == 0:
+                raise ValueError(
+                    "No se pudo procesar ningún empleado. "
+                    "Verifique que los headers estén clasificados correctamente."
+                )
+            
+            cls._eliminar_ausentes(previos, diff)
+        
+        report_progress(95, "Finalizando procesamiento...")
+        
+        warnings = errores_fila[:10]
+        if len(errores_fila) > 10:
+            warnings.append(f"... y {len(errores_fila) - 10} errores más")
+        
+        # Actualizar archivo
+        archivo_erp.empleados_procesados = total_empleados
+        archivo_erp.estado = EstadoArchivoLibro.PROCESADO
+        archivo_erp.fecha_procesamiento = timezone.now()
+        archivo_erp.save(update_fields=[
+            'empleados_procesados', 'estado', 'fecha_procesamiento'
+        ])
+        
+        logger.info(
+            f"Libro procesado (streaming): {total_empleados} empleados, "
+            f"{total_registros} registros creados ({cls.resumen_diff(diff)})"
+        )
+        
+        cls.log_action(
+            'procesar_libro',
+            'archivo_erp',
+            archivo_erp.id,
+            None,
+            {
+                'empleados_procesados': total_empleados,
+                'registros_creados': total_registros,
+                'warnings': len(warnings),
+                'streaming': True,
+                'diff': cls.resumen_diff(diff),
+            }
+        )
+        
+        report_progress(100, "Procesamiento completado", total_empleados)
+        
+        return ServiceResult.ok({
+            'empleados_procesados': total_empleados,
+            'registros_creados': total_registros,
+            'total_filas': total_filas,
+            'errores': len(errores_fila),
+            'warnings': warnings,
+            'diff': diff,
+        })
+    
+    @classmethod
+    def calcular_hash_empleado(cls, emp_data: Dict) -> str:
+        """
+        Hash del contenido de un empleado del libro (nombre + conceptos y montos).
+        
+        Los montos se normalizan para que 1500000, 1500000.0 y
+        Decimal('1500000.00') produzcan el mismo hash.
+        """
+        registros = emp_data.get('registros', [])
+        return cls._hash_fila(
+            emp_data.get('nombre', ''),
+            [reg['concepto'].id for reg in registros],
+            [reg['monto'] for reg in registros],
+        )
+    
+    @classmethod
+    def _hash_fila(cls, nombre: str, concepto_ids: List[int], montos: List) -> str:
+        """Hash de un empleado a partir de sus registros (ver calcular_hash_empleado)."""
+        registros = sorted(
+            (concepto_id, format(Decimal(str(monto)).normalize(), 'f'))
+            for concepto_id, monto in zip(concepto_ids, montos)
+        )
+        contenido = json.dumps([nombre, registros], ensure_ascii=False)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _nuevo_diff(cls) -> Dict:
+        """Contadores del diff de empleados entre la carga previa y el libro nuevo."""
+        return {
+            'nuevos': 0,
+            'modificados': 0,
+            'eliminados': 0,
+            'sin_cambios': 0,
+            'ruts_afectados': [],
+        }
+    
+    @classmethod
+    def resumen_diff(cls, diff: Dict) -> Dict:
+        """Diff sin la lista de RUTs (para logs y auditoría)."""
+        return {k: v for k, v in diff.items() if k != 'ruts_afectados'}
+    
+    @classmethod
+    def _empleados_previos(cls, archivo_erp: ArchivoERP) -> Dict[str, tuple]:
+        """
+        Empleados ya cargados contra los que se calcula el diff.
+        
+        Si el archivo ya fue procesado (reproceso) se usan sus propios
+        empleados. Si es una versión nueva, se compara contra los empleados
+        de la última versión procesada del libro, sin modificarlos: esa
+        versión debe quedar intacta por si se reactiva al eliminar la nueva.
+        _guardar_empleados copia a este archivo los que no cambiaron.
+        Con LIBRO_PROCESAMIENTO_INCREMENTAL=False se borran y el libro se
+        carga completo.
+        
+        Debe llamarse dentro de una transacción.
+        
+        Returns:
+            Dict {rut: (empleado_id, hash_fila, propio)}; propio=False para
+            empleados de la versión anterior
+        """
+        logger = cls.get_logger()
+        cierre = archivo_erp.cierre
+        propios = EmpleadoLibro.objects.filter(cierre=cierre, archivo_erp=archivo_erp)
+        
+        if not settings.LIBRO_PROCESAMIENTO_INCREMENTAL:
+            propios.delete()
+            return {}
+        
+        if propios.exists():
+            return {
+                rut: (id_, hash_fila, True)
+                for id_, rut, hash_fila in propios.values_list('id', 'rut', 'hash_fila')
+            }
+        
+        anterior = ArchivoERP.objects.filter(
+            cierre=cierre,
+            tipo=archivo_erp.tipo,
+            version__lt=archivo_erp.version,
+            estado=EstadoArchivoLibro.PROCESADO,
+        ).order_by('-version').first()
+        if anterior is None:
+            return {}
+        
+        previos = {
+            rut: (id_, hash_fila, False)
+            for id_, rut, hash_fila in EmpleadoLibro.objects.filter(
+                cierre=cierre, archivo_erp=anterior,
+            ).values_list('id', 'rut', 'hash_fila')
+        }
+        logger.info(
+            f"{len(previos)} empleados de v{anterior.version} como base del diff incremental"
+        )
+        return previos
+    
+    @classmethod
+    def _guardar_empleados(
+        cls,
+        archivo_erp: ArchivoERP,
+        empleados_data: Sequence[Dict],
+        previos: Dict[str, tuple],
+        diff: Dict
+    ) -> int:
+        """
+        Aplica un bloque de empleados parseados contra la carga previa.
+        
+        - RUT nuevo: se crea EmpleadoLibro y sus RegistroLibro
+        - Mismo hash: no se escribe nada (empleado propio) o se copia el
+          empleado de la versión anterior con sus RegistroLibro
+        - Hash distinto: se reemplazan los RegistroLibro del empleado (propio)
+          o se crea uno nuevo (versión anterior, que no se modifica)
+        
+        Los RUTs vistos se quitan de previos; los que queden al final son
+        empleados que ya no vienen en el libro (ver _eliminar_ausentes).
+        
+        Args:
+            empleados_data: LibroCompacto (o lista de dicts, que se convierte)
+        
+        Returns:
+            Cantidad de RegistroLibro insertados
+        """
+        from apps.validador.models import RegistroLibro
+        
+        cierre = archivo_erp.cierre
+        libro = LibroCompacto.desde_dicts(empleados_data)
+        
+        # Se trabaja directo sobre los arreglos, sin armar dicts por empleado
+        concepto_ids = libro.concepto_ids.tolist()
+        montos = libro.montos.tolist()
+        limites = libro.limites.tolist()
+        
+        nuevos = []
+        modificados = []
+        copiados = []
+        n_modificados = 0
+        
+        for posicion, (rut, nombre) in enumerate(zip(libro.ruts.tolist(), libro.nombres.tolist())):
+            desde, hasta = limites[posicion], limites[posicion + 1]
+            hash_fila = cls._hash_fila(nombre, concepto_ids[desde:hasta], montos[desde:hasta])
+            previo = previos.pop(rut, None)
+            
+            if previo is not None and previo[1] == hash_fila:
+                diff['sin_cambios'] += 1
+                if not previo[2]:
+                    copiados.append((previo[0], EmpleadoLibro(
+                        cierre=cierre,
+                        archivo_erp=archivo_erp,
+                        rut=rut,
+                        nombre=nombre,
+                        hash_fila=hash_fila,
+                    )))
+                continue
+            
+            propio = previo is not None and previo[2]
+            empleado = EmpleadoLibro(
+                id=previo[0] if propio else None,
+                cierre=cierre,
+                archivo_erp=archivo_erp,
+                rut=rut,
+                nombre=nombre,
+                hash_fila=hash_fila,
+            )
+            (modificados if propio else nuevos).append((empleado, posicion))
+            n_modificados += previo is not None
+        
+        if modificados:
+            RegistroLibro.objects.filter(
+                empleado_id__in=[empleado.id for empleado, _ in modificados]
+            ).delete()
+            EmpleadoLibro.objects.bulk_update(
+                [empleado for empleado, _ in modificados],
+                ['nombre', 'hash_fila'],
+                batch_size=500
+            )
+        
+        if nuevos or copiados:
+            # PostgreSQL retorna los IDs y bulk_create los asigna en las instancias
+            EmpleadoLibro.objects.bulk_create(
+                [empleado for empleado, _ in nuevos] + [empleado for _, empleado in copiados],
+                batch_size=500
+            )
+        
+        registros_a_crear = [
+            RegistroLibro(
+                cierre=cierre,
+                empleado=empleado,
+                concepto_id=concepto_ids[i],
+                monto=montos[i],
+            )
+            for empleado, posicion in modificados + nuevos
+            for i in range(limites[posicion], limites[posicion + 1])
+        ]
+        if copiados:
+            copia_de = {id_anterior: empleado for id_anterior, empleado in copiados}
+            registros_a_crear.extend(
+                RegistroLibro(
+                    cierre=cierre,
+                    empleado=copia_de[empleado_id],
+                    concepto_id=concepto_id,
+                    monto=monto,
+                )
+                for empleado_id, concepto_id, monto in RegistroLibro.objects.filter(
+                    empleado_id__in=copia_de,
+                ).values_list('empleado_id', 'concepto_id', 'monto')
+            )
+        if registros_a_crear:
+            BulkLoader.cargar(RegistroLibro, registros_a_crear)
+        
+        diff['nuevos'] += len(modificados) + len(nuevos) - n_modificados
+        diff['modificados'] += n_modificados
+        diff['ruts_afectados'].extend(empleado.rut for empleado, _ in modificados + nuevos)
+        
+        return len(registros_a_crear)
+    
+    @classmethod
+    def _eliminar_ausentes(cls, previos: Dict[str, tuple], diff: Dict):
+        """
+        Elimina los empleados previos que no vienen en el libro nuevo.
+        
+        Los de la versión anterior no se borran: simplemente no se copian.
+        """
+        propios = [id_ for id_, _, propio in previos.values() if propio]
+        if propios:
+            EmpleadoLibro.objects.filter(id__in=propios).delete()
+        
+        diff['eliminados'] += len(previos)
+        diff['ruts_afectados'].extend(previos)
+        previos.clear()
+    
     @classmethod
     def obtener_conceptos_pendientes(cls, archivo_erp: ArchivoERP) -> ServiceResult[List[Dict]]:
         """
@@ -689,11 +1079,9 @@ class LibroService(BaseService):
             logger.info(f"Clasificados automáticamente {clasificados_auto} conceptos")
             
             # Actualizar contador en archivo
-            archivo_erp.headers_clasificados = ConceptoLibro.objects.filter(
-                cliente=cierre.cliente,
-                erp=config_erp.erp,
-                categoria__isnull=False
-            ).count()
+            archivo_erp.headers_clasificados = cls._contar_clasificados(
+                cls._conceptos_esquema(cierre.cliente, config_erp.erp)
+            )
             
             # Si todos están clasificados, cambiar estado a LISTO
             if archivo_erp.todos_headers_clasificados:
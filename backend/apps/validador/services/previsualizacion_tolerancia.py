@@ -0,0 +1,237 @@
+"""
+Previsualización de la comparación Libro vs Novedades a otras tolerancias.
+
+La comparación real usa TOLERANCIA_MONTO_NOVEDADES y reescribe las
+Discrepancia del cierre. Para ver cuántas discrepancias habría con otras
+tolerancias no se persiste nada:
+
+1. Pares: se arman en memoria (pandas) los mismos pares (RUT, concepto)
+   que compara _comparar_libro_novedades, con montos en centavos. Quedan en
+   cache por firma de los datos de entrada (ComparacionIncremental), así
+   que las consultas siguientes no leen registros mientras no cambien
+   archivos ni mapeos
+2. Tramos: con las tolerancias ordenadas, un np.searchsorted por par da el
+   tramo de su diferencia absoluta; un par es discrepancia con la
+   tolerancia i si su tramo es mayor que i. Conteos por tolerancia y por
+   categoría, y la muestra de cada tramo, salen de esa misma pasada
+
+Uso:
+    from apps.validador.services.previsualizacion_tolerancia import PrevisualizacionTolerancia
+    
+    result = PrevisualizacionTolerancia.previsualizar(cierre, ['0', '1', '100'])
+    if result.success:
+        result.data['tolerancias']  # [{'tolerancia': '0', 'discrepancias': 12, 'por_categoria': {...}}, ...]
+        result.data['tramos']       # [{'desde': '0', 'hasta': '1', 'cantidad': 3, 'muestra': [...]}, ...]
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+
+from apps.validador.constants import CATEGORIAS_NO_COMPARABLES, TOLERANCIA_MONTO_NOVEDADES
+
+from .base import BaseService, ServiceResult
+
+CACHE_PREFIX_PARES = 'previsualizacion_pares_'
+CACHE_TIMEOUT_PARES = 30 * 60  # 30 minutos
+
+TOLERANCIAS_DEFECTO = ('0', '1', '10', '100', '1000')
+MAX_TOLERANCIAS = 20
+MUESTRA_POR_TRAMO = 5
+MAX_MUESTRA_POR_TRAMO = 50
+
+# Los umbrales se comparan en centavos int64
+TOLERANCIA_MAXIMA = Decimal(np.iinfo(np.int64).max // 100)
+
+# Categoría de los conceptos del libro sin clasificar
+SIN_CATEGORIA = 'sin_categoria'
+
+
+class PrevisualizacionTolerancia(BaseService):
+    """
+    Conteo de discrepancias Libro vs Novedades por tolerancia, sin persistir.
+    """
+    
+    @classmethod
+    def previsualizar(
+        cls,
+        cierre,
+        tolerancias: Iterable = TOLERANCIAS_DEFECTO,
+        categorias: Optional[Iterable[str]] = None,
+        muestra: int = MUESTRA_POR_TRAMO,
+    ) -> ServiceResult[dict]:
+        """
+        Evalúa varias tolerancias en una sola pasada sobre los pares del cierre.
+        
+        Args:
+            cierre: Cierre a previsualizar
+            tolerancias: Diferencias absolutas máximas aceptadas (str, int o Decimal)
+            categorias: Si se indica, solo pares de conceptos de esas
+                categorías (SIN_CATEGORIA para los no clasificados)
+            muestra: Pares de ejemplo por tramo (los de mayor diferencia)
+        
+        Returns:
+            ServiceResult con 'pares_comparados', 'tolerancia_actual',
+            'tolerancias' (conteo total y por categoría) y 'tramos'
+            (pares que son discrepancia desde una tolerancia hasta la siguiente)
+        """
+        try:
+            tolerancias = [Decimal(str(t).strip()) for t in tolerancias]
+        except InvalidOperation:
+            return ServiceResult.fail('Las tolerancias deben ser números')
+        # NaN no se puede comparar ni (sNaN) agregar a un set: validar antes de ordenar
+        if not all(t.is_finite() for t in tolerancias):
+            return ServiceResult.fail('Las tolerancias deben ser números')
+        tolerancias = sorted(set(tolerancias))
+        if not tolerancias or len(tolerancias) > MAX_TOLERANCIAS:
+            return ServiceResult.fail(f'Se requieren entre 1 y {MAX_TOLERANCIAS} tolerancias')
+        if tolerancias[0] < 0 or tolerancias[-1] > TOLERANCIA_MAXIMA:
+            return ServiceResult.fail(f'Las tolerancias deben estar entre 0 y {TOLERANCIA_MAXIMA}')
+        muestra = max(0, min(muestra, MAX_MUESTRA_POR_TRAMO))
+        
+        pares = cls.obtener_pares(cierre)
+        if categorias:
+            pares = pares[pares['categoria'].isin(set(categorias))]
+        
+        # |diferencia| > t  <=>  |centavos| > floor(t * 100), con centavos enteros
+        umbrales = np.array([int(t * 100) for t in tolerancias], dtype=np.int64)
+        diferencia = np.abs(pares['monto_erp'].to_numpy() - pares['monto_cliente'].to_numpy())
+        tramo = np.searchsorted(umbrales, diferencia, side='left')
+        n_tramos = len(umbrales) + 1
+        
+        codigos, nombres_categoria = pd.factorize(pares['categoria'], sort=True)
+        por_categoria = np.zeros((len(nombres_categoria), n_tramos), dtype=np.int64)
+        np.add.at(por_categoria, (codigos, tramo), 1)
+        # Discrepancias con la tolerancia i: pares de los tramos > i
+        sobre = np.cumsum(por_categoria[:, ::-1], axis=1)[:, ::-1][:, 1:]
+        
+        return ServiceResult.ok({
+            'pares_comparados': len(pares),
+            'tolerancia_actual': str(TOLERANCIA_MONTO_NOVEDADES),
+            'tolerancias': [
+                {
+                    'tolerancia': str(tolerancia),
+                    'discrepancias': int(sobre[:, i].sum()),
+                    'por_categoria': {
+                        categoria: int(sobre[c, i])
+                        for c, categoria in enumerate(nombres_categoria) if sobre[c, i]
+                    },
+                }
+                for i, tolerancia in enumerate(tolerancias)
+            ],
+            'tramos': cls._tramos(pares, tramo, diferencia, tolerancias, muestra),
+        })
+    
+    @classmethod
+    def obtener_pares(cls, cierre) -> pd.DataFrame:
+        """Pares comparables del cierre, desde cache si los datos no cambiaron."""
+        from .comparacion_incremental import ComparacionIncremental
+        
+        clave = f'{CACHE_PREFIX_PARES}{cierre.id}_{ComparacionIncremental.firma_actual(cierre)}'
+        pares = cache.get(clave)
+        if pares is None:
+            pares = cls._construir_pares(cierre)
+            cache.set(clave, pares, CACHE_TIMEOUT_PARES)
+        return pares
+    
+    @classmethod
+    def _construir_pares(cls, cierre) -> pd.DataFrame:
+        """
+        Pares (RUT, concepto del libro) con las mismas reglas que
+        _comparar_libro_novedades: novedades sumadas con el nombre del
+        primer registro y, si el RUT se repite en el libro, el último
+        empleado. Montos en centavos (int64).
+        """
+        from apps.validador.models import RegistroLibro, RegistroNovedades
+        
+        novedades = pd.DataFrame.from_records(
+            list(RegistroNovedades.objects.filter(
+                cierre=cierre,
+                concepto_novedades__concepto_libro__isnull=False,
+            ).order_by('id').values_list(
+                'rut_empleado', 'concepto_novedades__concepto_libro_id', 'nombre_empleado',
+                'concepto_novedades__header_original', 'monto',
+            )),
+            columns=['rut', 'concepto_id', 'nombre_empleado', 'nombre_item_novedades', 'monto'],
+        )
+        novedades['monto_cliente'] = cls._centavos(novedades['monto'])
+        novedades = novedades.groupby(['rut', 'concepto_id'], sort=False).agg(
+            monto_cliente=('monto_cliente', 'sum'),
+            nombre_empleado=('nombre_empleado', 'first'),
+            nombre_item_novedades=('nombre_item_novedades', 'first'),
+        ).reset_index()
+        
+        libro = pd.DataFrame.from_records(
+            list(RegistroLibro.objects.filter(cierre=cierre).exclude(
+                concepto__categoria__in=CATEGORIAS_NO_COMPARABLES,
+            ).order_by('empleado_id', 'concepto_id').values_list(
+                'empleado__rut', 'concepto_id', 'empleado__nombre',
+                'concepto__header_original', 'concepto__categoria', 'monto',
+            )),
+            columns=['rut', 'concepto_id', 'nombre_libro', 'nombre_item', 'categoria', 'monto'],
+        )
+        libro['monto_erp'] = cls._centavos(libro['monto'])
+        libro = libro.drop_duplicates(['rut', 'concepto_id'], keep='last')
+        
+        pares = libro.merge(novedades, on=['rut', 'concepto_id'], how='inner')
+        pares['nombre_empleado'] = pares['nombre_libro'].where(
+            pares['nombre_libro'] != '', pares['nombre_empleado']
+        )
+        pares['categoria'] = pares['categoria'].fillna(SIN_CATEGORIA)
+        return pares[[
+            'rut', 'nombre_empleado', 'nombre_item', 'nombre_item_novedades', 'categoria',
+            'monto_erp', 'monto_cliente',
+        ]].reset_index(drop=True)
+    
+    @staticmethod
+    def _centavos(montos: pd.Series) -> np.ndarray:
+        """Decimal con 2 decimales -> centavos enteros (exactos)."""
+        return np.array([int(monto * 100) for monto in montos], dtype=np.int64)
+    
+    @staticmethod
+    def _tramos(
+        pares: pd.DataFrame,
+        tramo: np.ndarray,
+        diferencia: np.ndarray,
+        tolerancias: list,
+        muestra: int,
+    ) -> list:
+        """
+        Cantidad y muestra de cada tramo (tolerancia i, tolerancia i + 1].
+        
+        El tramo 0 (dentro de todas las tolerancias) no es discrepancia en
+        ningún nivel y no se informa.
+        """
+        # Por tramo y, dentro de él, de mayor a menor diferencia
+        orden = np.lexsort((-diferencia, tramo))
+        limites = np.searchsorted(tramo[orden], np.arange(len(tolerancias) + 2), side='left')
+        
+        def centavos_a_texto(centavos):
+            return str(Decimal(int(centavos)).scaleb(-2))
+        
+        tramos = []
+        for i in range(1, len(tolerancias) + 1):
+            desde, hasta = limites[i], limites[i + 1]
+            filas = pares.iloc[orden[desde:min(hasta, desde + muestra)]]
+            tramos.append({
+                'desde': str(tolerancias[i - 1]),
+                'hasta': str(tolerancias[i]) if i < len(tolerancias) else None,
+                'cantidad': int(hasta - desde),
+                'muestra': [
+                    {
+                        'rut_empleado': fila.rut,
+                        'nombre_empleado': fila.nombre_empleado,
+                        'nombre_item': fila.nombre_item,
+                        'nombre_item_novedades': fila.nombre_item_novedades,
+                        'categoria': fila.categoria,
+                        'monto_erp': centavos_a_texto(fila.monto_erp),
+                        'monto_cliente': centavos_a_texto(fila.monto_cliente),
+                        'diferencia': centavos_a_texto(fila.monto_erp - fila.monto_cliente),
+                    }
+                    for fila in filas.itertuples(index=False)
+                ],
+            })
+        return tramos
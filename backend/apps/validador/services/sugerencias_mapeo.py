@@ -0,0 +1,141 @@
+"""
+Sugerencias de mapeo ConceptoNovedades -> ConceptoLibro por similitud de nombre.
+
+Por cada (cliente, ERP) se mantiene en cache un IndiceTrigramas sobre los
+ConceptoLibro mapeables (activos, clasificados y no ignorados). En cada
+consulta se compara el conjunto de IDs vigentes con el indexado y solo se
+agregan/quitan las diferencias: el índice se reconstruye de forma
+incremental cuando el catálogo cambia (incluso por bulk_create/bulk_update,
+que no disparan signals). El header_original de un ConceptoLibro es parte de
+su clave, por lo que un ID indexado no cambia de texto.
+
+Uso:
+    from apps.validador.services.sugerencias_mapeo import SugerenciasMapeoService
+    
+    sugerencias = SugerenciasMapeoService.sugerir(
+        cliente_id, erp_id, ['Bono Producción', 'Colación'],
+    )
+    # {'Bono Producción': [{'id': 10, 'header_original': 'BONO PRODUCCION', ...}], ...}
+"""
+
+from typing import Dict, Iterable, List
+
+from django.core.cache import cache
+
+from apps.validador.utils.trigramas import UMBRAL_SIMILITUD, IndiceTrigramas
+
+from .base import BaseService
+
+CACHE_PREFIX_INDICE = 'indice_trigramas_libro_'
+CACHE_TIMEOUT_INDICE = 24 * 60 * 60  # 1 día
+
+# Sugerencias por header
+MAX_SUGERENCIAS = 3
+
+
+class SugerenciasMapeoService(BaseService):
+    """
+    Candidatos de ConceptoLibro para headers de novedades.
+    """
+    
+    @classmethod
+    def conceptos_mapeables(cls, cliente_id: int, erp_id: int):
+        """ConceptoLibro a los que se puede mapear un concepto de novedades."""
+        from apps.validador.models import ConceptoLibro
+        
+        return ConceptoLibro.objects.filter(
+            cliente_id=cliente_id,
+            erp_id=erp_id,
+            activo=True,
+            categoria__isnull=False,
+        ).exclude(categoria='ignorar')
+    
+    @classmethod
+    def obtener_indice(cls, cliente_id: int, erp_id: int) -> IndiceTrigramas:
+        """
+        Índice de trigramas de los conceptos mapeables, al día con la BD.
+        
+        Una query de IDs para detectar cambios y, solo si hay conceptos
+        nuevos, otra para leer sus headers.
+        """
+        clave = f'{CACHE_PREFIX_INDICE}{cliente_id}_{erp_id}'
+        indice = cache.get(clave) or IndiceTrigramas()
+        
+        conceptos = cls.conceptos_mapeables(cliente_id, erp_id)
+        vigentes = set(conceptos.values_list('id', flat=True))
+        indexados = indice.ids
+        
+        removidos = indexados - vigentes
+        nuevos = vigentes - indexados
+        if not removidos and not nuevos:
+            return indice
+        
+        for id_ in removidos:
+            indice.quitar(id_)
+        if nuevos:
+            for id_, header in conceptos.filter(id__in=nuevos).values_list('id', 'header_original'):
+                indice.agregar(id_, header)
+        
+        cache.set(clave, indice, CACHE_TIMEOUT_INDICE)
+        cls.get_logger().debug(
+            f"Índice trigramas cliente={cliente_id} erp={erp_id}: "
+            f"+{len(nuevos)} -{len(removidos)} ({len(indice)} conceptos)"
+        )
+        return indice
+    
+    @classmethod
+    def sugerir(
+        cls,
+        cliente_id: int,
+        erp_id: int,
+        headers: Iterable[str],
+        limite: int = MAX_SUGERENCIAS,
+        umbral: float = UMBRAL_SIMILITUD,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Candidatos rankeados para cada header de novedades.
+        
+        Se omiten los ConceptoLibro ya mapeados a otro concepto de novedades
+        (el mapeo es 1:1).
+        
+        Returns:
+            Dict header -> lista de {'id', 'header_original', 'categoria', 'similitud'}
+        """
+        from apps.validador.models import ConceptoLibro, ConceptoNovedades
+        
+        headers = list(dict.fromkeys(headers))
+        indice = cls.obtener_indice(cliente_id, erp_id)
+        
+        usados = set(
+            ConceptoNovedades.objects.filter(
+                cliente_id=cliente_id,
+                erp_id=erp_id,
+                concepto_libro__isnull=False,
+                activo=True,
+            ).values_list('concepto_libro_id', flat=True)
+        )
+        
+        # Se piden candidatos extra para compensar los ya usados
+        candidatos = {
+            header: [
+                (id_, similitud)
+                for id_, similitud in indice.buscar(header, limite + len(usados), umbral)
+                if id_ not in usados
+            ][:limite]
+            for header in headers
+        }
+        
+        ids = {id_ for lista in candidatos.values() for id_, _ in lista}
+        conceptos = {
+            c['id']: c
+            for c in ConceptoLibro.objects.filter(id__in=ids).values('id', 'header_original', 'categoria')
+        }
+        
+        return {
+            header: [
+                {**conceptos[id_], 'similitud': round(similitud, 3)}
+                for id_, similitud in lista
+                if id_ in conceptos
+            ]
+            for header, lista in candidatos.items()
+        }
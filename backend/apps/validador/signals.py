@@ -2,9 +2,10 @@
 Signals del app Validador.
 """
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import Discrepancia, Incidencia
+from .models import ArchivoAnalista, ArchivoERP, Discrepancia, Incidencia
+from .utils.cache_parseo import eliminar_cache_archivo
 
 
 @receiver([post_save, post_delete], sender=Discrepancia)
@@ -19,3 +20,11 @@ def actualizar_contadores_incidencias(sender, instance, **kwargs):
     """Actualiza los contadores del cierre cuando cambian las incidencias."""
     if instance.cierre_id:
         instance.cierre.actualizar_contadores()
+
+
+@receiver(pre_delete, sender=ArchivoERP)
+@receiver(pre_delete, sender=ArchivoAnalista)
+def eliminar_cache_parseo(sender, instance, **kwargs):
+    """Elimina el contenido parseado en caché del archivo que se borra."""
+    if instance.archivo:
+        eliminar_cache_archivo(instance.archivo.path)
@@ -5,19 +5,31 @@ Compara datos ERP vs datos del Analista:
 1. Libro de Remuneraciones vs Novedades (montos)
 2. Movimientos del Mes vs Archivos Analista (ingresos, finiquitos, etc.)
 
+Los cierres grandes se comparan en paralelo, particionados por hash de RUT
+(chord de comparar_particion + finalizar_comparacion).
+
 Reporta progreso a cache para polling desde frontend.
 """
 
-from celery import shared_task
+from celery import chord, shared_task
 from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
 from django.core.cache import cache
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 import logging
+import zlib
+
+import pandas as pd
 
-from apps.validador.constants import EstadoCierre
+from apps.validador.constants import (
+    CATEGORIAS_NO_COMPARABLES,
+    TOLERANCIA_MONTO_NOVEDADES,
+    EstadoCierre,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +39,14 @@ CACHE_TIMEOUT = 600  # 10 minutos
 
 
 def _set_progreso(cierre_id: int, data: dict):
-    """Guarda progreso de comparación en cache."""
+    """
+    Guarda progreso de comparación en cache.
+    
+    cierre_id None: sin reporte (sub-tareas de la comparación particionada,
+    que reportan por partición terminada).
+    """
+    if cierre_id is None:
+        return
     cache.set(f'{CACHE_PREFIX_COMPARACION}{cierre_id}', data, CACHE_TIMEOUT)
 
 
@@ -41,10 +60,22 @@ def get_progreso_comparacion(cierre_id: int) -> dict:
 
 
 @shared_task(bind=True, max_retries=2, soft_time_limit=600, time_limit=720)
-def ejecutar_comparacion(self, cierre_id, usuario_id=None):
+def ejecutar_comparacion(self, cierre_id, usuario_id=None, completa=False):
     """
     Ejecuta la comparación entre datos ERP y datos del Analista.
     
+    Es incremental: solo se recalculan las discrepancias de los RUTs y
+    conceptos que cambiaron desde la comparación anterior; el resto
+    (incluidas las resueltas) se conserva. Si la firma de los datos de
+    entrada (archivos, mapeo de conceptos, tolerancia) es la misma de la
+    comparación anterior, se devuelve su resultado sin comparar. Ver
+    ComparacionIncremental.
+    
+    Una comparación completa de un cierre grande (COMPARACION_PARTICIONES
+    > 1 y al menos COMPARACION_PARTICIONES_MIN_RUTS RUTs) se reparte por
+    hash de RUT en sub-tareas comparar_particion; finalizar_comparacion
+    consolida los resultados (ver _ejecutar_particionada).
+    
     Fases:
     1. Preparación (10%)
     2. Comparar Libro vs Novedades (10-60%)
@@ -54,16 +85,26 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
     Args:
         cierre_id: ID del Cierre a procesar
         usuario_id: ID del usuario que inició la tarea (para auditoría)
+        completa: Forzar recomputación de todas las discrepancias (ignora
+            también el resultado memorizado)
     
     Timeouts:
         soft_time_limit: 10 min (warning)
         time_limit: 12 min (kill)
     """
     from apps.validador.models import Cierre
+    from apps.validador.services.comparacion_incremental import ComparacionIncremental
     
     try:
+        inicio = timezone.now()
         cierre = Cierre.objects.get(id=cierre_id)
         
+        # Mismos datos de entrada que la comparación anterior: mismo resultado
+        memorizado = ComparacionIncremental.resultado_memorizado(cierre, completa=completa)
+        if memorizado is not None:
+            logger.info(f"Cierre {cierre_id}: sin cambios desde la última comparación, se reutiliza su resultado")
+            return _finalizar(cierre, memorizado['libro'], memorizado['movimientos'], memorizada=True)
+        
         # Cambiar a estado COMPARANDO
         cierre.estado = EstadoCierre.COMPARANDO
         cierre.save(update_fields=['estado'])
@@ -78,6 +119,13 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
             'mensaje': 'Preparando datos para comparación...',
         })
         
+        alcance = ComparacionIncremental.preparar(cierre, completa=completa)
+        
+        if alcance.completo and settings.COMPARACION_PARTICIONES > 1:
+            total_ruts = len(_ruts_del_cierre(cierre))
+            if total_ruts >= settings.COMPARACION_PARTICIONES_MIN_RUTS:
+                return _ejecutar_particionada(cierre, total_ruts, alcance, inicio)
+        
         # Fase 2: Comparar Libro vs Novedades (10-60%)
         _set_progreso(cierre_id, {
             'estado': 'comparando',
@@ -86,7 +134,7 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
             'mensaje': 'Comparando Libro vs Novedades...',
         })
         
-        resultado_libro = _comparar_libro_novedades(cierre, cierre_id)
+        resultado_libro = _comparar_libro_novedades(cierre, cierre_id, alcance)
         
         _set_progreso(cierre_id, {
             'estado': 'comparando',
@@ -103,7 +151,7 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
             'mensaje': 'Comparando Movimientos ERP vs Analista...',
         })
         
-        resultado_movimientos = _comparar_movimientos(cierre, cierre_id)
+        resultado_movimientos = _comparar_movimientos(cierre, cierre_id, alcance)
         
         _set_progreso(cierre_id, {
             'estado': 'comparando',
@@ -112,54 +160,12 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
             'mensaje': f'Movimientos: {resultado_movimientos["discrepancias"]} discrepancias',
         })
         
-        # Fase 4: Finalización
-        _set_progreso(cierre_id, {
-            'estado': 'comparando',
-            'progreso': 95,
-            'fase': 'finalizando',
-            'mensaje': 'Actualizando contadores...',
-        })
-        
-        # Actualizar contadores
-        cierre.actualizar_contadores()
-        
-        # Determinar siguiente estado
-        total_discrepancias = resultado_libro['discrepancias'] + resultado_movimientos['discrepancias']
-        
-        if total_discrepancias > 0:
-            nuevo_estado = EstadoCierre.CON_DISCREPANCIAS
-        else:
-            nuevo_estado = EstadoCierre.SIN_DISCREPANCIAS
-        
-        cierre.estado = nuevo_estado
-        cierre.save(update_fields=['estado'])
-        
-        # Progreso final
-        _set_progreso(cierre_id, {
-            'estado': 'completado',
-            'progreso': 100,
-            'fase': 'completado',
-            'mensaje': f'Comparación completada: {total_discrepancias} discrepancias encontradas',
-            'resultado': {
-                'total_discrepancias': total_discrepancias,
-                'libro_vs_novedades': resultado_libro['discrepancias'],
-                'movimientos': resultado_movimientos['discrepancias'],
-                'nuevo_estado': nuevo_estado,
-            }
-        })
-        
-        logger.info(
-            f"Comparación completada cierre ID={cierre_id}: "
-            f"libro={resultado_libro['discrepancias']}, mov={resultado_movimientos['discrepancias']}"
+        ComparacionIncremental.guardar(
+            cierre, alcance, inicio, {'libro': resultado_libro, 'movimientos': resultado_movimientos},
         )
         
-        return {
-            'libro': resultado_libro,
-            'movimientos': resultado_movimientos,
-            'total_discrepancias': total_discrepancias,
-            'nuevo_estado': nuevo_estado,
-        }
-        
+        return _finalizar(cierre, resultado_libro, resultado_movimientos, incremental=not alcance.completo)
+    
     except SoftTimeLimitExceeded:
         logger.warning(f"Timeout suave en comparación del cierre {cierre_id}")
         _set_progreso(cierre_id, {
@@ -168,27 +174,280 @@ def ejecutar_comparacion(self, cierre_id, usuario_id=None):
             'mensaje': 'La comparación está tomando más tiempo del esperado. Reintentando...',
         })
         raise
-        
+    
     except Exception as e:
-        logger.error(f"Error en comparación del cierre {cierre_id}: {str(e)}")
-        
-        _set_progreso(cierre_id, {
-            'estado': 'error',
-            'progreso': 0,
-            'mensaje': f'Error: {str(e)}',
-        })
-        
-        try:
-            cierre = Cierre.objects.get(id=cierre_id)
-            cierre.estado = EstadoCierre.ERROR
-            cierre.save(update_fields=['estado'])
-        except Exception:
-            logger.exception(f"No se pudo actualizar estado de error del cierre {cierre_id}")
-        
+        _marcar_error(cierre_id, e)
         raise self.retry(exc=e, countdown=60)
 
 
-def _comparar_libro_novedades(cierre, cierre_id):
+def _finalizar(
+    cierre,
+    resultado_libro,
+    resultado_movimientos,
+    incremental=False,
+    particiones=None,
+    memorizada=False,
+):
+    """
+    Fase 4: contadores, siguiente estado del cierre y progreso final.
+    
+    memorizada: el resultado es el de la comparación anterior (sin cambios
+    en los datos de entrada).
+    """
+    cierre_id = cierre.id
+    
+    _set_progreso(cierre_id, {
+        'estado': 'comparando',
+        'progreso': 95,
+        'fase': 'finalizando',
+        'mensaje': 'Actualizando contadores...',
+    })
+    
+    # Actualizar contadores
+    cierre.actualizar_contadores()
+    
+    # Determinar siguiente estado (incluye las discrepancias conservadas)
+    total_discrepancias = cierre.total_discrepancias
+    
+    if total_discrepancias > 0:
+        nuevo_estado = EstadoCierre.CON_DISCREPANCIAS
+    else:
+        nuevo_estado = EstadoCierre.SIN_DISCREPANCIAS
+    
+    cierre.estado = nuevo_estado
+    cierre.save(update_fields=['estado'])
+    
+    # Progreso final
+    _set_progreso(cierre_id, {
+        'estado': 'completado',
+        'progreso': 100,
+        'fase': 'completado',
+        'mensaje': f'Comparación completada: {total_discrepancias} discrepancias encontradas',
+        'resultado': {
+            'total_discrepancias': total_discrepancias,
+            'libro_vs_novedades': resultado_libro['discrepancias'],
+            'movimientos': resultado_movimientos['discrepancias'],
+            'incremental': incremental,
+            'particiones': particiones,
+            'memorizada': memorizada,
+            'nuevo_estado': nuevo_estado,
+        }
+    })
+    
+    logger.info(
+        f"Comparación completada cierre ID={cierre_id}: "
+        f"libro={resultado_libro['discrepancias']}, mov={resultado_movimientos['discrepancias']}"
+        + (f" ({particiones} particiones)" if particiones else "")
+    )
+    
+    return {
+        'libro': resultado_libro,
+        'movimientos': resultado_movimientos,
+        'total_discrepancias': total_discrepancias,
+        'nuevo_estado': nuevo_estado,
+    }
+
+
+def _marcar_error(cierre_id, error):
+    """Deja el cierre en ERROR y reporta el error en el progreso."""
+    from apps.validador.models import Cierre
+    
+    logger.error(f"Error en comparación del cierre {cierre_id}: {str(error)}")
+    
+    _set_progreso(cierre_id, {
+        'estado': 'error',
+        'progreso': 0,
+        'mensaje': f'Error: {str(error)}',
+    })
+    
+    try:
+        cierre = Cierre.objects.get(id=cierre_id)
+        cierre.estado = EstadoCierre.ERROR
+        cierre.save(update_fields=['estado'])
+    except Exception:
+        logger.exception(f"No se pudo actualizar estado de error del cierre {cierre_id}")
+
+
+# =============================================================================
+# COMPARACIÓN PARTICIONADA
+# =============================================================================
+
+CACHE_PREFIX_PARTICIONES = 'comparacion_particiones_'
+CACHE_PREFIX_HUELLA = 'comparacion_huella_'
+CACHE_TIMEOUT_PARTICIONES = 2 * 60 * 60  # 2 horas
+
+
+def _particion_de_rut(rut: str, n_particiones: int) -> int:
+    """Partición de un RUT (crc32: estable entre procesos, a diferencia de hash())."""
+    return zlib.crc32(rut.encode()) % n_particiones
+
+
+def _ruts_del_cierre(cierre) -> set:
+    """RUTs del cierre (libro, novedades y movimientos)."""
+    from apps.validador.models import (
+        MovimientoAnalista, MovimientoMes, RegistroLibro, RegistroNovedades,
+    )
+    
+    ruts = set()
+    for queryset, campo in (
+        (RegistroLibro.objects.filter(cierre=cierre), 'empleado__rut'),
+        (RegistroNovedades.objects.filter(cierre=cierre), 'rut_empleado'),
+        (MovimientoMes.objects.filter(cierre=cierre), 'rut'),
+        (MovimientoAnalista.objects.filter(cierre=cierre), 'rut'),
+    ):
+        ruts.update(queryset.order_by().values_list(campo, flat=True).distinct())
+    return ruts
+
+
+def _cantidad_particiones(total_ruts: int) -> int:
+    """
+    COMPARACION_PARTICIONES, o más si así cada partición queda bajo
+    MAX_RUTS_INCREMENTAL RUTs (el IN de cada sub-tarea queda acotado).
+    """
+    from apps.validador.services.comparacion_incremental import MAX_RUTS_INCREMENTAL
+    
+    return max(settings.COMPARACION_PARTICIONES, -(-total_ruts // MAX_RUTS_INCREMENTAL))
+
+
+def _ejecutar_particionada(cierre, total_ruts, alcance, inicio):
+    """
+    Borra las discrepancias del cierre y lanza un chord con una
+    comparar_particion por partición y finalizar_comparacion como callback.
+    
+    Los mensajes solo llevan el número de partición: cada sub-tarea
+    obtiene sus RUTs del cierre (_ruts_de_particion).
+    
+    La huella (ComparacionIncremental) se deja en cache para que la guarde
+    el callback: si el chord falla, no se guarda y la siguiente comparación
+    es completa.
+    """
+    from apps.validador.models import Discrepancia
+    
+    cierre_id = cierre.id
+    n_particiones = _cantidad_particiones(total_ruts)
+    
+    Discrepancia.objects.filter(cierre=cierre).delete()
+    
+    cache.set(f'{CACHE_PREFIX_PARTICIONES}{cierre_id}', 0, CACHE_TIMEOUT_PARTICIONES)
+    cache.set(
+        f'{CACHE_PREFIX_HUELLA}{cierre_id}',
+        {
+            'versiones': alcance.versiones,
+            'huellas': alcance.huellas,
+            'firma': alcance.firma,
+            'inicio': inicio.isoformat(),
+        },
+        CACHE_TIMEOUT_PARTICIONES,
+    )
+    
+    _set_progreso(cierre_id, {
+        'estado': 'comparando',
+        'progreso': 10,
+        'fase': 'particiones',
+        'mensaje': f'Comparando {n_particiones} particiones...',
+    })
+    
+    logger.info(
+        f"Comparación particionada cierre ID={cierre_id}: "
+        f"{n_particiones} particiones, {total_ruts} RUTs"
+    )
+    
+    resultado = chord(
+        comparar_particion.s(cierre_id, i, n_particiones)
+        for i in range(n_particiones)
+    )(finalizar_comparacion.s(cierre_id).on_error(error_comparacion.s(cierre_id)))
+    
+    return {'particiones': n_particiones, 'chord_id': resultado.id}
+
+
+def _ruts_de_particion(cierre, particion: int, total_particiones: int) -> set:
+    """RUTs del cierre que caen en la partición."""
+    return {
+        rut for rut in _ruts_del_cierre(cierre)
+        if _particion_de_rut(rut, total_particiones) == particion
+    }
+
+
+@shared_task(soft_time_limit=600, time_limit=720)
+def comparar_particion(cierre_id, particion, total_particiones):
+    """
+    Compara Libro vs Novedades y Movimientos para los RUTs de una partición.
+    
+    Las discrepancias del cierre ya fueron borradas por el coordinador; el
+    progreso individual no se reporta (solo particiones terminadas).
+    
+    Returns:
+        Dict con 'libro' y 'movimientos' (resultados de cada comparación)
+    """
+    from apps.validador.models import Cierre
+    from apps.validador.services.comparacion_incremental import AlcanceComparacion
+    
+    cierre = Cierre.objects.get(id=cierre_id)
+    ruts = _ruts_de_particion(cierre, particion, total_particiones)
+    alcance = AlcanceComparacion(completo=False, ruts_libro=ruts, ruts_movimientos=ruts)
+    
+    resultado = {
+        'libro': _comparar_libro_novedades(cierre, None, alcance),
+        'movimientos': _comparar_movimientos(cierre, None, alcance),
+    }
+    
+    terminadas = cache.incr(f'{CACHE_PREFIX_PARTICIONES}{cierre_id}')
+    _set_progreso(cierre_id, {
+        'estado': 'comparando',
+        'progreso': 10 + int(80 * terminadas / total_particiones),
+        'fase': 'particiones',
+        'mensaje': f'Particiones comparadas: {terminadas}/{total_particiones}',
+    })
+    
+    logger.info(
+        f"Partición {particion} cierre ID={cierre_id}: {len(ruts)} RUTs, "
+        f"libro={resultado['libro']['discrepancias']}, mov={resultado['movimientos']['discrepancias']}"
+    )
+    return resultado
+
+
+@shared_task
+def finalizar_comparacion(resultados, cierre_id):
+    """
+    Callback del chord: suma los resultados de las particiones, guarda la
+    huella de la comparación y fija el estado del cierre.
+    """
+    from apps.validador.models import Cierre
+    from apps.validador.services.comparacion_incremental import (
+        AlcanceComparacion, ComparacionIncremental,
+    )
+    
+    cierre = Cierre.objects.get(id=cierre_id)
+    
+    resultado_libro = {'discrepancias': 0, 'pares_comparados': 0}
+    resultado_movimientos = {'discrepancias': 0}
+    for resultado in resultados:
+        for clave in resultado_libro:
+            resultado_libro[clave] += resultado['libro'].get(clave, 0)
+        resultado_movimientos['discrepancias'] += resultado['movimientos']['discrepancias']
+    
+    huella = cache.get(f'{CACHE_PREFIX_HUELLA}{cierre_id}')
+    if huella is not None:
+        ComparacionIncremental.guardar(
+            cierre,
+            AlcanceComparacion(
+                versiones=huella['versiones'], huellas=huella['huellas'], firma=huella['firma'],
+            ),
+            datetime.fromisoformat(huella['inicio']),
+            {'libro': resultado_libro, 'movimientos': resultado_movimientos},
+        )
+    cache.delete_many([f'{CACHE_PREFIX_PARTICIONES}{cierre_id}', f'{CACHE_PREFIX_HUELLA}{cierre_id}'])
+    
+    return _finalizar(cierre, resultado_libro, resultado_movimientos, particiones=len(resultados))
+
+
+@shared_task
+def error_comparacion(request, exc, traceback, cierre_id):
+    """Errback del chord: una partición falló."""
+    _marcar_error(cierre_id, exc)
+
+
+def _comparar_libro_novedades(cierre, cierre_id, alcance=None):
     """
     Compara el Libro de Remuneraciones con Novedades.
     
@@ -197,18 +456,48 @@ def _comparar_libro_novedades(cierre, cierre_id):
     
     Detecta:
     - monto_diferente: El monto en Libro != monto en Novedades para mismo RUT+concepto
+    
+    Con COMPARACION_SQL (PostgreSQL/SQLite) la agrupación, el join y el
+    insert se ejecutan en la base de datos (ver ComparacionSQL), con el
+    mismo resultado registro a registro.
+    
+    Con un `alcance` incremental solo se recalculan los RUTs y conceptos
+    cambiados; 'discrepancias' y 'pares_comparados' se refieren a ese alcance.
     """
     from apps.validador.models import (
         RegistroNovedades,
         RegistroLibro,
         Discrepancia,
     )
+    from apps.validador.services.comparacion_sql import ComparacionSQL
+    
+    if alcance is not None and alcance.libro_sin_cambios:
+        return {'discrepancias': 0, 'pares_comparados': 0}
+    incremental = alcance is not None and not alcance.completo
     
-    # Limpiar discrepancias anteriores de este tipo
-    Discrepancia.objects.filter(
+    # Limpiar discrepancias anteriores de este tipo (solo las del alcance)
+    anteriores = Discrepancia.objects.filter(
         cierre=cierre,
         origen='libro_vs_novedades'
-    ).delete()
+    )
+    if incremental:
+        anteriores = anteriores.filter(alcance.filtro_discrepancias_libro())
+    anteriores.delete()
+    
+    ruts = alcance.ruts_libro if incremental else None
+    conceptos = alcance.conceptos_libro if incremental else None
+    if incremental and not ruts and not conceptos:
+        # Solo se desmapearon conceptos de novedades: basta con el borrado
+        return {'discrepancias': 0, 'pares_comparados': 0}
+    
+    if ComparacionSQL.disponible():
+        _set_progreso(cierre_id, {
+            'estado': 'comparando',
+            'progreso': 30,
+            'fase': 'libro_vs_novedades',
+            'mensaje': 'Comparando montos en base de datos...',
+        })
+        return ComparacionSQL.comparar_libro_novedades(cierre, ruts=ruts, conceptos=conceptos)
     
     discrepancias_creadas = 0
     
@@ -218,7 +507,11 @@ def _comparar_libro_novedades(cierre, cierre_id):
         cierre=cierre,
         concepto_novedades__isnull=False,
         concepto_novedades__concepto_libro__isnull=False,
-    ).select_related('concepto_novedades', 'concepto_novedades__concepto_libro')
+    ).select_related('concepto_novedades', 'concepto_novedades__concepto_libro').order_by('id')
+    if incremental:
+        novedades_mapeadas = novedades_mapeadas.filter(
+            Q(rut_empleado__in=ruts) | Q(concepto_novedades__concepto_libro__in=conceptos)
+        )
     
     total_novedades = novedades_mapeadas.count()
     
@@ -256,13 +549,18 @@ def _comparar_libro_novedades(cierre, cierre_id):
     # Obtener registros del libro
     registros_libro = RegistroLibro.objects.filter(
         cierre=cierre
-    ).select_related('empleado', 'concepto')
+    ).select_related('empleado', 'concepto').order_by('empleado_id', 'concepto_id')
+    if incremental:
+        registros_libro = registros_libro.filter(
+            Q(empleado__rut__in=ruts) | Q(concepto__in=conceptos)
+        )
     
     # Crear diccionario del libro por (rut, concepto_libro_id)
+    # Si el RUT se repite (varios archivos) gana el último empleado
     # Solo categorías comparables (no info_adicional ni ignorar)
     libro_dict = {}
     for reg in registros_libro:
-        if reg.concepto.categoria in ('info_adicional', 'ignorar'):
+        if reg.concepto.categoria in CATEGORIAS_NO_COMPARABLES:
             continue
         
         key = (reg.empleado.rut, reg.concepto_id)
@@ -280,7 +578,7 @@ def _comparar_libro_novedades(cierre, cierre_id):
     })
     
     # Comparar solo los elementos que existen en AMBOS lados
-    tolerancia = Decimal('1')  # Tolerancia de $1 por redondeos
+    tolerancia = TOLERANCIA_MONTO_NOVEDADES  # Tolerancia de $1 por redondeos
     discrepancias_batch = []
     
     # Buscar keys que existen en ambos diccionarios
@@ -294,7 +592,7 @@ def _comparar_libro_novedades(cierre, cierre_id):
         diferencia = datos_libro['monto'] - datos_nov['monto']
         
         if abs(diferencia) > tolerancia:
-            discrepancia = Discrepancia(
+            discrepancias_batch.append(Discrepancia(
                 cierre=cierre,
                 tipo='monto_diferente',
                 origen='libro_vs_novedades',
@@ -305,9 +603,7 @@ def _comparar_libro_novedades(cierre, cierre_id):
                 monto_erp=datos_libro['monto'],
                 monto_cliente=datos_nov['monto'],
                 diferencia=diferencia,
-            )
-            discrepancia.generar_descripcion()
-            discrepancias_batch.append(discrepancia)
+            ))
             discrepancias_creadas += 1
     
     # Bulk create
@@ -322,35 +618,47 @@ def _comparar_libro_novedades(cierre, cierre_id):
     return {'discrepancias': discrepancias_creadas, 'pares_comparados': len(keys_comunes)}
 
 
-def _comparar_movimientos(cierre, cierre_id):
+def _comparar_movimientos(cierre, cierre_id, alcance=None):
     """
     Compara los movimientos del ERP con los del Analista.
     
-    Conexiones:
-    - ERP alta (Altas y Bajas) ↔ Analista alta (ingresos)
-    - ERP baja (Altas y Bajas) ↔ Analista baja (finiquitos)
-    - ERP licencia/permiso/ausencia/vacaciones (Ausentismos/Vacaciones) ↔ Analista (asistencias)
+    Conexiones (ver FAMILIAS_MOVIMIENTO):
+    - ERP ingreso (Altas y Bajas) ↔ Analista alta (ingresos)
+    - ERP finiquito (Altas y Bajas) ↔ Analista baja (finiquitos)
+    - ERP asistencia (Ausentismos) ↔ Analista licencia/permiso/ausencia (asistencias)
+    - ERP vacaciones ↔ Analista vacaciones
     
-    Compara por RUT + tipo de movimiento.
+    Empareja por RUT + familia y solapamiento de fechas
+    (EmparejamientoMovimientos): cada licencia/vacación se compara con sus
+    propias fechas, recortadas al mes del cierre.
     
     Detecta:
-    - falta_en_cliente: Movimiento en ERP pero no en archivos Analista
-    - falta_en_erp: Movimiento en archivos Analista pero no en ERP
+    - falta_en_cliente: Movimiento en ERP sin movimiento del Analista que lo solape
+    - falta_en_erp: Movimiento en archivos Analista sin movimiento ERP que lo solape
+    - fechas_diferentes: Movimiento ERP solapado por movimientos del Analista
+      con otras fechas (corridas, partidas en varios, o evento con otra fecha)
+    
+    Con un `alcance` incremental solo se recalculan los RUTs cambiados.
     """
     from apps.validador.models import (
         MovimientoMes,
         MovimientoAnalista,
         Discrepancia,
     )
+    from apps.validador.services.emparejamiento_movimientos import EmparejamientoMovimientos
+    
+    if alcance is not None and alcance.movimientos_sin_cambios:
+        return {'discrepancias': 0, 'mensaje': 'Sin cambios en movimientos'}
+    ruts = alcance.ruts_movimientos if alcance is not None and not alcance.completo else None
     
     # Limpiar discrepancias anteriores
-    Discrepancia.objects.filter(
+    anteriores = Discrepancia.objects.filter(
         cierre=cierre,
         origen='movimientos_vs_analista'
-    ).delete()
-    
-    discrepancias_creadas = 0
-    discrepancias_batch = []
+    )
+    if ruts is not None:
+        anteriores = anteriores.filter(rut_empleado__in=ruts)
+    anteriores.delete()
     
     _set_progreso(cierre_id, {
         'estado': 'comparando',
@@ -365,31 +673,28 @@ def _comparar_movimientos(cierre, cierre_id):
     primer_dia = date(año, mes, 1)
     ultimo_dia = date(año, mes, monthrange(año, mes)[1])
     
-    # Obtener movimientos del ERP
-    movimientos_erp = MovimientoMes.objects.filter(cierre=cierre)
+    # Movimientos del Analista
+    movimientos_analista = MovimientoAnalista.objects.filter(cierre=cierre)
     
-    # Crear dict de ERP: {(rut, tipo): movimiento}
-    # Solo incluir movimientos cuya fecha_inicio esté en el mes del cierre
-    # (para vacaciones/asistencia que pueden cruzar meses)
-    erp_dict = {}
-    movimientos_ignorados = 0
-    for mov in movimientos_erp:
-        # Para vacaciones y asistencia, filtrar por fecha_inicio en el mes
-        if mov.tipo in ('vacaciones', 'asistencia') and mov.fecha_inicio:
-            if mov.fecha_inicio < primer_dia or mov.fecha_inicio > ultimo_dia:
-                movimientos_ignorados += 1
-                continue
-        
-        key = (mov.rut, mov.tipo)
-        # Si hay múltiples del mismo tipo para el mismo RUT, guardar el primero
-        if key not in erp_dict:
-            erp_dict[key] = mov
+    # Si no hay movimientos del analista, no hay nada que comparar
+    if not movimientos_analista.exists():
+        logger.info(f"Cierre {cierre.id}: Sin movimientos del analista para comparar")
+        if ruts is not None:
+            # Se eliminaron los archivos del analista: no queda nada comparable
+            Discrepancia.objects.filter(cierre=cierre, origen='movimientos_vs_analista').delete()
+        return {'discrepancias': 0, 'mensaje': 'Sin archivos de movimientos del analista'}
     
-    if movimientos_ignorados:
-        logger.info(
-            f"Cierre {cierre.id}: Ignorados {movimientos_ignorados} movimientos ERP "
-            f"con fecha_inicio fuera del mes {cierre.periodo}"
-        )
+    # Movimientos del ERP (solo columnas usadas al comparar)
+    movimientos_erp = MovimientoMes.objects.filter(cierre=cierre)
+    if ruts is not None:
+        movimientos_erp = movimientos_erp.filter(rut__in=ruts)
+        movimientos_analista = movimientos_analista.filter(rut__in=ruts)
+    
+    columnas = ['rut', 'nombre', 'tipo', 'fecha_inicio', 'fecha_fin', 'dias']
+    erp = pd.DataFrame.from_records(
+        list(movimientos_erp.order_by('id').values_list(*columnas, 'hoja_origen')),
+        columns=columnas + ['hoja_origen'],
+    )
     
     _set_progreso(cierre_id, {
         'estado': 'comparando',
@@ -398,20 +703,10 @@ def _comparar_movimientos(cierre, cierre_id):
         'mensaje': 'Cargando movimientos Analista...',
     })
     
-    # Obtener movimientos del Analista
-    movimientos_analista = MovimientoAnalista.objects.filter(cierre=cierre)
-    
-    # Si no hay movimientos del analista, no hay nada que comparar
-    if not movimientos_analista.exists():
-        logger.info(f"Cierre {cierre.id}: Sin movimientos del analista para comparar")
-        return {'discrepancias': 0, 'mensaje': 'Sin archivos de movimientos del analista'}
-    
-    # Crear dict de Analista: {(rut, tipo): movimiento}
-    analista_dict = {}
-    for mov in movimientos_analista:
-        key = (mov.rut, mov.tipo)
-        if key not in analista_dict:
-            analista_dict[key] = mov
+    analista = pd.DataFrame.from_records(
+        list(movimientos_analista.order_by('id').values_list(*columnas, 'origen')),
+        columns=columnas + ['origen'],
+    )
     
     _set_progreso(cierre_id, {
         'estado': 'comparando',
@@ -420,60 +715,65 @@ def _comparar_movimientos(cierre, cierre_id):
         'mensaje': 'Comparando movimientos...',
     })
     
-    erp_keys = set(erp_dict.keys())
-    analista_keys = set(analista_dict.keys())
+    resultado = EmparejamientoMovimientos.emparejar(erp, analista, primer_dia, ultimo_dia)
+    
+    movimientos_ignorados = int(resultado.ignorados_erp.sum())
+    if movimientos_ignorados:
+        logger.info(
+            f"Cierre {cierre.id}: Ignorados {movimientos_ignorados} movimientos ERP "
+            f"fuera del mes {cierre.periodo}"
+        )
+    
+    filas_erp = erp.to_dict('records')
+    filas_analista = analista.to_dict('records')
+    discrepancias_batch = []
     
     # Movimientos en ERP que NO están en Analista
-    solo_en_erp = erp_keys - analista_keys
-    for key in solo_en_erp:
-        rut, tipo = key
-        mov = erp_dict[key]
-        
+    for pos in resultado.solo_erp:
+        mov = filas_erp[pos]
         discrepancias_batch.append(Discrepancia(
             cierre=cierre,
             tipo='falta_en_cliente',
             origen='movimientos_vs_analista',
-            rut_empleado=rut,
-            nombre_empleado=mov.nombre,
-            tipo_movimiento=tipo,
-            descripcion=(
-                f"El movimiento '{mov.get_tipo_display()}' para {rut} ({mov.nombre}) "
-                f"está en ERP pero no fue reportado por el cliente"
-            ),
-            detalle_movimiento={
-                'fecha_inicio': str(mov.fecha_inicio) if mov.fecha_inicio else None,
-                'fecha_fin': str(mov.fecha_fin) if mov.fecha_fin else None,
-                'dias': mov.dias,
-                'hoja_origen': mov.hoja_origen,
-            }
+            rut_empleado=mov['rut'],
+            nombre_empleado=mov['nombre'],
+            tipo_movimiento=mov['tipo'],
+            detalle_movimiento={**_detalle_movimiento(mov), 'hoja_origen': mov['hoja_origen']},
         ))
-        discrepancias_creadas += 1
     
     # Movimientos en Analista que NO están en ERP
-    solo_en_analista = analista_keys - erp_keys
-    for key in solo_en_analista:
-        rut, tipo = key
-        mov = analista_dict[key]
-        
+    for pos in resultado.solo_analista:
+        mov = filas_analista[pos]
         discrepancias_batch.append(Discrepancia(
             cierre=cierre,
             tipo='falta_en_erp',
             origen='movimientos_vs_analista',
-            rut_empleado=rut,
-            nombre_empleado=mov.nombre,
-            tipo_movimiento=tipo,
-            descripcion=(
-                f"El movimiento '{mov.get_tipo_display()}' para {rut} ({mov.nombre}) "
-                f"fue reportado por el cliente pero no está en ERP"
-            ),
+            rut_empleado=mov['rut'],
+            nombre_empleado=mov['nombre'],
+            tipo_movimiento=mov['tipo'],
+            detalle_movimiento={**_detalle_movimiento(mov), 'origen': mov['origen']},
+        ))
+    
+    # Movimientos en ambos lados con fechas distintas
+    for pos, posiciones_analista in resultado.parciales.items():
+        mov = filas_erp[pos]
+        cliente = [
+            {**_detalle_movimiento(filas_analista[p]), 'origen': filas_analista[p]['origen']}
+            for p in posiciones_analista
+        ]
+        discrepancias_batch.append(Discrepancia(
+            cierre=cierre,
+            tipo='fechas_diferentes',
+            origen='movimientos_vs_analista',
+            rut_empleado=mov['rut'],
+            nombre_empleado=mov['nombre'],
+            tipo_movimiento=mov['tipo'],
             detalle_movimiento={
-                'fecha_inicio': str(mov.fecha_inicio) if mov.fecha_inicio else None,
-                'fecha_fin': str(mov.fecha_fin) if mov.fecha_fin else None,
-                'dias': mov.dias,
-                'origen': mov.origen,
-            }
+                **_detalle_movimiento(mov),
+                'hoja_origen': mov['hoja_origen'],
+                'cliente': cliente,
+            },
         ))
-        discrepancias_creadas += 1
     
     # Bulk create
     if discrepancias_batch:
@@ -481,12 +781,22 @@ def _comparar_movimientos(cierre, cierre_id):
     
     logger.info(
         f"Comparación movimientos cierre {cierre.id}: "
-        f"ERP={len(erp_keys)}, Analista={len(analista_keys)}, "
-        f"solo_erp={len(solo_en_erp)}, solo_analista={len(solo_en_analista)}"
+        f"ERP={len(erp)}, Analista={len(analista)}, "
+        f"solo_erp={len(resultado.solo_erp)}, solo_analista={len(resultado.solo_analista)}, "
+        f"fechas_diferentes={len(resultado.parciales)}"
     )
     
     return {
-        'discrepancias': discrepancias_creadas,
-        'movimientos_erp': len(erp_keys),
-        'movimientos_analista': len(analista_keys),
+        'discrepancias': len(discrepancias_batch),
+        'movimientos_erp': len(erp),
+        'movimientos_analista': len(analista),
+    }
+
+
+def _detalle_movimiento(mov: dict) -> dict:
+    """Fechas y días de un movimiento para Discrepancia.detalle_movimiento."""
+    return {
+        'fecha_inicio': str(mov['fecha_inicio']) if mov['fecha_inicio'] else None,
+        'fecha_fin': str(mov['fecha_fin']) if mov['fecha_fin'] else None,
+        'dias': mov['dias'],
     }
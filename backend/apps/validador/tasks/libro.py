@@ -193,6 +193,7 @@ def procesar_libro_remuneraciones(self, archivo_erp_id: int, usuario_id: int = N
                 'total_filas': result.data['total_filas'],
                 'errores': result.data['errores'],
                 'warnings': result.data['warnings'],
+                'diff': LibroService.resumen_diff(result.data['diff']),
             }
         else:
             # Actualizar progreso: error
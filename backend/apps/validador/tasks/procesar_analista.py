@@ -17,17 +17,33 @@ from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
 from django.utils import timezone
 import logging
+import re
+import unicodedata
 
 from apps.validador.utils import (
-    normalizar_rut,
+    comprimir_dataframe,
+    leer_csv_detectado,
+    leer_excel_cacheado,
+    leer_fila_headers,
     mask_rut,
-    parse_fecha,
-    sanitizar_datos_raw,
     validar_ruta_archivo,
 )
 
 logger = logging.getLogger(__name__)
 
+# Columnas de identificación que no son items de novedades
+COLUMNAS_NO_ITEM = ('rut', 'nombre', 'fecha', 'periodo', 'observacion', 'observaciones')
+
+
+def _normalizar_header(header: str) -> str:
+    """Normaliza header para comparación (clave de ConceptoNovedades)."""
+    texto = str(header).lower().strip()
+    texto = unicodedata.normalize('NFD', texto)
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    texto = re.sub(r'[^a-z0-9\s]', '', texto)
+    texto = re.sub(r'\s+', '_', texto.strip())
+    return texto
+
 
 @shared_task(bind=True, max_retries=3, soft_time_limit=300, time_limit=360)
 def extraer_headers_novedades(self, archivo_id, usuario_id=None):
@@ -55,9 +71,7 @@ def extraer_headers_novedades(self, archivo_id, usuario_id=None):
     """
     from apps.validador.models import ArchivoAnalista, ConceptoNovedades, ConceptoLibro
     from apps.validador.constants import EstadoArchivoNovedades
-    import pandas as pd
-    import unicodedata
-    import re
+    from apps.validador.services.catalogo_service import CatalogoService
     import html
     
     def sanitizar_header(header: str) -> str:
@@ -93,15 +107,6 @@ def extraer_headers_novedades(self, archivo_id, usuario_id=None):
         
         return header.strip()
     
-    def normalizar_header(header: str) -> str:
-        """Normaliza header para comparación."""
-        texto = str(header).lower().strip()
-        texto = unicodedata.normalize('NFD', texto)
-        texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
-        texto = re.sub(r'[^a-z0-9\s]', '', texto)
-        texto = re.sub(r'\s+', '_', texto.strip())
-        return texto
-    
     try:
         archivo = ArchivoAnalista.objects.select_related(
             'cierre__cliente'
@@ -128,18 +133,15 @@ def extraer_headers_novedades(self, archivo_id, usuario_id=None):
             raise ValueError(f"Cliente {mask_rut(cliente.rut)} no tiene ERP activo configurado")
         erp = config_erp.erp
         
-        # Leer archivo
-        if archivo.extension == '.csv':
-            df = pd.read_csv(archivo.archivo.path, nrows=1)
-        else:
-            df = pd.read_excel(archivo.archivo.path, nrows=1)
+        # Leer solo la fila de headers (sin decodificar la hoja completa)
+        columnas = leer_fila_headers(archivo.archivo.path)
         
         # Columnas que NO son items (identificación)
-        columnas_ignoradas = ['rut', 'nombre', 'fecha', 'periodo', 'observacion', 'observaciones']
+        columnas_ignoradas = COLUMNAS_NO_ITEM
         
         # Filtrar columnas de items y sanitizar
         headers = []
-        for col in df.columns:
+        for col in columnas:
             col_sanitizado = sanitizar_header(col)
             if not col_sanitizado:
                 continue
@@ -150,31 +152,23 @@ def extraer_headers_novedades(self, archivo_id, usuario_id=None):
         if not headers:
             raise ValueError("No se encontraron columnas de items en el archivo")
         
-        # Crear o reutilizar ConceptoNovedades por cada header
-        conceptos_creados = 0
-        
-        for orden, header_original in enumerate(headers, start=1):
-            header_normalizado = normalizar_header(header_original)
-            
-            # Buscar concepto existente para este cliente+ERP+header
-            concepto, created = ConceptoNovedades.objects.get_or_create(
-                cliente=cliente,
-                erp=erp,
-                header_normalizado=header_normalizado,
-                defaults={
+        # Crear o reutilizar ConceptoNovedades por cada header (upsert por conjuntos)
+        resultado_catalogo = CatalogoService.sincronizar(
+            ConceptoNovedades,
+            filtro={'cliente': cliente, 'erp': erp},
+            campos_clave=('header_normalizado',),
+            entradas=[
+                {
+                    'header_normalizado': _normalizar_header(header_original),
                     'header_original': header_original,
                     'orden': orden,
                     'activo': True,
                 }
-            )
-            
-            if created:
-                conceptos_creados += 1
-            else:
-                # Actualizar orden si cambió
-                if concepto.orden != orden:
-                    concepto.orden = orden
-                    concepto.save()
+                for orden, header_original in enumerate(headers, start=1)
+            ],
+            campos_actualizables=['orden'],
+        )
+        conceptos_creados = resultado_catalogo.creados
         
         # Contar total de conceptos activos para este cliente+ERP
         total_conceptos = ConceptoNovedades.objects.filter(
@@ -208,7 +202,7 @@ def extraer_headers_novedades(self, archivo_id, usuario_id=None):
             'sin_mapear': total_sin_mapear,
             'estado': archivo.estado,
         }
-        
+    
     except Exception as e:
         logger.error(f"Error extrayendo headers novedades {archivo_id}: {str(e)}")
         
@@ -243,6 +237,7 @@ def procesar_archivo_analista(self, archivo_id, usuario_id=None):
     """
     from apps.validador.models import ArchivoAnalista
     from apps.validador.constants import EstadoArchivoNovedades
+    from apps.validador.services.ingesta_movimientos import ESPECIFICACIONES_MOVIMIENTOS
     
     try:
         archivo = ArchivoAnalista.objects.select_related('cierre').get(id=archivo_id)
@@ -267,12 +262,8 @@ def procesar_archivo_analista(self, archivo_id, usuario_id=None):
         
         if archivo.tipo == 'novedades':
             resultado = _procesar_novedades(archivo)
-        elif archivo.tipo == 'asistencias':
-            resultado = _procesar_asistencias(archivo)
-        elif archivo.tipo == 'finiquitos':
-            resultado = _procesar_finiquitos(archivo)
-        elif archivo.tipo == 'ingresos':
-            resultado = _procesar_ingresos(archivo)
+        elif archivo.tipo in ESPECIFICACIONES_MOVIMIENTOS:
+            resultado = _procesar_movimientos(archivo)
         else:
             raise ValueError(f"Tipo de archivo desconocido: {archivo.tipo}")
         
@@ -293,7 +284,7 @@ def procesar_archivo_analista(self, archivo_id, usuario_id=None):
         
         logger.info(f"Archivo Analista procesado: {archivo.nombre_original} - {resultado}")
         return resultado
-        
+    
     except Exception as e:
         logger.error(f"Error procesando archivo Analista {archivo_id}: {str(e)}")
         
@@ -316,28 +307,20 @@ def _procesar_novedades(archivo):
     Procesa el archivo de Novedades del cliente.
     
     - Lee archivo Excel/CSV
-    - Crea RegistroNovedades por cada (RUT, item, monto)
+    - Crea RegistroNovedades por cada (RUT, item, monto) distinto de cero
     - Ignora items marcados como sin_asignacion
+    
+    Se procesa por columnas: cada header se normaliza y se resuelve a su
+    ConceptoNovedades una sola vez, las columnas sin_asignacion se descartan
+    antes de leer montos, y la matriz RUT × item se pasa a formato largo
+    tomando solo las celdas con monto.
     """
+    import numpy as np
     import pandas as pd
-    import unicodedata
-    import re
     from apps.validador.models import RegistroNovedades, ConceptoNovedades
+    from apps.validador.services.bulk_loader import BulkLoader
     
-    def normalizar_header(header: str) -> str:
-        """Normaliza header para comparación."""
-        texto = str(header).lower().strip()
-        texto = unicodedata.normalize('NFD', texto)
-        texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
-        texto = re.sub(r'[^a-z0-9\s]', '', texto)
-        texto = re.sub(r'\s+', '_', texto.strip())
-        return texto
-    
-    # Leer archivo
-    if archivo.extension == '.csv':
-        df = pd.read_csv(archivo.archivo.path)
-    else:
-        df = pd.read_excel(archivo.archivo.path)
+    df = _leer_archivo(archivo)
     
     cierre = archivo.cierre
     cliente = cierre.cliente
@@ -362,7 +345,7 @@ def _procesar_novedades(archivo):
     columnas_excluir = {rut_col.lower().strip() if rut_col else ''}
     if nombre_col:
         columnas_excluir.add(nombre_col.lower().strip())
-    columnas_excluir.update(['rut', 'nombre', 'fecha', 'periodo', 'observacion', 'observaciones'])
+    columnas_excluir.update(COLUMNAS_NO_ITEM)
     columnas_item = [col for col in df.columns if col.lower().strip() not in columnas_excluir]
     
     # Pre-cargar ConceptoNovedades del cliente para evitar N+1 queries
@@ -370,60 +353,58 @@ def _procesar_novedades(archivo):
     for concepto in ConceptoNovedades.objects.filter(cliente=cliente, activo=True).select_related('concepto_libro'):
         conceptos_dict[concepto.header_normalizado] = concepto
     
+    # Resolver concepto una vez por columna; separar las sin_asignacion
+    conceptos_item = {col: conceptos_dict.get(_normalizar_header(col)) for col in columnas_item}
+    columnas_ignoradas = [
+        col for col, concepto in conceptos_item.items()
+        if concepto and concepto.sin_asignacion
+    ]
+    columnas_item = [col for col in columnas_item if col not in columnas_ignoradas]
+    
     # Limpiar registros anteriores del cierre
     RegistroNovedades.objects.filter(cierre=cierre).delete()
     
-    registros_creados = 0
-    registros_ignorados = 0  # Items sin_asignacion
-    registros_batch = []
+    # Filas con RUT
+    ruts = df[rut_col].astype(str).str.strip()
+    filas_validas = ((ruts != '') & (ruts != 'nan')).to_numpy()
+    df = df[filas_validas]
+    ruts = ruts[filas_validas].tolist()
+    if nombre_col:
+        nombres = df[nombre_col].where(df[nombre_col].notna(), '').astype(str).str.strip().tolist()
+    else:
+        nombres = [''] * len(df)
+    
+    def matriz_montos(columnas):
+        """Montos numéricos (filas × columnas); no convertibles o nulos = 0."""
+        if not columnas:
+            return np.zeros((len(df), 0))
+        return np.column_stack([
+            pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float)
+            for col in columnas
+        ])
+    
+    registros_ignorados = int(np.count_nonzero(matriz_montos(columnas_ignoradas)))
+    
+    # Formato largo: solo celdas con monto (orden fila → columna)
+    montos = matriz_montos(columnas_item)
+    filas, columnas = np.nonzero(montos)
+    nombres_item = [col.strip() for col in columnas_item]
+    conceptos = [conceptos_item[col] for col in columnas_item]
+    
+    registros = (
+        RegistroNovedades(
+            cierre=cierre,
+            rut_empleado=ruts[fila],
+            nombre_empleado=nombres[fila],
+            nombre_item=nombres_item[columna],
+            concepto_novedades=conceptos[columna],
+            monto=monto,
+        )
+        for fila, columna, monto in zip(filas.tolist(), columnas.tolist(), montos[filas, columnas].tolist())
+    )
     
-    for _, row in df.iterrows():
-        rut = str(row[rut_col]).strip()
-        if not rut or rut == 'nan':
-            continue
-        
-        # Extraer nombre, manejando NaN de pandas
-        if nombre_col and pd.notna(row[nombre_col]):
-            nombre = str(row[nombre_col]).strip()
-        else:
-            nombre = ''
-        
-        for nombre_item in columnas_item:
-            try:
-                monto = float(row[nombre_item]) if pd.notna(row[nombre_item]) else 0
-            except (ValueError, TypeError):
-                monto = 0
-            
-            if monto == 0:
-                continue
-            
-            # Buscar ConceptoNovedades por header normalizado
-            header_normalizado = normalizar_header(nombre_item)
-            concepto = conceptos_dict.get(header_normalizado)
-            
-            # Ignorar items marcados como sin_asignacion
-            if concepto and concepto.sin_asignacion:
-                registros_ignorados += 1
-                continue
-            
-            registros_batch.append(RegistroNovedades(
-                cierre=cierre,
-                rut_empleado=rut,
-                nombre_empleado=nombre,
-                nombre_item=nombre_item.strip(),
-                concepto_novedades=concepto,
-                monto=monto,
-            ))
-            registros_creados += 1
-            
-            # Bulk insert cada 1000 registros
-            if len(registros_batch) >= 1000:
-                RegistroNovedades.objects.bulk_create(registros_batch)
-                registros_batch = []
-    
-    # Insertar registros restantes
-    if registros_batch:
-        RegistroNovedades.objects.bulk_create(registros_batch)
+    # Carga masiva por lotes (COPY en PostgreSQL)
+    registros_creados = BulkLoader.cargar(RegistroNovedades, registros)
     
     return {
         'filas': registros_creados,
@@ -431,280 +412,51 @@ def _procesar_novedades(archivo):
     }
 
 
-def _procesar_asistencias(archivo):
-    """
-    Procesa el archivo de Ausentismos del analista.
-    
-    Formato esperado (headers en fila 1):
-    - Rut
-    - Nombre
-    - Fecha Inicio Ausencia
-    - Fecha Fin Ausencia
-    - Tipo Ausentismo
+def _procesar_movimientos(archivo):
     """
-    import pandas as pd
-    from apps.validador.models import MovimientoAnalista
-    
-    if archivo.extension == '.csv':
-        df = pd.read_csv(archivo.archivo.path)
-    else:
-        df = pd.read_excel(archivo.archivo.path)
-    
-    cierre = archivo.cierre
+    Procesa un archivo de movimientos del analista (Ausentismos, Finiquitos,
+    Ingresos) según su especificación en ESPECIFICACIONES_MOVIMIENTOS.
     
-    # Mapeo de columnas (case-insensitive)
-    col_map = {}
-    for col in df.columns:
-        col_lower = col.lower().strip()
-        if 'rut' in col_lower:
-            col_map['rut'] = col
-        elif 'nombre' in col_lower:
-            col_map['nombre'] = col
-        elif 'inicio' in col_lower and ('fecha' in col_lower or 'ausencia' in col_lower):
-            col_map['fecha_inicio'] = col
-        elif 'fin' in col_lower and ('fecha' in col_lower or 'ausencia' in col_lower):
-            col_map['fecha_fin'] = col
-        elif 'tipo' in col_lower and 'ausentismo' in col_lower:
-            col_map['tipo_ausentismo'] = col
-    
-    if 'rut' not in col_map:
-        raise ValueError("No se encontró columna de RUT")
-    
-    # Eliminar movimientos anteriores de este archivo (para re-procesamiento)
-    MovimientoAnalista.objects.filter(archivo_analista=archivo).delete()
-    
-    # Mapeo de tipo ausentismo -> tipo movimiento
-    MAPEO_TIPO = {
-        'licencia': 'licencia',
-        'licencia medica': 'licencia',
-        'licencia médica': 'licencia',
-        'licencia maternal': 'licencia',
-        'vacacion': 'vacaciones',
-        'vacaciones': 'vacaciones',
-        'permiso': 'permiso',
-        'permiso con goce': 'permiso',
-        'permiso sin goce': 'permiso',
-        'ausencia': 'ausencia',
-        'ausencia no justificada': 'ausencia',
-        'ausencia injustificada': 'ausencia',
-        'falta': 'ausencia',
-    }
-    
-    movimientos = []
-    filas_procesadas = 0
-    filas_omitidas = 0
-    
-    for idx, row in df.iterrows():
-        rut_raw = row.get(col_map['rut'], '')
-        rut = normalizar_rut(rut_raw)
-        if not rut:
-            filas_omitidas += 1
-            continue
-        
-        nombre = str(row.get(col_map.get('nombre', ''), '')).strip()
-        if nombre == 'nan':
-            nombre = ''
-        
-        # Parsear fechas
-        fecha_inicio = parse_fecha(row.get(col_map.get('fecha_inicio')))
-        fecha_fin = parse_fecha(row.get(col_map.get('fecha_fin')))
-        
-        # Tipo ausentismo
-        tipo_ausentismo_raw = str(row.get(col_map.get('tipo_ausentismo', ''), '')).strip()
-        tipo_ausentismo_lower = tipo_ausentismo_raw.lower()
-        
-        # Determinar tipo de movimiento
-        tipo = 'otro'
-        for key, value in MAPEO_TIPO.items():
-            if key in tipo_ausentismo_lower:
-                tipo = value
-                break
-        
-        # Calcular días si hay fechas
-        dias = None
-        if fecha_inicio and fecha_fin:
-            dias = (fecha_fin - fecha_inicio).days + 1
-        
-        # Sanitizar datos_raw
-        datos_raw = sanitizar_datos_raw(row.to_dict())
-        
-        movimientos.append(MovimientoAnalista(
-            cierre=cierre,
-            archivo_analista=archivo,
-            tipo=tipo,
-            origen='asistencias',
-            rut=rut,
-            nombre=nombre,
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin,
-            dias=dias,
-            tipo_ausentismo=tipo_ausentismo_raw,
-            datos_raw=datos_raw,
-        ))
-        filas_procesadas += 1
-    
-    # Bulk create
-    if movimientos:
-        MovimientoAnalista.objects.bulk_create(movimientos)
-    
-    logger.info(f"Ausentismos procesados: {filas_procesadas}, omitidas: {filas_omitidas}")
-    return {'filas': filas_procesadas, 'omitidas': filas_omitidas}
+    Formatos esperados (headers en fila 1):
+    - Asistencias: Rut, Nombre, Fecha Inicio Ausencia, Fecha Fin Ausencia, Tipo Ausentismo
+    - Finiquitos: Rut, Nombre, Fecha Retiro, Motivo
+    - Ingresos: Rut, Nombre, Fecha Ingreso
+    """
+    from apps.validador.services.ingesta_movimientos import (
+        ESPECIFICACIONES_MOVIMIENTOS,
+        IngestaMovimientos,
+    )
+    
+    especificacion = ESPECIFICACIONES_MOVIMIENTOS[archivo.tipo]
+    df = _leer_archivo(archivo)
+    
+    resultado = IngestaMovimientos.cargar(archivo, df, especificacion)
+    _guardar_datos_raw(archivo, df)
+    
+    logger.info(
+        f"Movimientos {archivo.tipo} procesados: {resultado['filas']}, "
+        f"omitidas: {resultado['omitidas']}"
+    )
+    return resultado
 
 
-def _procesar_finiquitos(archivo):
-    """
-    Procesa el archivo de Finiquitos del analista.
-    
-    Formato esperado (headers en fila 1):
-    - Rut
-    - Nombre
-    - Fecha Retiro
-    - Motivo
-    """
-    import pandas as pd
-    from apps.validador.models import MovimientoAnalista
-    
+def _leer_archivo(archivo):
+    """Lee el archivo del analista (CSV con formato detectado o Excel cacheado)."""
     if archivo.extension == '.csv':
-        df = pd.read_csv(archivo.archivo.path)
-    else:
-        df = pd.read_excel(archivo.archivo.path)
-    
-    cierre = archivo.cierre
-    
-    # Mapeo de columnas (case-insensitive)
-    col_map = {}
-    for col in df.columns:
-        col_lower = col.lower().strip()
-        if 'rut' in col_lower:
-            col_map['rut'] = col
-        elif 'nombre' in col_lower:
-            col_map['nombre'] = col
-        elif 'fecha' in col_lower and 'retiro' in col_lower:
-            col_map['fecha_retiro'] = col
-        elif 'motivo' in col_lower or 'causal' in col_lower:
-            col_map['motivo'] = col
-    
-    if 'rut' not in col_map:
-        raise ValueError("No se encontró columna de RUT")
-    
-    # Eliminar movimientos anteriores de este archivo
-    MovimientoAnalista.objects.filter(archivo_analista=archivo).delete()
-    
-    movimientos = []
-    filas_procesadas = 0
-    filas_omitidas = 0
-    
-    for idx, row in df.iterrows():
-        rut_raw = row.get(col_map['rut'], '')
-        rut = normalizar_rut(rut_raw)
-        if not rut:
-            filas_omitidas += 1
-            continue
-        
-        nombre = str(row.get(col_map.get('nombre', ''), '')).strip()
-        if nombre == 'nan':
-            nombre = ''
-        
-        fecha_retiro = parse_fecha(row.get(col_map.get('fecha_retiro')))
-        
-        causal = str(row.get(col_map.get('motivo', ''), '')).strip()
-        if causal == 'nan':
-            causal = ''
-        
-        datos_raw = sanitizar_datos_raw(row.to_dict())
-        
-        movimientos.append(MovimientoAnalista(
-            cierre=cierre,
-            archivo_analista=archivo,
-            tipo='baja',
-            origen='finiquitos',
-            rut=rut,
-            nombre=nombre,
-            fecha_fin=fecha_retiro,  # fecha_fin = fecha de retiro
-            causal=causal,
-            datos_raw=datos_raw,
-        ))
-        filas_procesadas += 1
-    
-    if movimientos:
-        MovimientoAnalista.objects.bulk_create(movimientos)
-    
-    logger.info(f"Finiquitos procesados: {filas_procesadas}, omitidas: {filas_omitidas}")
-    return {'filas': filas_procesadas, 'omitidas': filas_omitidas}
+        return leer_csv_detectado(archivo.archivo.path, header=0)
+    return leer_excel_cacheado(archivo.archivo.path)
 
 
-def _procesar_ingresos(archivo):
+def _guardar_datos_raw(archivo, df):
     """
-    Procesa el archivo de Ingresos del analista.
+    Guarda las filas originales del archivo en un solo blob comprimido.
     
-    Formato esperado (headers en fila 1):
-    - Rut
-    - Nombre
-    - Fecha Ingreso
+    Los MovimientoAnalista referencian su fila con fila_raw (posición en df).
     """
-    import pandas as pd
-    from apps.validador.models import MovimientoAnalista
-    
-    if archivo.extension == '.csv':
-        df = pd.read_csv(archivo.archivo.path)
-    else:
-        df = pd.read_excel(archivo.archivo.path)
-    
-    cierre = archivo.cierre
-    
-    # Mapeo de columnas (case-insensitive)
-    col_map = {}
-    for col in df.columns:
-        col_lower = col.lower().strip()
-        if 'rut' in col_lower:
-            col_map['rut'] = col
-        elif 'nombre' in col_lower:
-            col_map['nombre'] = col
-        elif 'fecha' in col_lower and 'ingreso' in col_lower:
-            col_map['fecha_ingreso'] = col
+    from apps.validador.models import DatosRawArchivo
     
-    if 'rut' not in col_map:
-        raise ValueError("No se encontró columna de RUT")
-    
-    # Eliminar movimientos anteriores de este archivo
-    MovimientoAnalista.objects.filter(archivo_analista=archivo).delete()
-    
-    movimientos = []
-    filas_procesadas = 0
-    filas_omitidas = 0
-    
-    for idx, row in df.iterrows():
-        rut_raw = row.get(col_map['rut'], '')
-        rut = normalizar_rut(rut_raw)
-        if not rut:
-            filas_omitidas += 1
-            continue
-        
-        nombre = str(row.get(col_map.get('nombre', ''), '')).strip()
-        if nombre == 'nan':
-            nombre = ''
-        
-        fecha_ingreso = parse_fecha(row.get(col_map.get('fecha_ingreso')))
-        
-        datos_raw = sanitizar_datos_raw(row.to_dict())
-        
-        movimientos.append(MovimientoAnalista(
-            cierre=cierre,
-            archivo_analista=archivo,
-            tipo='alta',
-            origen='ingresos',
-            rut=rut,
-            nombre=nombre,
-            fecha_inicio=fecha_ingreso,  # fecha_inicio = fecha de ingreso
-            datos_raw=datos_raw,
-        ))
-        filas_procesadas += 1
-    
-    if movimientos:
-        MovimientoAnalista.objects.bulk_create(movimientos)
-    
-    logger.info(f"Ingresos procesados: {filas_procesadas}, omitidas: {filas_omitidas}")
-    return {'filas': filas_procesadas, 'omitidas': filas_omitidas}
+    contenido, tamano_original = comprimir_dataframe(df)
+    DatosRawArchivo.guardar(archivo, contenido, tamano_original, len(df))
 
 
 def _verificar_mapeo_pendiente(cierre):
@@ -15,18 +15,24 @@ from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from django.utils import timezone
+from itertools import islice
 from pathlib import Path
 import logging
 import os
 
 from apps.validador.utils import (
+    comprimir_filas,
+    leer_excel_cacheado,
     mask_rut,
-    sanitizar_datos_raw,
+    normalizar_montos,
     validar_ruta_archivo,
 )
 
 logger = logging.getLogger(__name__)
 
+# Filas por statement en los upserts del libro (EmpleadoCierre/RegistroConcepto)
+LOTE_UPSERT = 2000
+
 
 @shared_task(bind=True, max_retries=3, soft_time_limit=600, time_limit=720)
 def procesar_archivo_erp(self, archivo_id, usuario_id=None):
@@ -95,102 +101,149 @@ def procesar_archivo_erp(self, archivo_id, usuario_id=None):
 
 
 def _procesar_libro_remuneraciones(archivo):
-    """Procesa el Libro de Remuneraciones."""
-    import pandas as pd
+    """
+    Procesa el Libro de Remuneraciones (flujo EmpleadoCierre/ConceptoCliente).
+    
+    Pipeline por conjuntos, sin queries por fila ni por celda:
+    1. Catálogo de conceptos sincronizado y precargado en un dict
+    2. Matriz de montos (empleados x conceptos) y totales por empleado
+       (haberes/descuentos/líquido) calculados con NumPy
+    3. EmpleadoCierre y RegistroConcepto escritos con
+       bulk_create(update_conflicts=True) por lotes
+    
+    Si un RUT se repite en el archivo prevalece la última fila.
+    """
+    import numpy as np
     from apps.validador.models import (
         ConceptoCliente,
         EmpleadoCierre,
         RegistroConcepto,
     )
+    from apps.validador.services.catalogo_service import CatalogoService
     
     # Leer Excel
-    df = pd.read_excel(archivo.archivo.path)
+    df = leer_excel_cacheado(archivo.archivo.path)
     
     cierre = archivo.cierre
     cliente = cierre.cliente
     
     # Identificar columnas de identificación (RUT, Nombre) vs conceptos
     columnas_id = ['rut', 'nombre', 'cargo', 'centro_costo', 'fecha_ingreso']
-    columnas_id_encontradas = [col for col in df.columns if col.lower().strip() in columnas_id]
     columnas_concepto = [col for col in df.columns if col.lower().strip() not in columnas_id]
+    rut_col = next((col for col in df.columns if col.lower().strip() == 'rut'), None)
+    nombre_col = next((col for col in df.columns if col.lower().strip() == 'nombre'), None)
     
-    # Crear/obtener conceptos
-    conceptos_creados = 0
-    for nombre_concepto in columnas_concepto:
-        concepto, created = ConceptoCliente.objects.get_or_create(
-            cliente=cliente,
-            nombre_erp=nombre_concepto.strip(),
-            defaults={'clasificado': False}
-        )
-        if created:
-            conceptos_creados += 1
-    
-    # Procesar empleados
-    empleados_procesados = 0
-    for _, row in df.iterrows():
-        # Buscar columna RUT
-        rut_col = next((col for col in df.columns if col.lower().strip() == 'rut'), None)
-        nombre_col = next((col for col in df.columns if col.lower().strip() == 'nombre'), None)
-        
-        if not rut_col:
-            continue
-        
-        rut = str(row[rut_col]).strip()
-        nombre = str(row[nombre_col]).strip() if nombre_col else ''
-        
-        if not rut or rut == 'nan':
-            continue
-        
-        # Crear/actualizar empleado
-        empleado, _ = EmpleadoCierre.objects.update_or_create(
+    # Crear/obtener conceptos (upsert por conjuntos)
+    resultado_catalogo = CatalogoService.sincronizar(
+        ConceptoCliente,
+        filtro={'cliente': cliente},
+        campos_clave=('nombre_erp',),
+        entradas=[{'nombre_erp': col.strip()} for col in columnas_concepto],
+        defaults={'clasificado': False},
+    )
+    conceptos_creados = resultado_catalogo.creados
+    
+    if not rut_col:
+        return {'filas': 0, 'conceptos_nuevos': conceptos_creados}
+    
+    # Filas con RUT (una por RUT, prevalece la última)
+    ruts = df[rut_col].astype(str).str.strip()
+    df = df[df[rut_col].notna() & ruts.ne('') & ruts.ne('nan')].copy()
+    df['_rut'] = ruts
+    df = df.drop_duplicates(subset='_rut', keep='last')
+    
+    if df.empty:
+        return {'filas': 0, 'conceptos_nuevos': conceptos_creados}
+    
+    # Conceptos por columna con su categoría, en una sola query
+    conceptos_por_nombre = {
+        c.nombre_erp: c
+        for c in ConceptoCliente.objects.filter(cliente=cliente).select_related('categoria')
+    }
+    conceptos = [conceptos_por_nombre[col.strip()] for col in columnas_concepto]
+    codigos = [c.categoria.codigo if c.categoria else None for c in conceptos]
+    es_haber = np.array([c in ('haberes_imponibles', 'haberes_no_imponibles') for c in codigos], dtype=bool)
+    es_descuento = np.array([c in ('descuentos_legales', 'otros_descuentos') for c in codigos], dtype=bool)
+    multiplicadores = np.array([float(c.multiplicador) for c in conceptos], dtype=np.float64)
+    
+    # Matriz de montos (empleados x conceptos) y totales vectorizados
+    if columnas_concepto:
+        montos = np.column_stack([
+            normalizar_montos(df[col]).to_numpy() for col in columnas_concepto
+        ])
+    else:
+        montos = np.zeros((len(df), 0))
+    total_haberes = montos[:, es_haber].sum(axis=1)
+    total_descuentos = montos[:, es_descuento].sum(axis=1)
+    
+    nombres = df[nombre_col].astype(str).str.strip().tolist() if nombre_col else [''] * len(df)
+    ruts_lista = df['_rut'].tolist()
+    
+    # Empleados: insert o update en un solo statement por lote
+    empleados = [
+        EmpleadoCierre(
             cierre=cierre,
             rut=rut,
-            defaults={'nombre': nombre}
+            nombre=nombre,
+            total_haberes=round(haberes, 2),
+            total_descuentos=round(descuentos, 2),
+            liquido=round(haberes - descuentos, 2),
+        )
+        for rut, nombre, haberes, descuentos in zip(
+            ruts_lista, nombres, total_haberes.tolist(), total_descuentos.tolist()
+        )
+    ]
+    EmpleadoCierre.objects.bulk_create(
+        empleados,
+        batch_size=LOTE_UPSERT,
+        update_conflicts=True,
+        unique_fields=['cierre', 'rut'],
+        update_fields=['nombre', 'total_haberes', 'total_descuentos', 'liquido'],
+    )
+    
+    # Con update_conflicts no todos los backends retornan los IDs
+    ids_por_rut = dict(
+        EmpleadoCierre.objects.filter(cierre=cierre).values_list('rut', 'id')
+    )
+    empleado_ids = [ids_por_rut[rut] for rut in ruts_lista]
+    
+    # Registros: una fila por celda con monto distinto de cero. Columnas que
+    # solo difieren en espacios ('BONO' y 'BONO ') son el mismo concepto: se
+    # escribe la última con monto, como hacía update_or_create celda a celda
+    vigentes = montos != 0
+    grupos = np.unique([c.id for c in conceptos], return_inverse=True)[1]
+    if len(grupos) > len(set(grupos.tolist())):
+        con_monto_posterior = np.zeros((len(df), grupos.max() + 1), dtype=bool)
+        for j in reversed(range(len(conceptos))):
+            columna = vigentes[:, j].copy()
+            vigentes[:, j] &= ~con_monto_posterior[:, grupos[j]]
+            con_monto_posterior[:, grupos[j]] |= columna
+    filas_idx, conceptos_idx = np.nonzero(vigentes)
+    montos_originales = montos[filas_idx, conceptos_idx]
+    montos_finales = montos_originales * multiplicadores[conceptos_idx]
+    
+    registros = (
+        RegistroConcepto(
+            empleado_id=empleado_ids[fila],
+            concepto_id=conceptos[concepto].id,
+            monto=round(monto, 2),
+            monto_original=round(original, 2),
+        )
+        for fila, concepto, monto, original in zip(
+            filas_idx.tolist(), conceptos_idx.tolist(),
+            montos_finales.tolist(), montos_originales.tolist()
+        )
+    )
+    for lote in iter(lambda: list(islice(registros, LOTE_UPSERT)), []):
+        RegistroConcepto.objects.bulk_create(
+            lote,
+            update_conflicts=True,
+            unique_fields=['empleado', 'concepto'],
+            update_fields=['monto', 'monto_original'],
         )
-        
-        # Crear registros por concepto
-        total_haberes = 0
-        total_descuentos = 0
-        
-        for nombre_concepto in columnas_concepto:
-            try:
-                monto = float(row[nombre_concepto]) if pd.notna(row[nombre_concepto]) else 0
-            except (ValueError, TypeError):
-                monto = 0
-            
-            if monto == 0:
-                continue
-            
-            concepto = ConceptoCliente.objects.get(
-                cliente=cliente,
-                nombre_erp=nombre_concepto.strip()
-            )
-            
-            RegistroConcepto.objects.update_or_create(
-                empleado=empleado,
-                concepto=concepto,
-                defaults={
-                    'monto': monto * concepto.multiplicador,
-                    'monto_original': monto,
-                }
-            )
-            
-            # Sumar a totales según categoría (si está clasificado)
-            if concepto.categoria:
-                if concepto.categoria.codigo in ['haberes_imponibles', 'haberes_no_imponibles']:
-                    total_haberes += monto
-                elif concepto.categoria.codigo in ['descuentos_legales', 'otros_descuentos']:
-                    total_descuentos += monto
-        
-        empleado.total_haberes = total_haberes
-        empleado.total_descuentos = total_descuentos
-        empleado.liquido = total_haberes - total_descuentos
-        empleado.save()
-        
-        empleados_procesados += 1
     
     return {
-        'filas': empleados_procesados,
+        'filas': len(empleados),
         'conceptos_nuevos': conceptos_creados,
     }
 
@@ -204,8 +257,9 @@ def _procesar_movimientos_mes(archivo):
     - Headers en fila 3, datos desde fila 4
     - Aplica regla RN-001: baja + plazo fijo + sin motivo = ignorar
     """
-    from apps.validador.models import MovimientoMes
+    from apps.validador.models import DatosRawArchivo, MovimientoMes
     from apps.validador.services.erp import ERPFactory
+    from apps.validador.services.bulk_loader import BulkLoader
     from datetime import datetime
     
     cierre = archivo.cierre
@@ -236,24 +290,26 @@ def _procesar_movimientos_mes(archivo):
     # Eliminar movimientos anteriores de este archivo (para re-procesamiento)
     MovimientoMes.objects.filter(archivo_erp=archivo).delete()
     
-    # Crear registros en bulk
-    movimientos_a_crear = []
-    
-    # Procesar altas y bajas
-    for registro in data.get('altas_bajas', []):
-        movimientos_a_crear.append(_crear_movimiento_desde_dict(cierre, archivo, registro))
+    registros = (
+        data.get('altas_bajas', []) +
+        data.get('ausentismos', []) +
+        data.get('vacaciones', [])
+    )
     
-    # Procesar ausentismos
-    for registro in data.get('ausentismos', []):
-        movimientos_a_crear.append(_crear_movimiento_desde_dict(cierre, archivo, registro))
+    # Filas originales: un solo blob comprimido por archivo, cada
+    # movimiento guarda su posición (fila_raw)
+    contenido, tamano_original = comprimir_filas(r.get('datos_raw', {}) for r in registros)
+    DatosRawArchivo.guardar(archivo, contenido, tamano_original, len(registros))
     
-    # Procesar vacaciones
-    for registro in data.get('vacaciones', []):
-        movimientos_a_crear.append(_crear_movimiento_desde_dict(cierre, archivo, registro))
+    # Crear registros en bulk
+    movimientos_a_crear = [
+        _crear_movimiento_desde_dict(cierre, archivo, registro, fila_raw)
+        for fila_raw, registro in enumerate(registros)
+    ]
     
-    # Bulk create para mejor performance
+    # Carga masiva (COPY en PostgreSQL)
     if movimientos_a_crear:
-        MovimientoMes.objects.bulk_create(movimientos_a_crear)
+        BulkLoader.cargar(MovimientoMes, movimientos_a_crear)
     
     total_creados = len(movimientos_a_crear)
     
@@ -277,8 +333,13 @@ def _procesar_movimientos_mes(archivo):
     }
 
 
-def _crear_movimiento_desde_dict(cierre, archivo, registro: dict):
-    """Crea instancia de MovimientoMes desde diccionario normalizado."""
+def _crear_movimiento_desde_dict(cierre, archivo, registro: dict, fila_raw: int = None):
+    """
+    Crea instancia de MovimientoMes desde diccionario normalizado.
+    
+    Los datos crudos no se copian al movimiento: quedan en DatosRawArchivo
+    y el movimiento guarda solo su posición (fila_raw).
+    """
     from apps.validador.models import MovimientoMes
     from datetime import datetime
     
@@ -298,21 +359,6 @@ def _crear_movimiento_desde_dict(cierre, archivo, registro: dict):
         except (ValueError, TypeError):
             pass
     
-    # Serializar datos_raw para evitar problemas con tipos no serializables
-    # NaN/Inf no son válidos en JSON, convertir a None
-    datos_raw = registro.get('datos_raw', {})
-    if datos_raw:
-        datos_raw_clean = {}
-        for k, v in datos_raw.items():
-            if isinstance(v, float) and (v != v or v == float('inf') or v == float('-inf')):
-                # NaN check: NaN != NaN es True
-                datos_raw_clean[k] = None
-            elif not isinstance(v, (str, int, float, bool, type(None))):
-                datos_raw_clean[k] = str(v)
-            else:
-                datos_raw_clean[k] = v
-        datos_raw = datos_raw_clean
-    
     return MovimientoMes(
         cierre=cierre,
         archivo_erp=archivo,
@@ -326,7 +372,7 @@ def _crear_movimiento_desde_dict(cierre, archivo, registro: dict):
         causal=registro.get('causal', ''),
         tipo_licencia=registro.get('tipo_licencia', ''),
         hoja_origen=registro.get('hoja_origen', ''),
-        datos_raw=datos_raw,
+        fila_raw=fila_raw,
     )
 
 
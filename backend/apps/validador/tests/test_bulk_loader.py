@@ -0,0 +1,47 @@
+"""
+Tests para BulkLoader (carga masiva con COPY).
+
+La serialización al formato texto de COPY no requiere PostgreSQL, por lo
+que se verifica directamente sobre la conexión de tests.
+"""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from apps.validador.models import RegistroNovedades
+from apps.validador.services.bulk_loader import BulkLoader
+
+
+class TestBulkLoaderSerializacion(SimpleTestCase):
+    """Formato de las filas enviadas a COPY FROM STDIN."""
+    
+    def _serializar(self, obj):
+        campos = [
+            f for f in RegistroNovedades._meta.concrete_fields
+            if not f.primary_key
+        ]
+        return BulkLoader._serializar_fila(obj, campos, connection)
+    
+    def test_fila_con_nulos_y_escapes(self):
+        registro = RegistroNovedades(
+            cierre_id=7,
+            rut_empleado='12345678-9',
+            nombre_empleado='Juan\tPérez\nSoto',
+            nombre_item='BONO \\ ESPECIAL',
+            concepto_novedades=None,
+            monto=Decimal('1500.50'),
+        )
+        
+        self.assertEqual(
+            self._serializar(registro),
+            '7\t12345678-9\tJuan\\tPérez\\nSoto\tBONO \\\\ ESPECIAL\t\\N\t1500.50\n',
+        )
+    
+    def test_monto_float_se_convierte_a_decimal(self):
+        registro = RegistroNovedades(
+            cierre_id=1, rut_empleado='1-9', nombre_item='X', monto=1212500.0,
+        )
+        
+        self.assertTrue(self._serializar(registro).endswith('\t1212500\n'))
@@ -0,0 +1,102 @@
+"""
+Tests para el caché de archivos parseados (utils.cache_parseo).
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from openpyxl import Workbook
+
+from apps.validador.utils import cache_parseo
+from apps.validador.utils.cache_parseo import (
+    eliminar_cache_archivo, leer_excel_cacheado, limpiar_cache,
+)
+
+
+class TestCacheParseo(SimpleTestCase):
+    """Lecturas repetidas del mismo archivo se sirven desde el sidecar."""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        override = override_settings(
+            PARSEO_CACHE_ACTIVO=True,
+            PARSEO_CACHE_DIR=self.cache_dir,
+            PARSEO_CACHE_MAX_SIZE=10 * 1024 * 1024,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['Rut', 'Nombre', 'SUELDO'])
+        for i in range(20):
+            ws.append([f'{i}-9', f'Empleado {i}', 1000 * i])
+        self.path = os.path.join(self.tmp, 'libro.xlsx')
+        wb.save(self.path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+    
+    def test_segunda_lectura_no_decodifica(self):
+        primera = leer_excel_cacheado(self.path, version='v1', header=0)
+        
+        with mock.patch.object(cache_parseo.pd, 'read_excel') as read_excel:
+            segunda = leer_excel_cacheado(self.path, version='v1', header=0)
+            parcial = leer_excel_cacheado(self.path, version='v1', header=0, nrows=0)
+        
+        read_excel.assert_not_called()
+        pd.testing.assert_frame_equal(primera, segunda)
+        self.assertEqual(list(parcial.columns), ['Rut', 'Nombre', 'SUELDO'])
+        self.assertEqual(len(parcial), 0)
+    
+    def test_version_distinta_invalida(self):
+        leer_excel_cacheado(self.path, version='v1', header=0)
+        
+        with mock.patch.object(
+            cache_parseo.pd, 'read_excel', wraps=pd.read_excel
+        ) as read_excel:
+            leer_excel_cacheado(self.path, version='v2', header=0)
+        
+        read_excel.assert_called_once()
+    
+    def test_desalojo_lru(self):
+        leer_excel_cacheado(self.path, version='v1', header=0)
+        leer_excel_cacheado(self.path, version='v2', header=0)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        
+        eliminados = limpiar_cache(max_size=0)
+        
+        self.assertEqual(eliminados, 2)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+    
+    def test_desalojo_por_antiguedad(self):
+        leer_excel_cacheado(self.path, version='v1', header=0)
+        leer_excel_cacheado(self.path, version='v2', header=0)
+        antiguo = os.path.join(self.cache_dir, sorted(os.listdir(self.cache_dir))[0])
+        hace_dos_semanas = time.time() - 14 * 24 * 60 * 60
+        os.utime(antiguo, (hace_dos_semanas, hace_dos_semanas))
+        
+        eliminados = limpiar_cache(max_dias=7)
+        
+        self.assertEqual(eliminados, 1)
+        self.assertNotIn(os.path.basename(antiguo), os.listdir(self.cache_dir))
+    
+    def test_eliminar_cache_archivo(self):
+        leer_excel_cacheado(self.path, version='v1', header=0)
+        leer_excel_cacheado(self.path, version='v2', header=0)
+        otro = os.path.join(self.tmp, 'otro.xlsx')
+        wb = Workbook()
+        wb.active.append(['Rut'])
+        wb.save(otro)
+        leer_excel_cacheado(otro, version='v1', header=0)
+        
+        eliminados = eliminar_cache_archivo(self.path)
+        
+        self.assertEqual(eliminados, 2)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
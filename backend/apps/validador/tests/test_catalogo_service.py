@@ -0,0 +1,64 @@
+"""
+Tests para CatalogoService (upsert por conjuntos de catálogos).
+"""
+
+from django.test import TestCase
+
+from apps.core.models import Cliente, ERP
+from apps.validador.models import ConceptoNovedades
+from apps.validador.services import CatalogoService
+
+
+class TestCatalogoService(TestCase):
+    
+    def setUp(self):
+        self.cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.erp = ERP.objects.create(slug='talana', nombre='Talana')
+    
+    def _sincronizar(self, headers):
+        return CatalogoService.sincronizar(
+            ConceptoNovedades,
+            filtro={'cliente': self.cliente, 'erp': self.erp},
+            campos_clave=('header_normalizado',),
+            entradas=[
+                {'header_normalizado': h.lower(), 'header_original': h, 'orden': i}
+                for i, h in enumerate(headers, start=1)
+            ],
+            campos_actualizables=['orden'],
+        )
+    
+    def test_crea_y_actualiza_en_queries_constantes(self):
+        primero = self._sincronizar(['Bono', 'Colacion'])
+        self.assertEqual(primero.creados, 2)
+        self.assertTrue(all(primero.ids))
+        
+        # SELECT + INSERT + UPDATE + SELECT, sin queries por header
+        with self.assertNumQueries(4):
+            segundo = self._sincronizar(['Colacion', 'Bono', 'Movilizacion', 'Viatico'])
+        
+        self.assertEqual(segundo.creados, 2)
+        self.assertEqual(segundo.actualizados, 2)
+        self.assertEqual(
+            list(ConceptoNovedades.objects.order_by('orden').values_list('header_original', flat=True)),
+            ['Colacion', 'Bono', 'Movilizacion', 'Viatico'],
+        )
+        self.assertEqual(
+            segundo.ids,
+            list(ConceptoNovedades.objects.order_by('orden').values_list('id', flat=True)),
+        )
+    
+    def test_claves_repetidas_usan_la_primera(self):
+        resultado = self._sincronizar(['Bono', 'BONO'])
+        
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual(ConceptoNovedades.objects.get().header_original, 'Bono')
+    
+    def test_actualizados_renuevan_fecha_actualizacion(self):
+        self._sincronizar(['Bono', 'Colacion'])
+        antes = dict(ConceptoNovedades.objects.values_list('header_original', 'fecha_actualizacion'))
+        
+        self._sincronizar(['Bono', 'Movilizacion', 'Colacion'])
+        
+        despues = dict(ConceptoNovedades.objects.values_list('header_original', 'fecha_actualizacion'))
+        self.assertEqual(despues['Bono'], antes['Bono'])
+        self.assertGreater(despues['Colacion'], antes['Colacion'])
@@ -0,0 +1,339 @@
+"""
+Tests para la comparación Libro vs Novedades.
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.models import ERP, Cliente
+from apps.validador.models import (
+    ArchivoAnalista, ArchivoERP, Cierre, ConceptoLibro, ConceptoNovedades, Discrepancia,
+    EmpleadoLibro, HuellaComparacion, MovimientoAnalista, MovimientoMes, RegistroLibro,
+    RegistroNovedades,
+)
+from apps.validador.constants import TOLERANCIA_MONTO_NOVEDADES, EstadoCierre
+from apps.validador.serializers import DiscrepanciaSerializer
+from apps.validador.services.previsualizacion_tolerancia import PrevisualizacionTolerancia
+from apps.validador.tasks.comparacion import (
+    _cantidad_particiones, _comparar_libro_novedades, _ruts_de_particion, _ruts_del_cierre,
+    ejecutar_comparacion, get_progreso_comparacion,
+)
+
+CAMPOS = (
+    'rut_empleado', 'nombre_empleado', 'nombre_item', 'nombre_item_novedades',
+    'monto_erp', 'monto_cliente', 'diferencia', 'descripcion', 'tipo', 'origen',
+)
+
+
+class DatosComparacion(TestCase):
+    """Cierre con libro y novedades: 5 pares comparables con diferencia."""
+    
+    def setUp(self):
+        self.cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.erp = ERP.objects.create(slug='talana', nombre='Talana')
+        self.cierre = Cierre.objects.create(cliente=self.cliente, periodo='2025-01')
+        archivos = [
+            ArchivoERP.objects.create(
+                cierre=self.cierre, tipo='libro_remuneraciones',
+                archivo=f'libro_{i}.xlsx', nombre_original=f'libro_{i}.xlsx',
+            )
+            for i in range(2)
+        ]
+        
+        self.archivo_novedades = ArchivoAnalista.objects.create(
+            cierre=self.cierre, tipo='novedades', archivo='novedades.xlsx',
+            nombre_original='novedades.xlsx', fecha_procesamiento=timezone.now(),
+        )
+        
+        sueldo = self._concepto('SUELDO BASE', 'haberes_imponibles')
+        self.bono = bono = self._concepto('BONO', None)
+        anticipo = self._concepto('ANTICIPO', 'descuentos_legales')
+        dias = self._concepto('DIAS TRABAJADOS', 'info_adicional')
+        
+        # (archivo, rut, nombre, concepto, monto)
+        libro = [
+            (0, '11111111-1', 'Ana', sueldo, '1000.50'),
+            (0, '11111111-1', 'Ana', bono, '1.50'),
+            (0, '11111111-1', 'Ana', anticipo, '-0.40'),
+            (0, '11111111-1', 'Ana', dias, '30'),
+            (0, '22222222-2', '', sueldo, '10'),
+            (1, '22222222-2', 'Luis', sueldo, '50'),
+            (0, '33333333-3', '', sueldo, '1234567.50'),
+            (0, '44444444-4', 'Sin novedades', sueldo, '500'),
+        ]
+        empleados = {}
+        for archivo, rut, nombre, concepto, monto in libro:
+            empleado = empleados.get((archivo, rut))
+            if empleado is None:
+                empleado = empleados[(archivo, rut)] = EmpleadoLibro.objects.create(
+                    cierre=self.cierre, archivo_erp=archivos[archivo], rut=rut, nombre=nombre,
+                )
+            RegistroLibro.objects.create(
+                cierre=self.cierre, empleado=empleado, concepto=concepto, monto=Decimal(monto),
+            )
+        
+        # (rut, nombre, concepto_libro, monto); None = concepto sin mapear
+        novedades = [
+            ('11111111-1', 'Ana Pérez', sueldo, '600'),
+            ('11111111-1', 'Ana Pérez', sueldo, '300'),
+            ('11111111-1', 'Ana Pérez', bono, '3'),
+            ('11111111-1', 'Ana Pérez', anticipo, '5'),
+            ('11111111-1', 'Ana Pérez', dias, '20'),
+            ('11111111-1', 'Ana Pérez', None, '999'),
+            ('22222222-2', 'Luis Soto', sueldo, '20'),
+            ('33333333-3', 'Rosa Díaz', sueldo, '0.25'),
+            ('55555555-5', 'Solo novedades', sueldo, '100'),
+        ]
+        for rut, nombre, concepto_libro, monto in novedades:
+            header = f'Nov {concepto_libro.header_original}' if concepto_libro else 'Sin mapeo'
+            concepto_novedades, _ = ConceptoNovedades.objects.get_or_create(
+                cliente=self.cliente, erp=self.erp, header_original=header,
+                defaults={'header_normalizado': header.lower().replace(' ', '_'),
+                          'concepto_libro': concepto_libro},
+            )
+            RegistroNovedades.objects.create(
+                cierre=self.cierre, rut_empleado=rut, nombre_empleado=nombre,
+                nombre_item=header, concepto_novedades=concepto_novedades, monto=Decimal(monto),
+            )
+    
+    def _concepto(self, header, categoria):
+        return ConceptoLibro.objects.create(
+            cliente=self.cliente, erp=self.erp, header_original=header,
+            header_normalizado=header.lower().replace(' ', '_'), categoria=categoria,
+        )
+
+
+
+class TestComparacionLibroNovedades(DatosComparacion):
+    """El motor SQL produce las mismas discrepancias que el motor en Python."""
+    
+    def _comparar(self, sql):
+        with override_settings(COMPARACION_SQL=sql):
+            resultado = _comparar_libro_novedades(self.cierre, self.cierre.id)
+        discrepancias = set(
+            Discrepancia.objects.filter(cierre=self.cierre).values_list(*CAMPOS)
+        )
+        return resultado, discrepancias
+    
+    def test_sql_igual_a_python(self):
+        resultado_python, discrepancias_python = self._comparar(False)
+        resultado_sql, discrepancias_sql = self._comparar(True)
+        
+        self.assertEqual(resultado_sql, resultado_python)
+        self.assertEqual(resultado_python, {'discrepancias': 5, 'pares_comparados': 5})
+        self.assertEqual(discrepancias_sql, discrepancias_python)
+    
+    def test_descripciones(self):
+        _, discrepancias = self._comparar(True)
+        self.assertEqual({d[7] for d in discrepancias}, {''})
+        
+        datos = DiscrepanciaSerializer(Discrepancia.objects.filter(cierre=self.cierre), many=True).data
+        descripciones = {(d['rut_empleado'], d['nombre_item']): d['descripcion'] for d in datos}
+        
+        self.assertEqual(
+            descripciones,
+            {
+                ('11111111-1', 'SUELDO BASE'):
+                    "'SUELDO BASE' (Libro) vs 'Nov SUELDO BASE' (Novedades): $1,000 vs $900 = $100",
+                ('11111111-1', 'BONO'):
+                    "'BONO' (Libro) vs 'Nov BONO' (Novedades): $2 vs $3 = $-2",
+                ('11111111-1', 'ANTICIPO'):
+                    "'ANTICIPO' (Libro) vs 'Nov ANTICIPO' (Novedades): $-0 vs $5 = $-5",
+                ('22222222-2', 'SUELDO BASE'):
+                    "'SUELDO BASE' (Libro) vs 'Nov SUELDO BASE' (Novedades): $50 vs $20 = $30",
+                ('33333333-3', 'SUELDO BASE'):
+                    "'SUELDO BASE' (Libro) vs 'Nov SUELDO BASE' (Novedades): $1,234,568 vs $0 = $1,234,567",
+            },
+        )
+
+
+class TestComparacionIncremental(DatosComparacion):
+    """Una segunda comparación solo recalcula lo que cambió."""
+    
+    def _discrepancias(self):
+        return {
+            (d.rut_empleado, d.nombre_item): d
+            for d in Discrepancia.objects.filter(cierre=self.cierre)
+        }
+    
+    def _resolver_todas(self):
+        Discrepancia.objects.filter(cierre=self.cierre).update(resuelta=True)
+    
+    def test_sin_cambios_devuelve_resultado_memorizado(self):
+        primera = ejecutar_comparacion(self.cierre.id)
+        self._resolver_todas()
+        huella = HuellaComparacion.objects.get(cierre=self.cierre)
+        
+        resultado = ejecutar_comparacion(self.cierre.id)
+        
+        self.assertEqual(HuellaComparacion.objects.get(cierre=self.cierre).fecha, huella.fecha)
+        self.assertEqual(resultado['libro'], primera['libro'])
+        self.assertEqual(resultado['libro'], {'discrepancias': 5, 'pares_comparados': 5})
+        self.assertEqual(resultado['total_discrepancias'], 5)
+        self.assertTrue(get_progreso_comparacion(self.cierre.id)['resultado']['memorizada'])
+        self.assertTrue(all(d.resuelta for d in self._discrepancias().values()))
+    
+    def test_sin_firma_conserva_resueltas(self):
+        ejecutar_comparacion(self.cierre.id)
+        self._resolver_todas()
+        HuellaComparacion.objects.filter(cierre=self.cierre).update(firma='')
+        
+        resultado = ejecutar_comparacion(self.cierre.id)
+        
+        self.assertEqual(resultado['libro'], {'discrepancias': 0, 'pares_comparados': 0})
+        self.assertEqual(resultado['total_discrepancias'], 5)
+        self.assertTrue(all(d.resuelta for d in self._discrepancias().values()))
+    
+    def test_novedades_modificadas_recalcula_solo_el_rut(self):
+        ejecutar_comparacion(self.cierre.id)
+        self._resolver_todas()
+        
+        # Re-proceso de novedades: Luis queda cuadrado con el libro
+        RegistroNovedades.objects.filter(rut_empleado='22222222-2').update(monto=Decimal('50'))
+        self.archivo_novedades.fecha_procesamiento = timezone.now()
+        self.archivo_novedades.save()
+        
+        resultado = ejecutar_comparacion(self.cierre.id)
+        
+        discrepancias = self._discrepancias()
+        self.assertEqual(resultado['libro'], {'discrepancias': 0, 'pares_comparados': 1})
+        self.assertNotIn(('22222222-2', 'SUELDO BASE'), discrepancias)
+        self.assertEqual(len(discrepancias), 4)
+        self.assertTrue(all(d.resuelta for d in discrepancias.values()))
+    
+    def test_cambio_de_categoria_recalcula_el_concepto(self):
+        ejecutar_comparacion(self.cierre.id)
+        self._resolver_todas()
+        
+        self.bono.categoria = 'info_adicional'
+        self.bono.save()
+        
+        ejecutar_comparacion(self.cierre.id)
+        
+        discrepancias = self._discrepancias()
+        self.assertNotIn(('11111111-1', 'BONO'), discrepancias)
+        self.assertEqual(len(discrepancias), 4)
+        self.assertTrue(all(d.resuelta for d in discrepancias.values()))
+    
+    def test_completa_recalcula_todo(self):
+        ejecutar_comparacion(self.cierre.id)
+        self._resolver_todas()
+        
+        ejecutar_comparacion(self.cierre.id, completa=True)
+        
+        discrepancias = self._discrepancias()
+        self.assertEqual(len(discrepancias), 5)
+        self.assertFalse(any(d.resuelta for d in discrepancias.values()))
+
+
+class TestComparacionParticionada(DatosComparacion):
+    """El chord por particiones de RUT da el mismo resultado que una sola tarea."""
+    
+    def setUp(self):
+        super().setUp()
+        for rut, tipo in (('11111111-1', 'alta'), ('66666666-6', 'baja'), ('77777777-7', 'alta')):
+            MovimientoMes.objects.create(cierre=self.cierre, tipo=tipo, rut=rut)
+        for rut, tipo in (('11111111-1', 'alta'), ('88888888-8', 'baja')):
+            MovimientoAnalista.objects.create(
+                cierre=self.cierre, tipo=tipo, origen='ingresos', rut=rut,
+            )
+        # Licencia informada por el cliente solo hasta el 15: fechas_diferentes
+        MovimientoMes.objects.create(
+            cierre=self.cierre, tipo='asistencia', rut='99999999-9',
+            fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 31),
+        )
+        MovimientoAnalista.objects.create(
+            cierre=self.cierre, tipo='licencia', origen='asistencias', rut='99999999-9',
+            fecha_inicio=date(2025, 1, 1), fecha_fin=date(2025, 1, 15),
+        )
+    
+    def _comparar(self, particiones):
+        with override_settings(COMPARACION_PARTICIONES=particiones, COMPARACION_PARTICIONES_MIN_RUTS=1):
+            ejecutar_comparacion(self.cierre.id, completa=True)
+        return set(Discrepancia.objects.filter(cierre=self.cierre).values_list(*CAMPOS, 'tipo_movimiento'))
+    
+    def test_particiones_sin_ruts_en_el_mensaje(self):
+        with override_settings(COMPARACION_PARTICIONES=3, COMPARACION_PARTICIONES_MIN_RUTS=1), \
+                patch('apps.validador.tasks.comparacion.chord') as chord:
+            ejecutar_comparacion(self.cierre.id, completa=True)
+        
+        firmas = list(chord.call_args.args[0])
+        self.assertEqual([f.args for f in firmas], [(self.cierre.id, i, 3) for i in range(3)])
+        
+        ruts = _ruts_del_cierre(self.cierre)
+        particiones = [_ruts_de_particion(self.cierre, i, 3) for i in range(3)]
+        self.assertEqual(set().union(*particiones), ruts)
+        self.assertEqual(sum(len(p) for p in particiones), len(ruts))
+    
+    @override_settings(COMPARACION_PARTICIONES=2)
+    def test_cantidad_particiones_acota_ruts(self):
+        self.assertEqual(_cantidad_particiones(3000), 2)
+        self.assertEqual(_cantidad_particiones(9000), 5)
+    
+    def test_igual_a_una_tarea(self):
+        una_tarea = self._comparar(1)
+        particionada = self._comparar(3)
+        
+        self.assertEqual(particionada, una_tarea)
+        self.assertEqual(len(particionada), 9)
+        self.assertIn('fechas_diferentes', {d[8] for d in particionada})
+        
+        licencia = Discrepancia.objects.get(cierre=self.cierre, tipo='fechas_diferentes')
+        self.assertEqual(
+            DiscrepanciaSerializer(licencia).data['descripcion'],
+            "El movimiento 'Asistencia' para 99999999-9 () tiene fechas distintas: "
+            "ERP 2025-01-01 → 2025-01-31, cliente 2025-01-01 → 2025-01-15",
+        )
+        
+        self.cierre.refresh_from_db()
+        self.assertEqual(self.cierre.estado, EstadoCierre.CON_DISCREPANCIAS)
+        self.assertEqual(self.cierre.total_discrepancias, 9)
+        self.assertTrue(HuellaComparacion.objects.filter(cierre=self.cierre).exists())
+
+
+class TestPrevisualizacionTolerancia(DatosComparacion):
+    """Varias tolerancias en una pasada, igual a la comparación y sin persistir."""
+    
+    def test_conteos_por_tolerancia(self):
+        result = PrevisualizacionTolerancia.previsualizar(self.cierre, ['100', '0', '1', '10'], muestra=1)
+        
+        self.assertTrue(result.success)
+        self.assertEqual(result.data['pares_comparados'], 5)
+        self.assertEqual(
+            [(t['tolerancia'], t['discrepancias']) for t in result.data['tolerancias']],
+            [('0', 5), ('1', 5), ('10', 3), ('100', 2)],
+        )
+        self.assertEqual(
+            result.data['tolerancias'][2]['por_categoria'],
+            {'haberes_imponibles': 3},
+        )
+        self.assertEqual(
+            [(t['desde'], t['hasta'], t['cantidad']) for t in result.data['tramos']],
+            [('0', '1', 0), ('1', '10', 2), ('10', '100', 1), ('100', None, 2)],
+        )
+        self.assertEqual(result.data['tramos'][1]['muestra'], [{
+            'rut_empleado': '11111111-1', 'nombre_empleado': 'Ana',
+            'nombre_item': 'ANTICIPO', 'nombre_item_novedades': 'Nov ANTICIPO',
+            'categoria': 'descuentos_legales',
+            'monto_erp': '-0.40', 'monto_cliente': '5.00', 'diferencia': '-5.40',
+        }])
+        self.assertFalse(Discrepancia.objects.filter(cierre=self.cierre).exists())
+    
+    def test_igual_a_la_comparacion(self):
+        result = PrevisualizacionTolerancia.previsualizar(
+            self.cierre, [TOLERANCIA_MONTO_NOVEDADES], categorias=['sin_categoria'],
+        )
+        _comparar_libro_novedades(self.cierre, self.cierre.id)
+        
+        self.assertEqual(result.data['tolerancias'][0]['discrepancias'], 1)
+        self.assertEqual(
+            Discrepancia.objects.filter(cierre=self.cierre, nombre_item='BONO').count(), 1,
+        )
+    
+    def test_tolerancia_invalida(self):
+        for tolerancias in (['abc'], ['-1'], [], ['nan'], ['snan'], ['1', 'inf'], ['1e30']):
+            self.assertFalse(PrevisualizacionTolerancia.previsualizar(self.cierre, tolerancias).success)
@@ -0,0 +1,74 @@
+"""
+Tests para el almacenamiento comprimido de datos_raw de movimientos.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from apps.core.models import Cliente
+from apps.validador.models import ArchivoAnalista, Cierre, DatosRawArchivo, MovimientoAnalista
+from apps.validador.utils.compresion_raw import (
+    comprimir_dataframe,
+    comprimir_filas,
+    descomprimir_bloques,
+    fila_raw,
+)
+from apps.validador.utils.normalizacion import sanitizar_datos_raw
+
+
+class TestCompresionRaw(SimpleTestCase):
+    
+    def test_filas_heterogeneas_ida_y_vuelta(self):
+        filas = [
+            {'Rut': '1-9', 'Dias': 3, 'Monto': 1.5},
+            {'Rut': '2-7', 'Dias': None, 'Monto': math.nan},
+            {'Rut': '3-5', 'Hoja': 'Vacaciones', 'Fecha': pd.Timestamp('2025-01-05')},
+            {'Rut': '4-3', 'Hoja': 'Vacaciones', 'Fecha': pd.NaT},
+        ]
+        
+        contenido, tamano = comprimir_filas(filas)
+        bloques = descomprimir_bloques(contenido)
+        
+        self.assertEqual(len(bloques), 2)
+        self.assertGreater(tamano, 0)
+        self.assertEqual(
+            [fila_raw(bloques, i) for i in range(len(filas))],
+            [sanitizar_datos_raw(f) for f in filas],
+        )
+        self.assertEqual(fila_raw(bloques, 10), {})
+        self.assertEqual(fila_raw([], 0), {})
+    
+    def test_dataframe_por_posicion(self):
+        df = pd.DataFrame({'Rut': ['1-9', '2-7'], 'Dias': [np.nan, 4.0]}, index=[5, 9])
+        
+        bloques = descomprimir_bloques(comprimir_dataframe(df)[0])
+        
+        self.assertEqual(fila_raw(bloques, 1), {'Rut': '2-7', 'Dias': 4.0})
+        self.assertEqual(fila_raw(bloques, 0), {'Rut': '1-9', 'Dias': None})
+
+
+class TestDatosRawArchivo(TestCase):
+    
+    def test_movimiento_carga_fila_bajo_demanda(self):
+        cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        cierre = Cierre.objects.create(cliente=cliente, periodo='2025-01')
+        archivo = ArchivoAnalista.objects.create(
+            cierre=cierre, tipo='finiquitos', nombre_original='finiquitos.xlsx',
+            archivo='cierres/finiquitos.xlsx',
+        )
+        df = pd.DataFrame({'Rut': ['11111111-1', '22222222-2'], 'Motivo': ['Renuncia', None]})
+        DatosRawArchivo.guardar(archivo, *comprimir_dataframe(df), total_filas=len(df))
+        movimiento = MovimientoAnalista.objects.create(
+            cierre=cierre, archivo_analista=archivo, tipo='baja', origen='finiquitos',
+            rut='22222222-2', fila_raw=1,
+        )
+        legacy = MovimientoAnalista.objects.create(
+            cierre=cierre, tipo='baja', origen='finiquitos', rut='3-5',
+            datos_raw={'Rut': '3-5'},
+        )
+        
+        self.assertEqual(movimiento.obtener_datos_raw(), {'Rut': '22222222-2', 'Motivo': None})
+        self.assertEqual(legacy.obtener_datos_raw(), {'Rut': '3-5'})
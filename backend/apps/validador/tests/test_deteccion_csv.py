@@ -0,0 +1,68 @@
+"""
+Tests para la detección de formato CSV por muestra.
+"""
+
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from apps.validador.services.erp.generic import GenericStrategy
+from apps.validador.utils.deteccion_csv import FormatoCSV, detectar_formato_csv, leer_csv_detectado
+
+
+class TestDeteccionCSV(SimpleTestCase):
+    
+    def _archivo(self, contenido: bytes) -> str:
+        fd, ruta = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(contenido)
+        self.addCleanup(os.remove, ruta)
+        return ruta
+    
+    def test_formatos(self):
+        casos = [
+            ('Rut;Nombre;Monto\n1-9;José;1.000\n2-7;Ñuñoa;2.000\n'.encode('latin-1'),
+             FormatoCSV(';', 'latin-1', 0)),
+            ('\ufeffRut,Nombre,Monto\n1-9,"Pérez, Ana",1000\n'.encode('utf-8'),
+             FormatoCSV(',', 'utf-8-sig', 0)),
+            (b'Rut\tNombre\tMonto\n1-9\tAna\t1000\n', FormatoCSV('\t', 'utf-8', 0)),
+            # Filas de título antes del header
+            (b'Reporte Nomina\n\nEmpresa;ACME\nRut;Nombre;Concepto;Monto\n1-9;Ana;Sueldo;1000\n',
+             FormatoCSV(';', 'utf-8', 2)),
+            (b'', FormatoCSV()),
+        ]
+        for contenido, esperado in casos:
+            with self.subTest(contenido=contenido[:20]):
+                self.assertEqual(detectar_formato_csv(self._archivo(contenido)), esperado)
+    
+    def test_muestra_cortada_en_multibyte(self):
+        contenido = ('Rut,Nombre\n' + '1-9,Ñandú\n' * 50).encode('utf-8')
+        corte = contenido.index('Ñ'.encode('utf-8'), 100) + 1
+        
+        formato = detectar_formato_csv(self._archivo(contenido), tamano_muestra=corte)
+        
+        self.assertEqual(formato, FormatoCSV(',', 'utf-8', 0))
+    
+    def test_file_like_conserva_posicion_y_lee_una_vez(self):
+        contenido = 'Rut;Concepto;Monto\n1-9;Sueldo;1000\n2-7;Bono;500\n'.encode('latin-1')
+        archivo = io.BytesIO(contenido)
+        
+        with patch('apps.validador.services.erp.base.pd.read_csv', wraps=pd.read_csv) as read_csv:
+            df = GenericStrategy()._leer_csv_inteligente(archivo)
+        
+        self.assertEqual(read_csv.call_count, 1)
+        self.assertEqual(list(df.columns), ['Rut', 'Concepto', 'Monto'])
+        self.assertEqual(len(df), 2)
+    
+    def test_lectura_por_lotes(self):
+        contenido = 'Titulo\nRut;Monto\n' + ''.join(f'{i}-9;{i}\n' for i in range(10))
+        ruta = self._archivo(contenido.encode('utf-8'))
+        
+        bloques = list(leer_csv_detectado(ruta, chunksize=4))
+        
+        self.assertEqual([len(b) for b in bloques], [4, 4, 2])
+        self.assertEqual(list(bloques[0].columns), ['Rut', 'Monto'])
@@ -0,0 +1,87 @@
+"""
+Tests para el emparejamiento de movimientos por intervalos.
+"""
+
+from datetime import date
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from apps.validador.services.emparejamiento_movimientos import EmparejamientoMovimientos
+
+ENERO = (date(2025, 1, 1), date(2025, 1, 31))
+
+
+def _movimientos(filas):
+    return pd.DataFrame(filas, columns=['rut', 'tipo', 'fecha_inicio', 'fecha_fin'])
+
+
+class TestEmparejamientoMovimientos(SimpleTestCase):
+    """Solapamiento por (RUT, familia) dentro del mes del cierre."""
+    
+    def _emparejar(self, erp, analista):
+        return EmparejamientoMovimientos.emparejar(_movimientos(erp), _movimientos(analista), *ENERO)
+    
+    def test_intervalos_identicos_cuadran(self):
+        resultado = self._emparejar(
+            [('1-9', 'asistencia', date(2025, 1, 5), date(2025, 1, 10)),
+             ('1-9', 'asistencia', date(2025, 1, 20), date(2025, 1, 22))],
+            [('1-9', 'permiso', date(2025, 1, 20), date(2025, 1, 22)),
+             ('1-9', 'licencia', date(2025, 1, 5), date(2025, 1, 10))],
+        )
+        
+        self.assertEqual(list(resultado.solo_erp), [])
+        self.assertEqual(list(resultado.solo_analista), [])
+        self.assertEqual(resultado.parciales, {})
+    
+    def test_varias_licencias_no_se_colapsan(self):
+        resultado = self._emparejar(
+            [('1-9', 'asistencia', date(2025, 1, 5), date(2025, 1, 10)),
+             ('1-9', 'asistencia', date(2025, 1, 20), date(2025, 1, 22))],
+            [('1-9', 'licencia', date(2025, 1, 5), date(2025, 1, 10)),
+             ('1-9', 'licencia', date(2025, 1, 25), date(2025, 1, 26))],
+        )
+        
+        self.assertEqual(list(resultado.solo_erp), [1])
+        self.assertEqual(list(resultado.solo_analista), [1])
+        self.assertEqual(resultado.parciales, {})
+    
+    def test_solapamiento_parcial(self):
+        resultado = self._emparejar(
+            [('1-9', 'asistencia', date(2025, 1, 1), date(2025, 1, 31)),
+             ('2-7', 'ingreso', date(2025, 1, 3), None)],
+            [('1-9', 'licencia', date(2025, 1, 1), date(2025, 1, 15)),
+             ('1-9', 'licencia', date(2025, 1, 16), date(2025, 1, 31)),
+             ('2-7', 'alta', date(2025, 1, 4), None)],
+        )
+        
+        self.assertEqual(resultado.parciales, {0: [0, 1], 1: [2]})
+        self.assertEqual(list(resultado.solo_erp), [])
+        self.assertEqual(list(resultado.solo_analista), [])
+    
+    def test_recorte_al_mes(self):
+        resultado = self._emparejar(
+            [('1-9', 'vacaciones', date(2024, 12, 20), date(2025, 1, 10)),
+             ('2-7', 'vacaciones', date(2024, 11, 1), date(2024, 11, 5))],
+            [('1-9', 'vacaciones', date(2025, 1, 1), date(2025, 1, 10))],
+        )
+        
+        self.assertEqual(list(resultado.solo_erp), [])
+        self.assertEqual(resultado.parciales, {})
+        self.assertEqual(list(resultado.ignorados_erp), [False, True])
+    
+    def test_distinta_familia_o_rut_no_empareja(self):
+        resultado = self._emparejar(
+            [('1-9', 'finiquito', None, date(2025, 1, 31))],
+            [('1-9', 'alta', date(2025, 1, 31), None),
+             ('2-7', 'baja', None, date(2025, 1, 31))],
+        )
+        
+        self.assertEqual(list(resultado.solo_erp), [0])
+        self.assertEqual(list(resultado.solo_analista), [0, 1])
+    
+    def test_lados_vacios(self):
+        resultado = self._emparejar([], [('1-9', 'alta', None, None)])
+        
+        self.assertEqual(list(resultado.solo_erp), [])
+        self.assertEqual(list(resultado.solo_analista), [0])
@@ -0,0 +1,218 @@
+"""
+Tests para LibroService (sincronización de conceptos y carga incremental del libro).
+"""
+
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import TestCase
+
+from apps.core.models import Cliente, ERP
+from apps.core.models.erp import ConfiguracionERPCliente
+from apps.validador.models import (
+    ArchivoERP, Cierre, ConceptoLibro, EmpleadoLibro, EsquemaLibro, RegistroLibro,
+)
+from apps.validador.parsers.talana import TalanaLibroParser
+from apps.validador.services import LibroService
+
+
+def _headers_info(nombres):
+    """HeaderInfo para una fila de headers (nombres estilo pandas)."""
+    return TalanaLibroParser().analizar_headers_duplicados(nombres)
+
+
+class TestSincronizarConceptos(TestCase):
+    """Firma de esquema y diff mínimo de ConceptoLibro."""
+    
+    EMPLEADO = ['Año', 'Mes', 'Rut Empresa', 'Rut', 'Nombre', 'Paterno', 'Materno', 'Días']
+    
+    def setUp(self):
+        self.cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.erp = ERP.objects.create(slug='talana', nombre='Talana')
+        ConfiguracionERPCliente.objects.create(
+            cliente=self.cliente, erp=self.erp, fecha_activacion=date(2025, 1, 1)
+        )
+        cierre = Cierre.objects.create(cliente=self.cliente, periodo='2025-01')
+        self.archivo = SimpleNamespace(cierre=cierre)
+        self.parser = TalanaLibroParser()
+    
+    def _sincronizar(self, headers):
+        return LibroService._sincronizar_conceptos(
+            self.archivo, _headers_info(self.EMPLEADO + headers), self.parser
+        )
+    
+    def test_crea_conceptos_y_guarda_firma(self):
+        resultado = self._sincronizar(['SUELDO', 'BONO', 'BONO.1'])
+        
+        conceptos = ConceptoLibro.objects.filter(cliente=self.cliente).order_by('orden')
+        self.assertEqual(
+            [(c.header_original, c.ocurrencia, c.header_normalizado) for c in conceptos],
+            [('SUELDO', 1, 'sueldo'), ('BONO', 1, 'bono'), ('BONO', 2, 'bono')],
+        )
+        self.assertEqual(resultado['nuevos'], 3)
+        self.assertEqual(resultado['conceptos_ids'], [c.id for c in conceptos])
+        self.assertEqual(EsquemaLibro.objects.get(cliente=self.cliente).conceptos_ids,
+                         resultado['conceptos_ids'])
+    
+    def test_misma_firma_no_consulta_conceptos(self):
+        primero = self._sincronizar(['SUELDO', 'AFP'])
+        
+        # Savepoint + ERP activo + firma + validación de ids + release,
+        # sin consultas por header
+        with self.assertNumQueries(5):
+            segundo = self._sincronizar(['SUELDO', 'AFP'])
+        
+        self.assertTrue(segundo['sin_cambios'])
+        self.assertEqual(segundo['conceptos_ids'], primero['conceptos_ids'])
+    
+    def test_diff_aplica_solo_cambios(self):
+        self._sincronizar(['SUELDO', 'AFP', 'BONO'])
+        resultado = self._sincronizar(['AFP', 'SUELDO', 'COLACION'])
+        
+        self.assertFalse(resultado['sin_cambios'])
+        self.assertEqual(resultado['nuevos'], 1)
+        self.assertEqual(resultado['actualizados'], 2)
+        self.assertEqual(resultado['removidos'], 1)
+        
+        ordenes = dict(
+            ConceptoLibro.objects.filter(cliente=self.cliente)
+            .values_list('header_original', 'orden')
+        )
+        self.assertEqual(ordenes, {'AFP': 8, 'SUELDO': 9, 'COLACION': 10, 'BONO': 10})
+    
+    
+    def test_clasificar_cuenta_solo_conceptos_del_esquema(self):
+        # BONO queda en el catálogo (clasificado) pero no viene en el libro actual
+        self._sincronizar(['SUELDO', 'BONO'])
+        ConceptoLibro.objects.filter(header_original='BONO').update(
+            categoria='haberes_no_imponibles'
+        )
+        self._sincronizar(['SUELDO', 'AFP'])
+        archivo = ArchivoERP.objects.create(
+            cierre=self.archivo.cierre, tipo='libro_remuneraciones', archivo='libro.xlsx',
+            estado='pendiente_clasificacion', headers_total=2, headers_clasificados=0,
+        )
+        
+        LibroService.clasificar_conceptos(
+            archivo, [{'header': 'SUELDO', 'categoria': 'haberes_imponibles'}], user=None
+        )
+        
+        archivo.refresh_from_db()
+        self.assertEqual(archivo.headers_clasificados, 1)
+        self.assertEqual(archivo.estado, 'pendiente_clasificacion')
+
+
+class TestProcesamientoIncremental(TestCase):
+    """Diff de empleados entre versiones del libro."""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        erp = ERP.objects.create(slug='talana', nombre='Talana')
+        self.cierre = Cierre.objects.create(cliente=cliente, periodo='2025-01')
+        self.sueldo = ConceptoLibro.objects.create(
+            cliente=cliente, erp=erp, header_original='SUELDO', categoria='haberes_imponibles'
+        )
+        self.bono = ConceptoLibro.objects.create(
+            cliente=cliente, erp=erp, header_original='BONO', categoria='haberes_imponibles'
+        )
+    
+    def _cargar(self, empleados):
+        """Crea una nueva versión del libro y la carga como lo hace procesar_libro."""
+        ArchivoERP.objects.filter(cierre=self.cierre).update(es_version_actual=False)
+        archivo = ArchivoERP.objects.create(
+            cierre=self.cierre, tipo='libro_remuneraciones', archivo='libro.xlsx'
+        )
+        diff = self._procesar(archivo, empleados)
+        archivo.estado = 'procesado'
+        archivo.save(update_fields=['estado'])
+        return archivo, diff
+    
+    def _procesar(self, archivo, empleados):
+        previos = LibroService._empleados_previos(archivo)
+        diff = LibroService._nuevo_diff()
+        LibroService._guardar_empleados(archivo, empleados, previos, diff)
+        LibroService._eliminar_ausentes(previos, diff)
+        return diff
+    
+    def _empleado(self, rut, sueldo, bono=None):
+        registros = [{'concepto': self.sueldo, 'monto': sueldo}]
+        if bono is not None:
+            registros.append({'concepto': self.bono, 'monto': bono})
+        return {'rut': rut, 'nombre': f'Empleado {rut}', 'registros': registros}
+    
+    def test_nueva_version_solo_escribe_cambios(self):
+        v1, diff = self._cargar([
+            self._empleado('1-9', Decimal('1000')),
+            self._empleado('2-7', Decimal('2000')),
+            self._empleado('3-5', Decimal('3000')),
+        ])
+        self.assertEqual(diff['nuevos'], 3)
+        sin_cambios_id = EmpleadoLibro.objects.get(rut='1-9').id
+        
+        v2, diff = self._cargar([
+            self._empleado('1-9', 1000.0),  # mismo monto, otro tipo
+            self._empleado('2-7', Decimal('2000'), bono=Decimal('500')),
+            self._empleado('4-3', Decimal('4000')),
+        ])
+        
+        self.assertEqual(
+            LibroService.resumen_diff(diff),
+            {'nuevos': 1, 'modificados': 1, 'eliminados': 1, 'sin_cambios': 1},
+        )
+        self.assertEqual(sorted(diff['ruts_afectados']), ['2-7', '3-5', '4-3'])
+        
+        self.assertEqual(self._ruts(v2), ['1-9', '2-7', '4-3'])
+        self.assertEqual(
+            self._montos(v2, '2-7'), [Decimal('500'), Decimal('2000')],
+        )
+        self.assertEqual(self._montos(v2, '1-9'), [Decimal('1000')])
+        
+        # La versión anterior queda intacta
+        self.assertEqual(self._ruts(v1), ['1-9', '2-7', '3-5'])
+        self.assertEqual(EmpleadoLibro.objects.get(archivo_erp=v1, rut='1-9').id, sin_cambios_id)
+        self.assertEqual(self._montos(v1, '2-7'), [Decimal('2000')])
+    
+    def test_reproceso_reescribe_solo_cambios(self):
+        v1, _ = self._cargar([
+            self._empleado('1-9', Decimal('1000')),
+            self._empleado('2-7', Decimal('2000')),
+        ])
+        sin_cambios_id = EmpleadoLibro.objects.get(rut='1-9').id
+        
+        diff = self._procesar(v1, [
+            self._empleado('1-9', Decimal('1000')),
+            self._empleado('2-7', Decimal('2500')),
+        ])
+        
+        self.assertEqual(
+            LibroService.resumen_diff(diff),
+            {'nuevos': 0, 'modificados': 1, 'eliminados': 0, 'sin_cambios': 1},
+        )
+        self.assertEqual(EmpleadoLibro.objects.get(rut='1-9').id, sin_cambios_id)
+        self.assertEqual(self._montos(v1, '2-7'), [Decimal('2500')])
+    
+    def test_eliminar_version_nueva_conserva_la_anterior(self):
+        v1, _ = self._cargar([
+            self._empleado('1-9', Decimal('1000')),
+            self._empleado('2-7', Decimal('2000')),
+        ])
+        v2, _ = self._cargar([
+            self._empleado('1-9', Decimal('1000')),
+            self._empleado('3-5', Decimal('3000')),
+        ])
+        
+        # Como ArchivoERPViewSet.perform_destroy: borra v2 y sus empleados
+        v2.delete()
+        
+        self.assertEqual(self._ruts(v1), ['1-9', '2-7'])
+        self.assertEqual(self._montos(v1, '1-9'), [Decimal('1000')])
+        self.assertEqual(self._montos(v1, '2-7'), [Decimal('2000')])
+    
+    def _ruts(self, archivo):
+        return sorted(EmpleadoLibro.objects.filter(archivo_erp=archivo).values_list('rut', flat=True))
+    
+    def _montos(self, archivo, rut):
+        return sorted(RegistroLibro.objects.filter(
+            empleado__archivo_erp=archivo, empleado__rut=rut,
+        ).values_list('monto', flat=True))
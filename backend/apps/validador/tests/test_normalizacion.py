@@ -0,0 +1,116 @@
+"""
+Paridad entre la normalización escalar y la vectorizada.
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from apps.validador.utils.normalizacion import (
+    calcular_dv,
+    normalizar_monto,
+    normalizar_rut,
+    parse_fecha,
+    validar_rut,
+)
+from apps.validador.utils.normalizacion_vectorial import (
+    normalizar_montos,
+    normalizar_ruts,
+    parse_fechas,
+    validar_dv_ruts,
+)
+
+
+MONTOS = [
+    1500000, 1500000.5, -25, 0, np.nan, None, True,
+    '1500000', '  1500000 ', '$ 1.212.500', '$1.234.567', '1.234', '1234.56',
+    '1.234,56', '120.000,5', '12,5', '-1.000', '1 000', '', 'abc', '$',
+    '1e3', '1.2.3,4', ',5', '.5', '1,234,567',
+]
+
+RUTS = [
+    '12.345.678-5', '12345678-5', '123456785', '12.345.678-9', '98765432k',
+    ' 9.876.543-3 ', '1-9', '10000013-K', '10000013-k', '5', '', 'abc-1',
+    '1234567890-1', '12-345-678', 12345678, None, np.nan,
+]
+
+FECHAS = [
+    datetime(2025, 1, 5, 10), pd.Timestamp('2025-02-01'), date(2025, 3, 1),
+    '05/01/2025', '2025-1-7', '31-12-2024', '2025/01/05', ' 2025-01-05 ',
+    '2025-01-05 00:00:00', '31/12/9999', '30/02/2025', 'x', '', 'NaN',
+    None, np.nan, pd.NaT, 45000,
+]
+
+
+class TestNormalizacionVectorial(SimpleTestCase):
+    """Cada función vectorizada da lo mismo que la escalar celda por celda."""
+    
+    def test_montos_igual_a_escalar(self):
+        serie = pd.Series(MONTOS, dtype=object)
+        
+        esperado = [normalizar_monto(m) for m in MONTOS]
+        obtenido = normalizar_montos(serie).tolist()
+        
+        self.assertEqual(obtenido, esperado)
+    
+    def test_montos_columnas_tipadas(self):
+        for serie in (
+            pd.Series([1, 2, 3]),
+            pd.Series([1.5, np.nan, -2.0]),
+            pd.Series([True, False]),
+            pd.Series(['1.000', '2,5', None]),
+        ):
+            with self.subTest(dtype=serie.dtype):
+                self.assertEqual(
+                    normalizar_montos(serie).tolist(),
+                    [normalizar_monto(m) for m in serie],
+                )
+    
+    def test_montos_conserva_indice(self):
+        serie = pd.Series(['$ 1.000', '2'], index=[10, 20])
+        
+        self.assertEqual(normalizar_montos(serie).index.tolist(), [10, 20])
+    
+    def test_ruts_igual_a_escalar(self):
+        serie = pd.Series(RUTS, dtype=object)
+        
+        esperado = [normalizar_rut(r) for r in RUTS]
+        obtenido = normalizar_ruts(serie).tolist()
+        
+        self.assertEqual(obtenido, esperado)
+    
+    def test_dv_igual_a_escalar(self):
+        normalizados = [normalizar_rut(r) for r in RUTS]
+        
+        esperado = [validar_rut(r) for r in normalizados]
+        obtenido = validar_dv_ruts(pd.Series(normalizados)).tolist()
+        
+        self.assertEqual(obtenido, esperado)
+        self.assertTrue(validar_rut('12345678-5'))
+        self.assertTrue(validar_rut('10000013-K'))
+        self.assertFalse(validar_rut('12345678-9'))
+    
+    def test_dv_aleatorios(self):
+        rng = np.random.default_rng(0)
+        cuerpos = [str(n) for n in rng.integers(1, 999_999_999, 2000)]
+        ruts = [f'{c}-{calcular_dv(c)}' for c in cuerpos]
+        # Un tercio con DV alterado
+        ruts = [
+            r if i % 3 else r[:-1] + ('0' if r[-1] != '0' else '1')
+            for i, r in enumerate(ruts)
+        ]
+        
+        self.assertEqual(
+            validar_dv_ruts(pd.Series(ruts)).tolist(),
+            [validar_rut(r) for r in ruts],
+        )
+    
+    def test_fechas_igual_a_escalar(self):
+        serie = pd.Series(FECHAS, dtype=object, index=range(100, 100 + len(FECHAS)))
+        
+        self.assertEqual(parse_fechas(serie).tolist(), [parse_fecha(f) for f in FECHAS])
+        
+        columna = pd.Series(pd.to_datetime(['2025-01-05 08:00', None]))
+        self.assertEqual(parse_fechas(columna).tolist(), [date(2025, 1, 5), None])
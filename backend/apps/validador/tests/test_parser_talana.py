@@ -0,0 +1,205 @@
+"""
+Tests para el parser del Libro de Remuneraciones de Talana.
+
+Verifica que el motor columnar (_parsear_columnar) produzca exactamente
+la misma estructura que el recorrido fila a fila (_parsear_filas), y que
+el modo streaming entregue los mismos empleados que el modo en memoria.
+"""
+
+import io
+import multiprocessing
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from openpyxl import Workbook
+
+from apps.validador.parsers.libro_compacto import LibroCompacto
+from apps.validador.parsers.talana import TalanaLibroParser
+from apps.validador.utils.lectura_headers import nombres_columnas_pandas
+
+
+def _concepto(categoria):
+    """Stub mínimo de ConceptoLibro (el parser solo lee .categoria)."""
+    return SimpleNamespace(categoria=categoria)
+
+
+def _libro_ejemplo():
+    """DataFrame de libro Talana y conceptos clasificados para los tests."""
+    columnas = [
+        'Año', 'Mes', 'Rut Empresa', 'Rut', 'Nombre', 'Paterno', 'Materno', 'Días',
+        'SUELDO', 'BONO', 'BONO.1', 'AFP', 'INFO', 'SIN CLASIFICAR',
+    ]
+    filas = [
+        [2025, 1, '76.123.456-7', '12.345.678-9', 'Juan', 'Pérez', 'Soto', 30,
+         1500000, '$ 1.212.500', '1.234,56', '120.000,5', 99, 10],
+        [2025, 1, '76.123.456-7', '98765432k', ' Ana ', np.nan, '', 30,
+         '1.234.567', None, 0, '12,5', 1, 'abc'],
+        [2025, 1, '76.123.456-7', None, 'Sin', 'Rut', '', 30,
+         100, 200, 300, 400, 500, 600],
+        [2025, 1, '76.123.456-7', '11.111.111-1', None, None, None, 30,
+         -5, 'abc', '', np.nan, 1, 1],
+    ]
+    df = pd.DataFrame(filas, columns=columnas)
+    conceptos = {
+        'SUELDO': _concepto('haberes_imponibles'),
+        'BONO': _concepto('haberes_no_imponibles'),
+        'BONO.1': _concepto('haberes_no_imponibles'),
+        'AFP': _concepto('descuentos_legales'),
+        'INFO': _concepto('info_adicional'),
+    }
+    return df, conceptos
+
+
+class TestTalanaParserColumnar(SimpleTestCase):
+    """Paridad entre modo columnar y modo por filas."""
+    
+    def setUp(self):
+        self.parser = TalanaLibroParser()
+        self.df, self.conceptos = _libro_ejemplo()
+    
+    def test_columnar_igual_a_filas(self):
+        headers_info = self.parser.analizar_headers_duplicados(self.df.columns)
+        
+        esperado = self.parser._parsear_filas(self.df, self.conceptos, headers_info)
+        obtenido = self.parser._parsear_columnar(self.df, self.conceptos)
+        
+        self.assertEqual(obtenido, esperado)
+    
+    def test_columnar_filtra_montos_y_categorias(self):
+        empleados, errores = self.parser._parsear_columnar(self.df, self.conceptos)
+        
+        self.assertEqual(len(empleados), 3)
+        self.assertEqual(errores, ['Fila 4: No se encontró RUT'])
+        
+        primero = empleados[0]
+        self.assertEqual(primero['rut'], '12345678-9')
+        self.assertEqual(primero['nombre'], 'Juan Pérez Soto')
+        self.assertEqual(
+            [r['monto'] for r in primero['registros']],
+            [1500000.0, 1212500.0, 1234.56, 120000.5],
+        )
+        # Montos <= 0 y conceptos info_adicional no generan registros
+        self.assertEqual(empleados[2]['registros'], [])
+    
+    def test_libro_compacto_vista_y_bloques(self):
+        empleados, _ = self.parser._parsear_columnar(self.df, self.conceptos)
+        dicts = list(empleados)
+        
+        self.assertIsInstance(empleados, LibroCompacto)
+        self.assertEqual(empleados.n_registros, sum(len(e['registros']) for e in dicts))
+        self.assertEqual(LibroCompacto.desde_dicts(dicts), dicts)
+        # Los bloques contiguos reconstruyen el libro completo
+        self.assertEqual(list(empleados[:1]) + list(empleados[1:]), dicts)
+        self.assertEqual(empleados[-1], dicts[-1])
+    
+    def test_paralelo_igual_a_secuencial(self):
+        esperado = self.parser._parsear_columnar(self.df, self.conceptos)
+        
+        for procesos in (2, 3):
+            with self.subTest(procesos=procesos):
+                obtenido = self.parser._parsear_columnar_paralelo(
+                    self.df, self.conceptos, procesos
+                )
+                self.assertEqual(obtenido, esperado)
+    
+    def test_paralelo_dentro_de_proceso_daemon(self):
+        # Como en un worker prefork de Celery: los procesos deben crearse igual,
+        # sin caer al parseo en el proceso actual
+        esperado = self.parser._parsear_columnar(self.df, self.conceptos)
+        ctx = multiprocessing.get_context('fork')
+        cola = ctx.Queue()
+        
+        def parsear_en_daemon():
+            with mock.patch.object(
+                self.parser, '_parsear_columnar', wraps=self.parser._parsear_columnar
+            ) as secuencial:
+                obtenido = self.parser._parsear_columnar_paralelo(self.df, self.conceptos, 2)
+            cola.put((obtenido == esperado, secuencial.call_count))
+        
+        proceso = ctx.Process(target=parsear_en_daemon, daemon=True)
+        proceso.start()
+        igual, llamadas_secuenciales = cola.get(timeout=60)
+        proceso.join()
+        
+        self.assertTrue(igual)
+        self.assertEqual(llamadas_secuenciales, 0)
+    
+    @override_settings(LIBRO_PARALELO_PROCESOS=4, LIBRO_PARALELO_MIN_FILAS=100)
+    def test_procesos_paralelos_respeta_minimo(self):
+        self.assertEqual(self.parser.procesos_paralelos(99), 1)
+        self.assertEqual(self.parser.procesos_paralelos(100), 4)
+
+
+@override_settings(PARSEO_CACHE_ACTIVO=False)
+class TestTalanaParserStreaming(SimpleTestCase):
+    """Paridad de las lecturas openpyxl (streaming, headers) con pandas."""
+    
+    def setUp(self):
+        self.parser = TalanaLibroParser()
+        self.df, self.conceptos = _libro_ejemplo()
+        wb = Workbook()
+        ws = wb.active
+        ws.title = 'Libro'
+        # Header duplicado 'BONO' para verificar los nombres estilo pandas
+        ws.append([c if c != 'BONO.1' else 'BONO' for c in self.df.columns])
+        for fila in self.df.itertuples(index=False):
+            ws.append([None if pd.isna(v) else v for v in fila])
+        ws.append([None] * len(self.df.columns))
+        ws.append(list(self.df.iloc[0]))
+        
+        fd, self.path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        wb.save(self.path)
+    
+    def tearDown(self):
+        os.remove(self.path)
+    
+    def test_streaming_igual_a_memoria(self):
+        esperado = self.parser.procesar_libro(self.path, self.conceptos)
+        bloques = list(self.parser.procesar_libro_streaming(
+            self.path, self.conceptos, tamano_chunk=2
+        ))
+        
+        self.assertTrue(all(b.success for b in bloques))
+        self.assertEqual(len(bloques), 3)
+        self.assertEqual(
+            [emp for b in bloques for emp in b.data],
+            esperado.data,
+        )
+        self.assertEqual(
+            [err for b in bloques for err in b.warnings],
+            ['Fila 4: No se encontró RUT'],
+        )
+        self.assertEqual(bloques[0].headers, list(self.df.columns))
+    
+    def test_extraer_headers_info_igual_a_pandas(self):
+        df = pd.read_excel(self.path, sheet_name='Libro', nrows=0)
+        esperado = self.parser.analizar_headers_duplicados(df.columns)
+        
+        self.assertEqual(self.parser.extraer_headers_info(self.path), esperado)
+        self.assertEqual(
+            self.parser.extraer_headers(self.path),
+            [info.pandas_name for info in esperado],
+        )
+    
+    def test_nombres_columnas_igual_a_pandas(self):
+        casos = [
+            ['RUT', 'BONO', 'BONO', 'BONO.1'],
+            ['A', 'A', 'A.1', 'A', '', None, 'Unnamed: 4', 'A.1'],
+            ['X', 'X.1', 'X', 'X', 'X.2'],
+        ]
+        for headers in casos:
+            csv = pd.DataFrame([headers]).fillna('').to_csv(index=False, header=False)
+            esperado = list(pd.read_csv(io.StringIO(csv), nrows=0).columns)
+            
+            self.assertEqual(nombres_columnas_pandas(headers), esperado, headers)
+        
+        self.assertEqual(
+            nombres_columnas_pandas(['RUT', 'BONO', 'BONO', 'BONO.1']),
+            ['RUT', 'BONO', 'BONO.2', 'BONO.1'],
+        )
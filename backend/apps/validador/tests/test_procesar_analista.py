@@ -0,0 +1,138 @@
+"""
+Tests para el procesamiento de archivos del analista (Novedades).
+"""
+
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from apps.core.models import ERP, Cliente
+from apps.validador.models import (
+    ArchivoAnalista, Cierre, ConceptoNovedades, MovimientoAnalista, RegistroNovedades,
+)
+from apps.validador.services.ingesta_movimientos import (
+    ESPECIFICACIONES_MOVIMIENTOS, IngestaMovimientos,
+)
+from apps.validador.tasks.procesar_analista import _procesar_novedades
+
+
+class TestProcesarNovedades(TestCase):
+    """Novedades por columnas: concepto por header, sin_asignacion y montos cero."""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        erp = ERP.objects.create(slug='talana', nombre='Talana')
+        self.cierre = Cierre.objects.create(cliente=cliente, periodo='2025-01')
+        self.archivo = SimpleNamespace(
+            cierre=self.cierre, extension='.xlsx', archivo=SimpleNamespace(path='/tmp/novedades.xlsx')
+        )
+        self.bono = ConceptoNovedades.objects.create(
+            cliente=cliente, erp=erp, header_original='Bono Producción',
+            header_normalizado='bono_produccion',
+        )
+        ConceptoNovedades.objects.create(
+            cliente=cliente, erp=erp, header_original='Colación',
+            header_normalizado='colacion', sin_asignacion=True,
+        )
+    
+    def test_registros_por_celda_con_monto(self):
+        df = pd.DataFrame({
+            'RUT': ['11111111-1', '22222222-2', np.nan, ' 33333333-3 '],
+            'Nombre Trabajador': [' Ana ', np.nan, 'Sin Rut', 'Eva'],
+            'Bono Producción ': [1000, 0, 500, np.nan],
+            'Colación': [200, 300, 0, 0],
+            'Horas Extra': ['x', 1.5, 9, -20],
+            'Observaciones': ['nota', None, None, None],
+        })
+        RegistroNovedades.objects.create(
+            cierre=self.cierre, rut_empleado='1-9', nombre_item='Anterior', monto=1
+        )
+        
+        with patch('apps.validador.tasks.procesar_analista.leer_excel_cacheado', return_value=df):
+            resultado = _procesar_novedades(self.archivo)
+        
+        self.assertEqual(resultado, {'filas': 3, 'ignorados_sin_asignacion': 2})
+        self.assertEqual(
+            list(RegistroNovedades.objects.filter(cierre=self.cierre).order_by('id').values_list(
+                'rut_empleado', 'nombre_empleado', 'nombre_item', 'concepto_novedades', 'monto',
+            )),
+            [
+                ('11111111-1', 'Ana', 'Bono Producción', self.bono.id, Decimal('1000.00')),
+                ('22222222-2', '', 'Horas Extra', None, Decimal('1.50')),
+                ('33333333-3', 'Eva', 'Horas Extra', None, Decimal('-20.00')),
+            ],
+        )
+
+
+class TestIngestaMovimientos(TestCase):
+    """Motor declarativo de asistencias, finiquitos e ingresos."""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.cierre = Cierre.objects.create(cliente=cliente, periodo='2025-01')
+    
+    def _archivo(self, tipo):
+        return ArchivoAnalista.objects.create(
+            cierre=self.cierre, tipo=tipo, nombre_original=f'{tipo}.xlsx',
+            archivo=f'cierres/{tipo}.xlsx',
+        )
+    
+    def _movimientos(self, archivo):
+        return list(MovimientoAnalista.objects.filter(archivo_analista=archivo).order_by('id').values_list(
+            'tipo', 'origen', 'rut', 'nombre', 'fecha_inicio', 'fecha_fin', 'dias',
+            'causal', 'tipo_ausentismo', 'fila_raw',
+        ))
+    
+    def test_asistencias(self):
+        archivo = self._archivo('asistencias')
+        df = pd.DataFrame({
+            'RUT Trabajador': ['12.345.678-5', None, '111111111', '22222222-2'],
+            'Nombre': [' Ana ', 'Sin Rut', np.nan, 'Eva'],
+            'Fecha Inicio Ausencia': ['01/01/2025', None, '2025-01-10', None],
+            'Fecha Fin Ausencia': ['03/01/2025', None, '2025-01-10', None],
+            'Tipo Ausentismo': ['Licencia Médica', 'Vacaciones', 'VACACIONES PROGRESIVAS', np.nan],
+        })
+        MovimientoAnalista.objects.create(
+            cierre=self.cierre, archivo_analista=archivo, tipo='otro', origen='asistencias', rut='1-9'
+        )
+        
+        resultado = IngestaMovimientos.cargar(archivo, df, ESPECIFICACIONES_MOVIMIENTOS['asistencias'])
+        
+        self.assertEqual(resultado, {'filas': 3, 'omitidas': 1})
+        self.assertEqual(self._movimientos(archivo), [
+            ('licencia', 'asistencias', '12345678-5', 'Ana', date(2025, 1, 1), date(2025, 1, 3), 3,
+             '', 'Licencia Médica', 0),
+            ('vacaciones', 'asistencias', '11111111-1', '', date(2025, 1, 10), date(2025, 1, 10), 1,
+             '', 'VACACIONES PROGRESIVAS', 2),
+            ('otro', 'asistencias', '22222222-2', 'Eva', None, None, None, '', '', 3),
+        ])
+    
+    def test_finiquitos_e_ingresos(self):
+        finiquitos = self._archivo('finiquitos')
+        ingresos = self._archivo('ingresos')
+        
+        IngestaMovimientos.cargar(finiquitos, pd.DataFrame({
+            'Rut': ['11111111-1'], 'Nombre': ['Luis'], 'Fecha de Retiro': ['31-01-2025'],
+            'Causal Término': ['Art. 161'],
+        }), ESPECIFICACIONES_MOVIMIENTOS['finiquitos'])
+        IngestaMovimientos.cargar(ingresos, pd.DataFrame({
+            'Rut': ['22222222-2'], 'Fecha Ingreso': [pd.Timestamp('2025-01-15')],
+        }), ESPECIFICACIONES_MOVIMIENTOS['ingresos'])
+        
+        self.assertEqual(self._movimientos(finiquitos), [
+            ('baja', 'finiquitos', '11111111-1', 'Luis', None, date(2025, 1, 31), None, 'Art. 161', '', 0),
+        ])
+        self.assertEqual(self._movimientos(ingresos), [
+            ('alta', 'ingresos', '22222222-2', '', date(2025, 1, 15), None, None, '', '', 0),
+        ])
+    
+    def test_sin_columna_rut(self):
+        with self.assertRaisesMessage(ValueError, 'No se encontró columna de RUT'):
+            IngestaMovimientos.extraer(
+                pd.DataFrame({'Nombre': ['Ana']}), ESPECIFICACIONES_MOVIMIENTOS['ingresos']
+            )
@@ -0,0 +1,100 @@
+"""
+Tests para el procesamiento del Libro de Remuneraciones (EmpleadoCierre).
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import TestCase
+
+from apps.core.models import Cliente
+from apps.validador.models import (
+    CategoriaConcepto, Cierre, ConceptoCliente, EmpleadoCierre, RegistroConcepto,
+)
+from apps.validador.tasks.procesar_erp import _procesar_libro_remuneraciones
+
+
+class TestLibroRemuneraciones(TestCase):
+    """Upsert por conjuntos de empleados, registros y totales."""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.cierre = Cierre.objects.create(cliente=cliente, periodo='2025-01')
+        self.archivo = SimpleNamespace(
+            cierre=self.cierre, archivo=SimpleNamespace(path='/tmp/libro.xlsx')
+        )
+        
+        haberes, _ = CategoriaConcepto.objects.get_or_create(
+            codigo='haberes_imponibles', defaults={'nombre': 'Haberes Imponibles'}
+        )
+        descuentos, _ = CategoriaConcepto.objects.get_or_create(
+            codigo='descuentos_legales', defaults={'nombre': 'Descuentos Legales'}
+        )
+        ConceptoCliente.objects.create(
+            cliente=cliente, nombre_erp='Sueldo', categoria=haberes, clasificado=True
+        )
+        ConceptoCliente.objects.create(
+            cliente=cliente, nombre_erp='AFP', categoria=descuentos, clasificado=True,
+            multiplicador=Decimal('-1'),
+        )
+    
+    def _procesar(self, filas, columnas=('Rut', 'Nombre', 'Sueldo', 'AFP', 'Bono')):
+        df = pd.DataFrame(filas, columns=list(columnas))
+        with patch('apps.validador.tasks.procesar_erp.leer_excel_cacheado', return_value=df):
+            return _procesar_libro_remuneraciones(self.archivo)
+    
+    def test_totales_y_registros(self):
+        resultado = self._procesar([
+            ['11111111-1', 'Ana', '$ 1.000.000', 100000, 0],
+            ['22222222-2', 'Luis', 800000, 80000, 5000],
+            [None, '', 0, 0, 0],
+        ])
+        
+        self.assertEqual(resultado, {'filas': 2, 'conceptos_nuevos': 1})
+        ana = EmpleadoCierre.objects.get(cierre=self.cierre, rut='11111111-1')
+        self.assertEqual(
+            (ana.total_haberes, ana.total_descuentos, ana.liquido),
+            (Decimal('1000000'), Decimal('100000'), Decimal('900000')),
+        )
+        afp = RegistroConcepto.objects.get(empleado=ana, concepto__nombre_erp='AFP')
+        self.assertEqual((afp.monto, afp.monto_original), (Decimal('-100000'), Decimal('100000')))
+        # Bono (sin clasificar) genera registro pero no suma a los totales
+        self.assertEqual(RegistroConcepto.objects.filter(empleado__rut='22222222-2').count(), 3)
+    
+    def test_reproceso_actualiza_sin_duplicar(self):
+        self._procesar([['11111111-1', 'Ana', 1000, 100, 0]])
+        resultado = self._procesar([['11111111-1', 'Ana María', 2000, 100, 0]])
+        
+        self.assertEqual(resultado['filas'], 1)
+        ana = EmpleadoCierre.objects.get(cierre=self.cierre)
+        self.assertEqual((ana.nombre, ana.liquido), ('Ana María', Decimal('1900')))
+        self.assertEqual(RegistroConcepto.objects.count(), 2)
+        self.assertEqual(
+            RegistroConcepto.objects.get(concepto__nombre_erp='Sueldo').monto, Decimal('2000')
+        )
+    
+    def test_columnas_que_difieren_en_espacios(self):
+        bulk_create = RegistroConcepto.objects.bulk_create
+        with patch.object(RegistroConcepto.objects, 'bulk_create', wraps=bulk_create) as espia:
+            resultado = self._procesar(
+                [
+                    ['11111111-1', 'Ana', 1000, 100, 50, 70],
+                    ['22222222-2', 'Luis', 2000, 200, 30, 0],
+                ],
+                columnas=('Rut', 'Nombre', 'Sueldo', 'AFP', 'Bono', 'Bono '),
+            )
+        
+        # PostgreSQL rechaza un upsert con la misma clave dos veces en un lote
+        for llamada in espia.call_args_list:
+            claves = [(r.empleado_id, r.concepto_id) for r in llamada.args[0]]
+            self.assertEqual(len(claves), len(set(claves)))
+        self.assertEqual(resultado, {'filas': 2, 'conceptos_nuevos': 1})
+        self.assertEqual(ConceptoCliente.objects.filter(nombre_erp='Bono').count(), 1)
+        # Un registro por concepto: prevalece la última columna con monto
+        bonos = dict(
+            RegistroConcepto.objects.filter(concepto__nombre_erp='Bono')
+            .values_list('empleado__rut', 'monto')
+        )
+        self.assertEqual(bonos, {'11111111-1': Decimal('70'), '22222222-2': Decimal('30')})
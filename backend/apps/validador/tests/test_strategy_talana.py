@@ -0,0 +1,71 @@
+"""
+Tests para TalanaStrategy (Movimientos del Mes).
+
+Verifica que el parseo por columnas de las hojas de movimientos aplique
+las mismas reglas que la versión escalar (_parse_fecha, _parse_int, RN-001).
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from apps.validador.services.erp.talana import TalanaStrategy
+
+
+class TestTalanaMovimientos(SimpleTestCase):
+    
+    def setUp(self):
+        self.strategy = TalanaStrategy()
+    
+    def test_fechas_igual_a_escalar(self):
+        valores = [
+            datetime(2025, 1, 5, 10), pd.Timestamp('2025-02-01'), date(2025, 3, 1),
+            '05/01/2025', '2025-1-7', '31-12-2024', '2025/01/05', ' 2025-01-05 ',
+            '2025-01-05 00:00:00', 'x', '', None, np.nan, pd.NaT, 45000,
+        ]
+        serie = pd.Series(valores, dtype=object)
+        
+        self.assertEqual(
+            self.strategy._parse_fechas(serie).tolist(),
+            [self.strategy._parse_fecha(v) for v in valores],
+        )
+        
+        columna = pd.Series(pd.to_datetime(['2025-01-05', None]))
+        self.assertEqual(self.strategy._parse_fechas(columna).tolist(), ['2025-01-05', None])
+    
+    def test_enteros_igual_a_escalar(self):
+        valores = [1, '2', 3.7, ' 4 ', 'x', None, np.nan, True, -1.5]
+        
+        self.assertEqual(
+            self.strategy._parse_ints(pd.Series(valores, dtype=object)).tolist(),
+            [self.strategy._parse_int(v) for v in valores],
+        )
+    
+    def test_altas_bajas_rn001_y_avisos(self):
+        df = pd.DataFrame({
+            'Nombre': [' Ana ', 'Luis', 'Eva', 'Sin Rut', 'Pia'],
+            'Rut': ['12.345.678-5', '11111111-1', '22222222-2', None, '33333333-3'],
+            'Fecha Ingreso': ['05/01/2025', None, None, None, None],
+            'Fecha Retiro': [None, '2025-01-31', '2025-01-31', None, None],
+            'Tipo Contrato': ['Indefinido', 'Plazo Fijo', 'Plazo Fijo', None, None],
+            'Alta / Baja': ['Alta', 'Baja', ' BAJA', 'Alta', 'Traslado'],
+            'Motivo': [None, None, 'Renuncia', None, None],
+        })
+        
+        registros, warnings = self.strategy._parse_hoja_altas_bajas(df)
+        
+        self.assertEqual(
+            [(r['tipo'], r['rut'], r['nombre'], r['fecha_inicio'], r['fecha_fin'], r['causal'])
+             for r in registros],
+            [
+                ('ingreso', '12345678-5', 'Ana', '2025-01-05', None, ''),
+                ('finiquito', '22222222-2', 'Eva', None, '2025-01-31', 'Renuncia'),
+            ],
+        )
+        self.assertEqual(registros[0]['datos_raw']['rut'], '12.345.678-5')
+        self.assertEqual(warnings, [
+            "Ignorando baja fila 5: Plazo Fijo sin motivo (vencimiento contrato)",
+            "Tipo de movimiento desconocido en fila 8: 'traslado'",
+        ])
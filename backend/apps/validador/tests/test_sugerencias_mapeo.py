@@ -0,0 +1,85 @@
+"""
+Tests para las sugerencias de mapeo novedades -> libro por trigramas.
+"""
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from apps.core.models import ERP, Cliente
+from apps.validador.models import ConceptoLibro, ConceptoNovedades
+from apps.validador.services import SugerenciasMapeoService
+from apps.validador.utils.trigramas import IndiceTrigramas, trigramas
+
+
+class TestIndiceTrigramas(SimpleTestCase):
+
+    def test_buscar_igual_a_fuerza_bruta(self):
+        textos = {
+            1: 'SUELDO BASE', 2: 'Bono Producción', 3: 'Bono Responsabilidad',
+            4: 'Horas Extra 50%', 5: 'Colación', 6: 'Movilización', 7: 'AFP',
+        }
+        indice = IndiceTrigramas()
+        for id_, texto in textos.items():
+            indice.agregar(id_, texto)
+        
+        for consulta in ['bono produccion', 'HORAS EXTRAS', 'Asig. Colacion', 'sueldo', 'xyz']:
+            q = trigramas(consulta)
+            esperado = sorted(
+                (
+                    (id_, len(q & trigramas(t)) / len(q | trigramas(t)))
+                    for id_, t in textos.items()
+                    if q and len(q & trigramas(t)) / len(q | trigramas(t)) >= 0.3
+                ),
+                key=lambda r: (-r[1], r[0]),
+            )
+            with self.subTest(consulta=consulta):
+                self.assertEqual(indice.buscar(consulta, limite=10), esperado)
+    
+    def test_quitar_y_reindexar(self):
+        indice = IndiceTrigramas()
+        indice.agregar(1, 'Bono')
+        indice.agregar(1, 'Sueldo')
+        indice.agregar(2, 'Bono')
+        indice.quitar(2)
+        indice.quitar(99)
+        
+        self.assertEqual(indice.ids, {1})
+        self.assertEqual(indice.buscar('bono'), [])
+        self.assertEqual(indice.buscar('sueldo'), [(1, 1.0)])
+
+
+class TestSugerenciasMapeo(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = Cliente.objects.create(rut='76123456-7', razon_social='Empresa')
+        self.erp = ERP.objects.create(slug='talana', nombre='Talana')
+    
+    def _libro(self, header, categoria='haberes_imponibles'):
+        return ConceptoLibro.objects.create(
+            cliente=self.cliente, erp=self.erp, header_original=header, categoria=categoria
+        )
+    
+    def _sugeridos(self, header):
+        resultado = SugerenciasMapeoService.sugerir(self.cliente.id, self.erp.id, [header])
+        return [s['header_original'] for s in resultado[header]]
+    
+    def test_indice_incremental_y_mapeos_usados(self):
+        bono = self._libro('BONO PRODUCCION')
+        self._libro('BONO PRODUCCION ANUAL')
+        self._libro('BONO SIN CLASIFICAR', categoria=None)
+        
+        self.assertEqual(self._sugeridos('Bono Producción'), ['BONO PRODUCCION', 'BONO PRODUCCION ANUAL'])
+        
+        # Cambios en el catálogo se reflejan sin invalidar el cache
+        ConceptoLibro.objects.filter(header_original='BONO SIN CLASIFICAR').update(
+            categoria='haberes_imponibles', header_original='BONO PRODUCCION MENSUAL'
+        )
+        ConceptoLibro.objects.filter(header_original='BONO PRODUCCION ANUAL').update(activo=False)
+        self.assertEqual(self._sugeridos('Bono Producción'), ['BONO PRODUCCION', 'BONO PRODUCCION MENSUAL'])
+        
+        # Un concepto ya mapeado no se sugiere (mapeo 1:1)
+        ConceptoNovedades.objects.create(
+            cliente=self.cliente, erp=self.erp, header_original='Bono Prod.', concepto_libro=bono
+        )
+        self.assertEqual(self._sugeridos('Bono Producción'), ['BONO PRODUCCION MENSUAL'])
@@ -6,16 +6,39 @@ from .normalizacion import (
     normalizar_rut,
     mask_rut,
     normalizar_monto,
+    calcular_dv,
+    validar_rut,
     parse_fecha,
     sanitizar_datos_raw,
     validar_ruta_archivo,
 )
+from .normalizacion_vectorial import normalizar_ruts, normalizar_montos, parse_fechas, validar_dv_ruts
+from .cache_parseo import leer_excel_cacheado, limpiar_cache, eliminar_cache_archivo
+from .lectura_headers import leer_fila_headers, nombres_columnas_pandas
+from .compresion_raw import comprimir_filas, comprimir_dataframe
+from .deteccion_csv import FormatoCSV, detectar_formato_csv, leer_csv_detectado
 
 __all__ = [
     'normalizar_rut',
     'mask_rut',
     'normalizar_monto',
+    'calcular_dv',
+    'validar_rut',
+    'normalizar_ruts',
+    'normalizar_montos',
+    'validar_dv_ruts',
+    'parse_fechas',
     'parse_fecha',
     'sanitizar_datos_raw',
     'validar_ruta_archivo',
+    'leer_excel_cacheado',
+    'limpiar_cache',
+    'eliminar_cache_archivo',
+    'leer_fila_headers',
+    'nombres_columnas_pandas',
+    'comprimir_filas',
+    'comprimir_dataframe',
+    'FormatoCSV',
+    'detectar_formato_csv',
+    'leer_csv_detectado',
 ]
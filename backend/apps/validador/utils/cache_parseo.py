@@ -0,0 +1,268 @@
+"""
+Caché de archivos parseados por contenido.
+
+Un mismo libro se abre varias veces durante el flujo (extraer headers,
+sincronizar conceptos, procesar, reintentos de Celery). Decodificar un
+.xlsx implica descomprimir y parsear XML, por lo que el resultado de
+pd.read_excel se guarda como sidecar binario y las lecturas siguientes
+lo cargan directamente.
+
+Llave del caché:
+- SHA-256 del contenido del archivo (re-subir el mismo archivo reutiliza el caché)
+- Versión del lector (parser/estrategia) y versión de pandas
+- Parámetros de lectura (hoja, header, skiprows, nrows, ...)
+
+Los sidecars viven en PARSEO_CACHE_DIR (fuera de MEDIA_ROOT: contienen
+el libro completo) y se eliminan:
+- Por antigüedad: sin uso (mtime, actualizado en cada acierto) por más de
+  PARSEO_CACHE_MAX_DIAS
+- Por LRU cuando el directorio supera PARSEO_CACHE_MAX_SIZE
+- Al eliminar el archivo de origen (eliminar_cache_archivo, vía signals);
+  el nombre del sidecar empieza con el SHA-256 del contenido
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+import logging
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Incrementar si cambia el formato del sidecar
+VERSION_CACHE = 2
+
+EXTENSION_SIDECAR = '.pkl'
+
+# Memo en proceso de (path, tamaño, mtime) -> sha256 para no re-hashear
+_hashes = {}
+_MAX_HASHES = 256
+
+
+def leer_excel_cacheado(archivo, version: str = '', **kwargs):
+    """
+    Equivalente a pd.read_excel con caché por contenido.
+    
+    Solo se cachean lecturas desde un path (o pd.ExcelFile abierto desde
+    un path); los file-like se leen directamente. Si la lectura pide
+    `nrows` y ya existe en caché la lectura completa con los mismos
+    parámetros, se responde con sus primeras filas.
+    
+    Args:
+        archivo: Path, pd.ExcelFile o file-like
+        version: Versión del lector que consume el resultado
+        **kwargs: Argumentos de pd.read_excel
+    
+    Returns:
+        DataFrame (o dict de DataFrames si sheet_name=None)
+    """
+    ruta = _resolver_ruta(archivo)
+    if ruta is None or not settings.PARSEO_CACHE_ACTIVO:
+        return pd.read_excel(archivo, **kwargs)
+    
+    try:
+        sha = hash_archivo(ruta)
+    except OSError as e:
+        logger.warning(f"No se pudo calcular hash de {ruta.name}: {e}")
+        return pd.read_excel(archivo, **kwargs)
+    
+    sidecar = _ruta_sidecar(sha, version, kwargs)
+    df = _cargar(sidecar)
+    if df is not None:
+        return df
+    
+    # Lectura parcial: reutilizar la lectura completa si existe
+    nrows = kwargs.get('nrows')
+    if nrows is not None:
+        completo = {k: v for k, v in kwargs.items() if k != 'nrows'}
+        df = _cargar(_ruta_sidecar(sha, version, completo))
+        if isinstance(df, pd.DataFrame):
+            return df.head(nrows)
+    
+    df = pd.read_excel(archivo, **kwargs)
+    _guardar(sidecar, df)
+    return df
+
+
+def hash_archivo(ruta) -> str:
+    """
+    SHA-256 del contenido del archivo.
+    
+    Se memoriza por (path, tamaño, mtime) dentro del proceso para que
+    varias lecturas del mismo archivo no lo re-lean completo.
+    """
+    ruta = Path(ruta)
+    stat = ruta.stat()
+    clave = (str(ruta), stat.st_size, stat.st_mtime_ns)
+    
+    sha = _hashes.get(clave)
+    if sha is None:
+        h = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloque)
+        sha = h.hexdigest()
+        
+        if len(_hashes) >= _MAX_HASHES:
+            _hashes.clear()
+        _hashes[clave] = sha
+    
+    return sha
+
+
+def eliminar_cache_archivo(archivo) -> int:
+    """
+    Elimina los sidecars de un archivo (todas sus versiones y lecturas).
+    
+    Args:
+        archivo: Path del archivo de origen (debe existir para calcular su hash)
+    
+    Returns:
+        Cantidad de sidecars eliminados
+    """
+    ruta = _resolver_ruta(archivo)
+    directorio = _directorio_cache()
+    if ruta is None or not directorio.exists():
+        return 0
+    
+    try:
+        sha = hash_archivo(ruta)
+    except OSError as e:
+        logger.warning(f"No se pudo calcular hash de {ruta.name}: {e}")
+        return 0
+    
+    eliminados = 0
+    for sidecar in directorio.glob(f'{sha}-*{EXTENSION_SIDECAR}'):
+        try:
+            sidecar.unlink()
+            eliminados += 1
+        except OSError:
+            continue
+    
+    return eliminados
+
+
+def limpiar_cache(max_size: int = None, max_dias: int = None) -> int:
+    """
+    Desaloja sidecars vencidos y luego los menos recientemente usados.
+    
+    Args:
+        max_size: Tamaño máximo en bytes (default PARSEO_CACHE_MAX_SIZE)
+        max_dias: Días sin uso antes de eliminar (default PARSEO_CACHE_MAX_DIAS)
+    
+    Returns:
+        Cantidad de sidecars eliminados
+    """
+    directorio = _directorio_cache()
+    if max_size is None:
+        max_size = settings.PARSEO_CACHE_MAX_SIZE
+    if max_dias is None:
+        max_dias = settings.PARSEO_CACHE_MAX_DIAS
+    
+    if not directorio.exists():
+        return 0
+    
+    sidecars = []
+    for ruta in directorio.glob(f'*{EXTENSION_SIDECAR}'):
+        try:
+            stat = ruta.stat()
+        except OSError:
+            continue
+        sidecars.append((stat.st_mtime, stat.st_size, ruta))
+    
+    total = sum(size for _, size, _ in sidecars)
+    limite_uso = time.time() - max_dias * 24 * 60 * 60
+    eliminados = 0
+    
+    for mtime, size, ruta in sorted(sidecars):
+        if total <= max_size and mtime >= limite_uso:
+            break
+        try:
+            ruta.unlink()
+            total -= size
+            eliminados += 1
+        except OSError:
+            continue
+    
+    if eliminados:
+        logger.info(f"Caché de parseo: {eliminados} sidecars desalojados")
+    
+    return eliminados
+
+
+def _resolver_ruta(archivo):
+    """Path del archivo si existe en disco, o None si es file-like."""
+    if isinstance(archivo, pd.ExcelFile):
+        archivo = archivo.io
+    if isinstance(archivo, (str, os.PathLike)):
+        ruta = Path(archivo)
+        if ruta.is_file():
+            return ruta
+    return None
+
+
+def _directorio_cache() -> Path:
+    """Directorio de sidecars (PARSEO_CACHE_DIR)."""
+    return Path(settings.PARSEO_CACHE_DIR)
+
+
+def _ruta_sidecar(sha: str, version: str, kwargs: dict) -> Path:
+    """Nombre del sidecar según contenido, versiones y parámetros de lectura."""
+    parametros = json.dumps(
+        {
+            'cache': VERSION_CACHE,
+            'pandas': pd.__version__,
+            'version': version,
+            'kwargs': kwargs,
+        },
+        sort_keys=True,
+        default=repr,
+    )
+    clave = hashlib.sha256(parametros.encode()).hexdigest()
+    return _directorio_cache() / f'{sha}-{clave}{EXTENSION_SIDECAR}'
+
+
+def _cargar(sidecar: Path):
+    """Carga un sidecar y actualiza su mtime (LRU). None si no existe."""
+    try:
+        with open(sidecar, 'rb') as f:
+            df = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Sidecar inválido {sidecar.name}, se descarta: {e}")
+        try:
+            sidecar.unlink()
+        except OSError:
+            pass
+        return None
+    
+    try:
+        os.utime(sidecar)
+    except OSError:
+        pass
+    return df
+
+
+def _guardar(sidecar: Path, df):
+    """Escribe el sidecar de forma atómica y aplica el límite de tamaño."""
+    tmp = None
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=sidecar.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, sidecar)
+    except Exception as e:
+        logger.warning(f"No se pudo guardar caché de parseo: {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    
+    limpiar_cache()
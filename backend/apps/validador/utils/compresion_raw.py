@@ -0,0 +1,151 @@
+"""
+Compresión de las filas originales (datos_raw) de un archivo.
+
+En vez de guardar un JSON por movimiento, todas las filas de un archivo se
+guardan juntas en formato columnar (una lista de valores por columna) y
+comprimidas con zlib. Los valores repetidos entre filas (tipo de contrato,
+hoja, fechas del período) comprimen muy bien en columnas.
+
+Formato (JSON antes de comprimir):
+
+    {
+        'version': 1,
+        'bloques': [
+            {'desde': 0, 'columnas': ['Rut', 'Nombre'], 'valores': [[...], [...]]},
+            ...
+        ]
+    }
+
+Cada bloque agrupa filas consecutivas con las mismas columnas (ej: una hoja
+del Excel). La fila N es la posición N en el orden en que se entregaron.
+
+Uso:
+    from apps.validador.utils.compresion_raw import comprimir_filas, fila_raw
+    
+    contenido, tamano = comprimir_filas([{'Rut': '1-9', 'Dias': 3}, ...])
+    bloques = descomprimir_bloques(contenido)
+    fila_raw(bloques, 0)  # {'Rut': '1-9', 'Dias': 3}
+"""
+
+import bisect
+import json
+import math
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+VERSION_FORMATO = 1
+
+# Nivel de zlib: 6 es el default (buen balance velocidad/tamaño)
+NIVEL_COMPRESION = 6
+
+
+def comprimir_filas(filas: Iterable[Dict]) -> Tuple[bytes, int]:
+    """
+    Comprime una secuencia de filas (dicts) en formato columnar.
+    
+    Los valores se sanitizan para JSON igual que sanitizar_datos_raw:
+    NaN/Inf a None y tipos no serializables a string.
+    
+    Args:
+        filas: Dicts columna -> valor, en el orden de las filas
+    
+    Returns:
+        Tuple (contenido comprimido, bytes del JSON sin comprimir)
+    """
+    bloques = []
+    columnas_actual = None
+    
+    for posicion, fila in enumerate(filas):
+        columnas = tuple(fila)
+        if columnas != columnas_actual:
+            columnas_actual = columnas
+            bloque = {
+                'desde': posicion,
+                'columnas': [str(c) for c in columnas],
+                'valores': [[] for _ in columnas],
+            }
+            bloques.append(bloque)
+        for lista, valor in zip(bloque['valores'], fila.values()):
+            lista.append(valor)
+    
+    for bloque in bloques:
+        bloque['valores'] = [_columna_json(valores) for valores in bloque['valores']]
+    
+    return _serializar(bloques)
+
+
+def comprimir_dataframe(df: pd.DataFrame) -> Tuple[bytes, int]:
+    """
+    Comprime todas las filas de un DataFrame (un solo bloque).
+    
+    La fila N corresponde a la posición N del DataFrame (no a su índice).
+    
+    Returns:
+        Tuple (contenido comprimido, bytes del JSON sin comprimir)
+    """
+    bloques = [{
+        'desde': 0,
+        'columnas': [str(c) for c in df.columns],
+        'valores': [_columna_json(df.iloc[:, i].tolist()) for i in range(df.shape[1])],
+    }] if len(df) else []
+    
+    return _serializar(bloques)
+
+
+def descomprimir_bloques(contenido: bytes) -> List[Dict]:
+    """Bloques columnares de un contenido generado por comprimir_*."""
+    if not contenido:
+        return []
+    datos = json.loads(zlib.decompress(bytes(contenido)))
+    return datos['bloques']
+
+
+def fila_raw(bloques: List[Dict], posicion: int) -> Dict:
+    """
+    Reconstruye una fila como dict columna -> valor.
+    
+    Returns:
+        Dict de la fila, o {} si la posición no existe
+    """
+    if posicion is None or posicion < 0 or not bloques:
+        return {}
+    
+    indice = bisect.bisect_right([b['desde'] for b in bloques], posicion) - 1
+    if indice < 0:
+        return {}
+    
+    bloque = bloques[indice]
+    offset = posicion - bloque['desde']
+    valores = bloque['valores']
+    if not valores or offset >= len(valores[0]):
+        return {}
+    
+    return {columna: valores[i][offset] for i, columna in enumerate(bloque['columnas'])}
+
+
+def _serializar(bloques: List[Dict]) -> Tuple[bytes, int]:
+    """JSON compacto de los bloques y su versión comprimida."""
+    crudo = json.dumps(
+        {'version': VERSION_FORMATO, 'bloques': bloques},
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+    return zlib.compress(crudo, NIVEL_COMPRESION), len(crudo)
+
+
+def _columna_json(valores: List) -> List:
+    """Valores de una columna aptos para JSON (ver sanitizar_datos_raw)."""
+    if all(type(v) is str for v in valores):
+        return valores
+    return [_valor_json(v) for v in valores]
+
+
+def _valor_json(valor):
+    """NaN/Inf a None y tipos no serializables a string."""
+    if valor is None or isinstance(valor, (str, bool, int)):
+        return valor
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    return str(valor)
@@ -0,0 +1,177 @@
+"""
+Detección de formato de archivos CSV a partir de una muestra.
+
+Un CSV exportado por un ERP o preparado por el cliente puede venir con
+coma, punto y coma o tabulador, en UTF-8 o Latin-1, y a veces con filas de
+título antes del header. En vez de parsear el archivo completo con cada
+combinación hasta que una "funcione", se leen los primeros KB y de esa
+muestra se decide delimitador, encoding y fila de header; luego el archivo
+se parsea una sola vez.
+
+Uso:
+    from apps.validador.utils.deteccion_csv import detectar_formato_csv, leer_csv_detectado
+    
+    formato = detectar_formato_csv('archivo.csv')   # FormatoCSV(';', 'latin-1', 0)
+    df = leer_csv_detectado('archivo.csv')
+    for bloque in leer_csv_detectado('archivo.csv', chunksize=50000):
+        ...
+"""
+
+import codecs
+import csv
+import io
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bytes iniciales que se analizan
+TAMANO_MUESTRA = 64 * 1024
+
+# Líneas no vacías de la muestra usadas para decidir
+LINEAS_MUESTRA = 50
+
+# Delimitadores candidatos, en orden de preferencia ante empate
+DELIMITADORES = (',', ';', '\t', '|')
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+@dataclass(frozen=True)
+class FormatoCSV:
+    """Parámetros de lectura detectados para un CSV."""
+    delimitador: str = ','
+    encoding: str = 'utf-8'
+    fila_header: int = 0
+    
+    def kwargs_read_csv(self) -> dict:
+        """Argumentos equivalentes para pd.read_csv."""
+        return {'sep': self.delimitador, 'encoding': self.encoding, 'header': self.fila_header}
+
+
+def detectar_formato_csv(archivo, tamano_muestra: int = TAMANO_MUESTRA) -> FormatoCSV:
+    """
+    Detecta delimitador, encoding y fila de header leyendo solo una muestra.
+    
+    - Encoding: BOM si existe; si no, UTF-8 si la muestra decodifica, Latin-1 si no
+    - Delimitador: el candidato que divide las líneas en más de una columna
+      con la cantidad de columnas más consistente entre líneas
+    - Header: primera línea no vacía con la cantidad de columnas de los datos
+      (salta títulos de reporte); cuenta solo líneas no vacías, igual que pandas
+    
+    Args:
+        archivo: Path o file-like binario/texto (se restaura su posición)
+        tamano_muestra: Bytes a analizar
+    
+    Returns:
+        FormatoCSV (valores por defecto si la muestra está vacía)
+    """
+    muestra = _leer_muestra(archivo, tamano_muestra)
+    if not muestra:
+        return FormatoCSV()
+    
+    encoding, texto = _decodificar(muestra, completa=len(muestra) < tamano_muestra)
+    
+    lineas = [linea for linea in texto.splitlines() if linea.strip()]
+    # La última línea puede estar cortada por el tamaño de la muestra
+    if len(muestra) >= tamano_muestra and len(lineas) > 1:
+        lineas = lineas[:-1]
+    lineas = lineas[:LINEAS_MUESTRA]
+    
+    delimitador, columnas = _detectar_delimitador(lineas)
+    fila_header = _detectar_fila_header(lineas, delimitador, columnas)
+    
+    return FormatoCSV(delimitador=delimitador, encoding=encoding, fila_header=fila_header)
+
+
+def leer_csv_detectado(archivo, chunksize: Optional[int] = None, **kwargs):
+    """
+    pd.read_csv con el formato detectado por detectar_formato_csv.
+    
+    Args:
+        archivo: Path o file-like
+        chunksize: Si se entrega, retorna un iterador de DataFrames
+        **kwargs: Argumentos de pd.read_csv (tienen prioridad sobre lo detectado)
+    
+    Returns:
+        DataFrame, o TextFileReader si chunksize
+    """
+    parametros = detectar_formato_csv(archivo).kwargs_read_csv()
+    parametros.update(kwargs)
+    return pd.read_csv(archivo, chunksize=chunksize, **parametros)
+
+
+def _leer_muestra(archivo, tamano: int) -> bytes:
+    """Primeros bytes del archivo sin alterar la posición de un file-like."""
+    if hasattr(archivo, 'read'):
+        posicion = archivo.tell() if hasattr(archivo, 'tell') else None
+        muestra = archivo.read(tamano)
+        if posicion is not None:
+            archivo.seek(posicion)
+        if isinstance(muestra, str):
+            encoding = getattr(archivo, 'encoding', None) or 'utf-8'
+            muestra = muestra.encode(encoding, errors='replace')
+        return muestra
+    
+    with open(archivo, 'rb') as f:
+        return f.read(tamano)
+
+
+def _decodificar(muestra: bytes, completa: bool) -> tuple:
+    """(encoding, texto) de la muestra."""
+    for bom, encoding in BOMS:
+        if muestra.startswith(bom):
+            return encoding, muestra.decode(encoding, errors='replace')
+    
+    try:
+        return 'utf-8', muestra.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no invalida UTF-8
+        if not completa and e.start >= len(muestra) - 3:
+            try:
+                return 'utf-8', muestra[:e.start].decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+    
+    return 'latin-1', muestra.decode('latin-1')
+
+
+def _contar_columnas(lineas: List[str], delimitador: str) -> List[int]:
+    """Cantidad de campos de cada línea (respeta comillas)."""
+    return [len(fila) for fila in csv.reader(io.StringIO('\n'.join(lineas)), delimiter=delimitador)]
+
+
+def _detectar_delimitador(lineas: List[str]) -> tuple:
+    """(delimitador, columnas más frecuentes) del candidato más consistente."""
+    mejor = (',', 1)
+    mejor_puntaje = (0, 0)
+    
+    for delimitador in DELIMITADORES:
+        conteos = [c for c in _contar_columnas(lineas, delimitador) if c > 1]
+        if not conteos:
+            continue
+        columnas, frecuencia = Counter(conteos).most_common(1)[0]
+        # Más líneas con la misma cantidad de columnas; a igualdad, más columnas
+        puntaje = (frecuencia, columnas)
+        if puntaje > mejor_puntaje:
+            mejor, mejor_puntaje = (delimitador, columnas), puntaje
+    
+    return mejor
+
+
+def _detectar_fila_header(lineas: List[str], delimitador: str, columnas: int) -> int:
+    """Índice (entre líneas no vacías) de la primera línea con `columnas` campos."""
+    if columnas <= 1:
+        return 0
+    for i, conteo in enumerate(_contar_columnas(lineas, delimitador)):
+        if conteo == columnas:
+            return i
+    return 0
@@ -0,0 +1,137 @@
+"""
+Lectura rápida de la fila de headers de un archivo.
+
+Extraer headers no necesita decodificar la hoja completa: para .xlsx se
+recorre la hoja con openpyxl en modo read_only solo hasta la fila de
+headers, y para CSV se lee únicamente la primera línea con datos.
+Los nombres se devuelven tal como los asignaría pandas, para que coincidan
+con ConceptoLibro.header_pandas y con las columnas de pd.read_excel.
+"""
+
+import csv
+import io
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+from .deteccion_csv import detectar_formato_csv
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_OPENPYXL = ('.xlsx', '.xlsm')
+
+
+def leer_fila_headers(archivo, fila_headers: int = 0, sheet_name=0) -> List[str]:
+    """
+    Lee solo la fila de headers y retorna los nombres de columna estilo pandas.
+    
+    Args:
+        archivo: Path del archivo (.xlsx, .xlsm, .xls o .csv)
+        fila_headers: Índice de la fila de headers (0-indexed)
+        sheet_name: Nombre o índice de la hoja (si el nombre no existe se usa la primera)
+    
+    Returns:
+        Lista de nombres de columna (vacíos -> 'Unnamed: N', duplicados -> 'X.1')
+    """
+    extension = Path(str(archivo)).suffix.lower()
+    
+    if extension == '.csv':
+        headers = _leer_fila_csv(archivo, fila_headers)
+    elif extension in EXTENSIONES_OPENPYXL:
+        headers = _leer_fila_xlsx(archivo, fila_headers, sheet_name)
+    else:
+        # .xls (xlrd) no soporta lectura parcial: se deja a pandas
+        try:
+            df = pd.read_excel(archivo, sheet_name=sheet_name, header=fila_headers, nrows=0)
+        except ValueError:
+            df = pd.read_excel(archivo, sheet_name=0, header=fila_headers, nrows=0)
+        return list(df.columns)
+    
+    # Celdas vacías al final de la fila no son columnas
+    while headers and (headers[-1] is None or headers[-1] == ''):
+        headers.pop()
+    
+    return nombres_columnas_pandas(headers)
+
+
+def nombres_columnas_pandas(headers) -> List[str]:
+    """
+    Replica los nombres de columna que pandas asigna al leer un header.
+    
+    Celdas vacías -> 'Unnamed: N' y duplicados -> 'X', 'X.1', 'X.2'... con
+    el mismo algoritmo del parser de pandas (read_excel/read_csv): los
+    nombres con nombre se desduplican antes que los vacíos y un sufijo
+    'X.N' que ya existe como header se salta. Así ['BONO', 'BONO', 'BONO.1']
+    da ['BONO', 'BONO.2', 'BONO.1'].
+    
+    Args:
+        headers: Valores crudos de la fila de headers
+    
+    Returns:
+        Lista de nombres de columna únicos
+    """
+    nombres = []
+    sin_nombre = set()
+    for i, header in enumerate(headers):
+        if header is None or header == '':
+            nombres.append(f'Unnamed: {i}')
+            sin_nombre.add(i)
+        else:
+            nombres.append(header)
+    
+    # pandas.io.parsers.python_parser.PythonParser._infer_columns
+    vistos = defaultdict(int)
+    orden = [i for i in range(len(nombres)) if i not in sin_nombre] + sorted(sin_nombre)
+    for i in orden:
+        nombre = original = nombres[i]
+        contador = vistos[nombre]
+        while contador > 0:
+            vistos[original] = contador + 1
+            nombre = f'{original}.{contador}'
+            contador = contador + 1 if nombre in nombres else vistos[nombre]
+        nombres[i] = nombre
+        vistos[nombre] = contador + 1
+    
+    return nombres
+
+
+def _leer_fila_xlsx(archivo, fila_headers: int, sheet_name) -> list:
+    """Recorre la hoja en modo read_only hasta la fila de headers."""
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet_name, int):
+            ws = wb.worksheets[sheet_name]
+        elif sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            logger.info(f"Hoja '{sheet_name}' no encontrada, usando primera hoja")
+            ws = wb.worksheets[0]
+        
+        for i, fila in enumerate(ws.iter_rows(values_only=True)):
+            if i == fila_headers:
+                return list(fila)
+        return []
+    finally:
+        wb.close()
+
+
+def _leer_fila_csv(archivo, fila_headers: int) -> list:
+    """
+    Lee la fila de headers de un CSV.
+    
+    Delimitador y encoding se detectan de una muestra (detectar_formato_csv),
+    igual que al leer el archivo completo con leer_csv_detectado.
+    """
+    formato = detectar_formato_csv(archivo)
+    with open(archivo, 'r', encoding=formato.encoding, errors='replace', newline='') as f:
+        # pandas omite líneas en blanco antes del header
+        lineas = (linea for linea in f if linea.strip())
+        for i, linea in enumerate(lineas):
+            if i == fila_headers:
+                return next(csv.reader(io.StringIO(linea), delimiter=formato.delimitador))
+    return []
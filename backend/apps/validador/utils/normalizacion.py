@@ -18,6 +18,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Formatos de fecha en texto aceptados por parse_fecha (en orden)
+FORMATOS_FECHA = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d')
+
 
 def normalizar_rut(rut: Union[str, float, int, None]) -> str:
     """
@@ -49,6 +52,58 @@ def normalizar_rut(rut: Union[str, float, int, None]) -> str:
     return rut
 
 
+def calcular_dv(cuerpo: str) -> str:
+    """
+    Calcula el dígito verificador (módulo 11) de un cuerpo de RUT.
+    
+    Examples:
+        >>> calcular_dv('12345678')
+        '5'
+        >>> calcular_dv('10000013')
+        'K'
+    """
+    suma = 0
+    multiplicador = 2
+    for digito in reversed(cuerpo):
+        suma += int(digito) * multiplicador
+        multiplicador = multiplicador + 1 if multiplicador < 7 else 2
+    
+    resto = 11 - suma % 11
+    if resto == 11:
+        return '0'
+    if resto == 10:
+        return 'K'
+    return str(resto)
+
+
+def validar_rut(rut: str) -> bool:
+    """
+    Valida formato y dígito verificador de un RUT normalizado.
+    
+    Args:
+        rut: RUT con formato '12345678-9' (ver normalizar_rut)
+    
+    Returns:
+        True si el formato es válido y el DV coincide
+    
+    Examples:
+        >>> validar_rut('12345678-5')
+        True
+        >>> validar_rut('12345678-9')
+        False
+    """
+    if not rut or rut.count('-') != 1:
+        return False
+    
+    cuerpo, dv = rut.split('-')
+    if not (cuerpo.isascii() and cuerpo.isdigit()) or not 1 <= len(cuerpo) <= 9:
+        return False
+    if len(dv) != 1 or dv not in '0123456789K':
+        return False
+    
+    return calcular_dv(cuerpo) == dv
+
+
 def mask_rut(rut: str) -> str:
     """
     Enmascara RUT para logs, mostrando solo últimos 4 caracteres.
@@ -56,7 +111,7 @@ def mask_rut(rut: str) -> str:
     
     Args:
         rut: RUT completo (ej: "12345678-9")
-        
+    
     Returns:
         RUT enmascarado (ej: "****78-9")
     
@@ -127,7 +182,7 @@ def parse_fecha(valor: Union[str, datetime, pd.Timestamp, None]) -> Optional[dat
     
     Args:
         valor: Valor a parsear
-        
+    
     Returns:
         date object o None si no se puede parsear
     """
@@ -148,9 +203,7 @@ def parse_fecha(valor: Union[str, datetime, pd.Timestamp, None]) -> Optional[dat
     if not valor_str or valor_str.lower() == 'nan':
         return None
     
-    formatos = ['%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d']
-    
-    for fmt in formatos:
+    for fmt in FORMATOS_FECHA:
         try:
             return datetime.strptime(valor_str, fmt).date()
         except ValueError:
@@ -170,7 +223,7 @@ def sanitizar_datos_raw(datos: dict) -> dict:
     
     Args:
         datos: Diccionario con datos crudos de fila Excel
-        
+    
     Returns:
         Diccionario sanitizado, seguro para JSON
     """
@@ -200,10 +253,10 @@ def validar_ruta_archivo(file_path: str) -> bool:
     
     Args:
         file_path: Ruta del archivo a validar
-        
+    
     Returns:
         True si la ruta es segura, False si es sospechosa
-        
+    
     Raises:
         ValueError: Si la ruta es sospechosa (para uso directo)
     """
@@ -231,7 +284,7 @@ def validar_ruta_archivo_strict(file_path: str) -> None:
     
     Args:
         file_path: Ruta del archivo a validar
-        
+    
     Raises:
         ValueError: Si la ruta es sospechosa o inválida
     """
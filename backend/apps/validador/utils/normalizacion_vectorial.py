@@ -0,0 +1,210 @@
+"""
+Normalización vectorizada de montos, RUTs y fechas.
+
+Versiones por columna de normalizar_monto / normalizar_rut / parse_fecha (normalizacion.py):
+reciben una pd.Series completa y usan el accessor .str y NumPy en vez de
+aplicar la función escalar celda por celda. El resultado es idéntico al de
+las funciones escalares (ver tests/test_normalizacion.py).
+
+Uso:
+    from apps.validador.utils.normalizacion_vectorial import (
+        normalizar_montos, normalizar_ruts, parse_fechas, validar_dv_ruts,
+    )
+    
+    df['monto'] = normalizar_montos(df['monto'])
+    df['fecha'] = parse_fechas(df['fecha'])
+    df['rut'] = normalizar_ruts(df['rut'])
+    df['rut_valido'] = validar_dv_ruts(df['rut'])
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from .normalizacion import FORMATOS_FECHA, parse_fecha
+
+# Pesos del módulo 11 para un cuerpo de 9 dígitos (de izquierda a derecha)
+PESOS_MODULO_11 = np.array([4, 3, 2, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+LARGO_CUERPO_RUT = 9
+
+
+def normalizar_ruts(serie: pd.Series) -> pd.Series:
+    """
+    Normaliza una columna de RUTs (sin puntos, con guión).
+    
+    Equivalente a aplicar normalizar_rut a cada celda.
+    
+    Args:
+        serie: Columna con RUTs en cualquier formato
+    
+    Returns:
+        Serie de strings con RUT normalizado ('' si es nulo)
+    """
+    ruts = (
+        serie.astype(str)
+        .str.upper()
+        .str.replace('.', '', regex=False)
+        .str.replace(' ', '', regex=False)
+        .str.strip()
+    )
+    
+    # Si no tiene guión, agregarlo antes del dígito verificador
+    sin_guion = ~ruts.str.contains('-', regex=False) & (ruts.str.len() > 1)
+    ruts = ruts.mask(sin_guion, ruts.str[:-1] + '-' + ruts.str[-1])
+    
+    return ruts.where(serie.notna(), '')
+
+
+def normalizar_montos(serie: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de montos a float, con formatos locales chilenos.
+    
+    Equivalente a aplicar normalizar_monto a cada celda:
+    - Números: se convierten directo
+    - Texto: se quitan '$' y espacios; con punto y coma el punto es miles
+      y la coma decimal; con varios puntos son miles; con solo coma es decimal
+    - Nulos o no convertibles: 0.0
+    
+    Las celdas que pd.to_numeric ya convierte (números y texto numérico
+    simple) no pasan por la limpieza de texto.
+    
+    Args:
+        serie: Columna con montos en cualquier formato
+    
+    Returns:
+        Serie float64 con el mismo índice
+    """
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype('float64').fillna(0.0)
+    
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype('float64')
+    
+    montos = pd.to_numeric(serie, errors='coerce').astype('float64')
+    
+    # Solo el texto con formato ($, miles, coma decimal) requiere limpieza
+    pendientes = montos.isna() & serie.notna()
+    if pendientes.any():
+        texto = (
+            serie[pendientes]
+            .astype(str)
+            .str.replace('$', '', regex=False)
+            .str.replace(' ', '', regex=False)
+            .str.strip()
+        )
+        tiene_punto = texto.str.contains('.', regex=False)
+        tiene_coma = texto.str.contains(',', regex=False)
+        
+        # 1.234,56 -> 1234.56
+        ambos = tiene_punto & tiene_coma
+        texto = texto.mask(
+            ambos,
+            texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        )
+        # Múltiples puntos son separadores de miles
+        miles = tiene_punto & ~tiene_coma & (texto.str.count(r'\.') > 1)
+        texto = texto.mask(miles, texto.str.replace('.', '', regex=False))
+        # 1234,56 -> 1234.56
+        solo_coma = tiene_coma & ~tiene_punto
+        texto = texto.mask(solo_coma, texto.str.replace(',', '.', regex=False))
+        
+        montos[pendientes] = pd.to_numeric(texto, errors='coerce')
+    
+    return montos.fillna(0.0)
+
+
+def parse_fechas(serie: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de fechas a date.
+    
+    Equivalente a aplicar parse_fecha a cada celda: las celdas date/datetime
+    se convierten directo y el texto se prueba con pd.to_datetime formato por
+    formato, solo sobre lo que aún no parseó. El texto que ningún formato
+    acepta en bloque (ej: años fuera del rango de pd.Timestamp como 9999)
+    pasa por parse_fecha.
+    
+    Args:
+        serie: Columna con fechas en cualquier formato
+    
+    Returns:
+        Serie object de date o None, con el mismo índice
+    """
+    resultado = pd.Series([None] * len(serie), index=serie.index, dtype=object)
+    presentes = serie.notna()
+    
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        resultado[presentes] = serie[presentes].dt.date
+        return resultado
+    
+    es_fecha = presentes & serie.map(lambda v: isinstance(v, date))
+    if es_fecha.any():
+        resultado[es_fecha] = serie[es_fecha].map(
+            lambda v: v.date() if isinstance(v, datetime) else v
+        )
+    
+    texto = serie[presentes & ~es_fecha].astype(str).str.strip()
+    texto = texto[(texto != '') & (texto.str.lower() != 'nan')]
+    for formato in FORMATOS_FECHA:
+        if texto.empty:
+            break
+        fechas = pd.to_datetime(texto, format=formato, errors='coerce')
+        parseadas = fechas.notna()
+        resultado[parseadas[parseadas].index] = fechas[parseadas].dt.date
+        texto = texto[~parseadas]
+    
+    if not texto.empty:
+        resultado[texto.index] = texto.map(parse_fecha)
+    
+    return resultado
+
+
+def calcular_dvs(cuerpos: pd.Series) -> pd.Series:
+    """
+    Dígito verificador (módulo 11) de una columna de cuerpos de RUT.
+    
+    Args:
+        cuerpos: Serie de strings con solo dígitos (máximo 9)
+    
+    Returns:
+        Serie de strings '0'-'9' o 'K'
+    """
+    if cuerpos.empty:
+        return pd.Series([], index=cuerpos.index, dtype=object)
+    
+    # Matriz (n x 9) de dígitos: cuerpos rellenados con ceros a la izquierda
+    relleno = cuerpos.str.zfill(LARGO_CUERPO_RUT).str.encode('ascii')
+    digitos = (
+        np.frombuffer(b''.join(relleno), dtype=np.uint8)
+        .reshape(-1, LARGO_CUERPO_RUT)
+        .astype(np.int64) - ord('0')
+    )
+    
+    resto = 11 - (digitos @ PESOS_MODULO_11) % 11
+    dvs = np.where(resto == 11, '0', np.where(resto == 10, 'K', resto.astype(str)))
+    
+    return pd.Series(dvs, index=cuerpos.index, dtype=object)
+
+
+def validar_dv_ruts(ruts: pd.Series) -> pd.Series:
+    """
+    Valida el dígito verificador de una columna de RUTs normalizados.
+    
+    Args:
+        ruts: Serie de RUTs con formato '12345678-9' (ver normalizar_ruts)
+    
+    Returns:
+        Serie booleana: True si el RUT tiene formato válido y su DV es correcto
+    """
+    partes = ruts.fillna('').astype(str).str.extract(r'^([0-9]{1,9})-([0-9K])$')
+    cuerpos, dvs = partes[0], partes[1]
+    
+    formato_valido = cuerpos.notna()
+    validos = pd.Series(False, index=ruts.index)
+    
+    if formato_valido.any():
+        esperados = calcular_dvs(cuerpos[formato_valido])
+        validos[formato_valido] = (esperados == dvs[formato_valido]).to_numpy()
+    
+    return validos
@@ -0,0 +1,114 @@
+"""
+Índice invertido de trigramas para similitud de nombres de conceptos.
+
+Comparar cada header de novedades contra cada concepto del libro es
+cuadrático. El índice guarda, por trigrama, los conceptos que lo contienen:
+una búsqueda solo recorre los conceptos que comparten al menos un trigrama
+con el texto consultado.
+
+La similitud es la de pg_trgm: trigramas compartidos / trigramas totales
+(Jaccard), con cada palabra rellenada como '  palabra ' y el texto en
+minúsculas y sin acentos.
+
+Uso:
+    from apps.validador.utils.trigramas import IndiceTrigramas
+    
+    indice = IndiceTrigramas()
+    indice.agregar(10, 'Bono Producción')
+    indice.agregar(11, 'Sueldo Base')
+    indice.buscar('BONO PRODUCCION MES')  # [(10, 0.8)]
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+# Similitud mínima por defecto (mismo default que pg_trgm)
+UMBRAL_SIMILITUD = 0.3
+
+
+def trigramas(texto: str) -> FrozenSet[str]:
+    """
+    Trigramas de un texto al estilo pg_trgm.
+    
+    Examples:
+        >>> sorted(trigramas('Año'))
+        ['  a', ' an', 'ano', 'no ']
+    """
+    texto = unicodedata.normalize('NFD', str(texto).lower())
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    
+    resultado = set()
+    for palabra in re.findall(r'[a-z0-9]+', texto):
+        relleno = f'  {palabra} '
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return frozenset(resultado)
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama -> ids, con altas y bajas incrementales.
+    
+    Es serializable con pickle (se guarda en el cache de Django).
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._trigramas: Dict[int, FrozenSet[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._trigramas)
+    
+    @property
+    def ids(self) -> Set[int]:
+        """IDs indexados."""
+        return set(self._trigramas)
+    
+    def agregar(self, id_: int, texto: str) -> None:
+        """Indexa (o re-indexa) un texto bajo `id_`."""
+        if id_ in self._trigramas:
+            self.quitar(id_)
+        
+        tri = trigramas(texto)
+        self._trigramas[id_] = tri
+        for t in tri:
+            self._postings.setdefault(t, set()).add(id_)
+    
+    def quitar(self, id_: int) -> None:
+        """Elimina `id_` del índice (sin efecto si no existe)."""
+        for t in self._trigramas.pop(id_, ()):
+            ids = self._postings.get(t)
+            if ids is not None:
+                ids.discard(id_)
+                if not ids:
+                    del self._postings[t]
+    
+    def buscar(self, texto: str, limite: int = 5, umbral: float = UMBRAL_SIMILITUD) -> List[Tuple[int, float]]:
+        """
+        IDs más similares a `texto`.
+        
+        Args:
+            texto: Texto a buscar
+            limite: Máximo de resultados
+            umbral: Similitud mínima (0 a 1)
+        
+        Returns:
+            Lista de (id, similitud) ordenada por similitud descendente
+        """
+        consulta = trigramas(texto)
+        if not consulta:
+            return []
+        
+        compartidos = Counter()
+        for t in consulta:
+            compartidos.update(self._postings.get(t, ()))
+        
+        resultados = []
+        for id_, comunes in compartidos.items():
+            similitud = comunes / (len(consulta) + len(self._trigramas[id_]) - comunes)
+            if similitud >= umbral:
+                resultados.append((id_, similitud))
+        
+        resultados.sort(key=lambda r: (-r[1], r[0]))
+        return resultados[:limite]
@@ -22,7 +22,8 @@ from ..serializers import (
     CierreDetailSerializer,
     CierreCreateSerializer,
 )
-from ..services import CierreService, EquipoService
+from ..services import CierreService, EquipoService, PrevisualizacionTolerancia
+from ..services.previsualizacion_tolerancia import MUESTRA_POR_TRAMO, TOLERANCIAS_DEFECTO
 from ..constants import EstadoCierre
 from apps.core.constants import TipoUsuario
 from shared.permissions import IsAnalista, IsSupervisor
@@ -170,6 +171,51 @@ class CierreViewSet(viewsets.ModelViewSet):
         
         return Response(progreso)
     
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='previsualizar-tolerancia',
+        permission_classes=[IsAuthenticated, IsSupervisor],
+    )
+    def previsualizar_tolerancia(self, request, pk=None):
+        """
+        Previsualizar discrepancias Libro vs Novedades con otras tolerancias.
+        
+        Solo lectura: no modifica las discrepancias del cierre. Ver
+        PrevisualizacionTolerancia.
+        
+        Query params:
+            tolerancias: Lista separada por comas (default: 0,1,10,100,1000)
+            categorias: Lista separada por comas de categorías del libro (opcional)
+            muestra: Pares de ejemplo por tramo (default: 5)
+        """
+        cierre = self.get_object()
+        
+        tolerancias = request.query_params.get('tolerancias')
+        categorias = request.query_params.get('categorias')
+        try:
+            muestra = int(request.query_params.get('muestra', MUESTRA_POR_TRAMO))
+        except ValueError:
+            return Response(
+                {'error': 'muestra debe ser un entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = PrevisualizacionTolerancia.previsualizar(
+            cierre,
+            tolerancias=tolerancias.split(',') if tolerancias else TOLERANCIAS_DEFECTO,
+            categorias=categorias.split(',') if categorias else None,
+            muestra=muestra,
+        )
+        
+        if not result.success:
+            return Response(
+                {'error': result.error},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(result.data)
+    
     @action(detail=True, methods=['post'])
     def cambiar_estado(self, request, pk=None):
         """Cambiar el estado del cierre."""
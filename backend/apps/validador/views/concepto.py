@@ -22,6 +22,7 @@ from ..serializers import (
     ConceptoSinClasificarSerializer,
 )
 from ..constants import EstadoArchivoNovedades
+from ..services import SugerenciasMapeoService
 
 # Constantes de seguridad
 MAX_BATCH_SIZE = 100  # Máximo de items por operación batch
@@ -194,6 +195,9 @@ class MapeoItemNovedadesViewSet(viewsets.ModelViewSet):
         
         Sin mapear = no tiene concepto_libro Y no está marcado sin_asignacion
         
+        Cada item incluye `sugerencias`: ConceptoLibro candidatos ordenados
+        por similitud de nombre (ver SugerenciasMapeoService).
+        
         Query params:
             cliente_id: ID del cliente (requerido)
             erp_id: ID del ERP (opcional, se infiere del cliente si no se da)
@@ -221,15 +225,27 @@ class MapeoItemNovedadesViewSet(viewsets.ModelViewSet):
         if erp_id:
             queryset = queryset.filter(erp_id=erp_id)
         
+        items = list(queryset)
+        
+        # Sugerencias por ERP (el índice de trigramas es por cliente+ERP)
+        headers_por_erp = {}
+        for item in items:
+            headers_por_erp.setdefault(item.erp_id, []).append(item.header_original)
+        sugerencias = {
+            erp: SugerenciasMapeoService.sugerir(cliente.id, erp, headers)
+            for erp, headers in headers_por_erp.items()
+        }
+        
         return Response({
-            'count': queryset.count(),
+            'count': len(items),
             'items': [
                 {
                     'id': item.id,
                     'header_original': item.header_original,
                     'orden': item.orden,
+                    'sugerencias': sugerencias[item.erp_id].get(item.header_original, []),
                 }
-                for item in queryset
+                for item in items
             ]
         })
     
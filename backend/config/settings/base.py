@@ -4,6 +4,7 @@ Contiene configuraciones comunes a todos los entornos.
 """
 
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -194,3 +195,30 @@ CACHES = {
 MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE_MB', 50)) * 1024 * 1024  # 50MB default
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
 FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
+
+# Procesamiento del Libro de Remuneraciones
+# Sobre este tamaño el libro se procesa en modo streaming (openpyxl read_only)
+LIBRO_STREAMING_MIN_SIZE = int(os.environ.get('LIBRO_STREAMING_MIN_SIZE_MB', 15)) * 1024 * 1024
+LIBRO_STREAMING_CHUNK_SIZE = int(os.environ.get('LIBRO_STREAMING_CHUNK_SIZE', 1000))
+# Parseo paralelo de libros grandes (1 = desactivado, 0 = todos los núcleos).
+# Usa un pool de billiard, por lo que funciona dentro de los workers prefork de Celery
+LIBRO_PARALELO_PROCESOS = int(os.environ.get('LIBRO_PARALELO_PROCESOS', 1))
+LIBRO_PARALELO_MIN_FILAS = int(os.environ.get('LIBRO_PARALELO_MIN_FILAS', 20000))
+# Reprocesar solo los empleados cuya fila cambió respecto a la versión anterior
+LIBRO_PROCESAMIENTO_INCREMENTAL = os.environ.get('LIBRO_PROCESAMIENTO_INCREMENTAL', 'True').lower() in ('true', '1', 'yes')
+
+# Comparación Libro vs Novedades en la base de datos (INSERT ... SELECT) en vez de en Python
+COMPARACION_SQL = os.environ.get('COMPARACION_SQL', 'True').lower() in ('true', '1', 'yes')
+# Comparación particionada por hash de RUT: una sub-tarea Celery por partición (chord).
+# 1 = una sola tarea; solo aplica a comparaciones completas de cierres con al menos MIN_RUTS RUTs.
+# Si hace falta se usan más particiones para que ninguna supere MAX_RUTS_INCREMENTAL RUTs
+COMPARACION_PARTICIONES = int(os.environ.get('COMPARACION_PARTICIONES', 1))
+COMPARACION_PARTICIONES_MIN_RUTS = int(os.environ.get('COMPARACION_PARTICIONES_MIN_RUTS', 5000))
+
+# Caché de archivos parseados (sidecars por SHA-256 del contenido).
+# Contiene datos de remuneraciones: fuera de MEDIA_ROOT para que nunca se sirva
+PARSEO_CACHE_ACTIVO = os.environ.get('PARSEO_CACHE_ACTIVO', 'True').lower() in ('true', '1', 'yes')
+PARSEO_CACHE_DIR = os.environ.get('PARSEO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sgm_cache_parseo'))
+PARSEO_CACHE_MAX_SIZE = int(os.environ.get('PARSEO_CACHE_MAX_SIZE_MB', 2048)) * 1024 * 1024
+# Días sin uso tras los cuales se elimina un sidecar
+PARSEO_CACHE_MAX_DIAS = int(os.environ.get('PARSEO_CACHE_MAX_DIAS', 7))
@@ -156,6 +156,7 @@ export const TIPOS_DISCREPANCIA = [
   { value: 'monto_diferente', label: 'Monto Diferente', color: 'warning', icon: 'DollarSign' },
   { value: 'falta_en_erp', label: 'Falta en ERP', color: 'danger', icon: 'FileX' },
   { value: 'falta_en_cliente', label: 'Falta en Cliente', color: 'info', icon: 'FileQuestion' },
+  { value: 'fechas_diferentes', label: 'Fechas Diferentes', color: 'warning', icon: 'CalendarX' },
   { value: 'empleado_no_encontrado', label: 'Empleado No Encontrado', color: 'danger', icon: 'UserX' },
   { value: 'item_no_mapeado', label: 'Item No Mapeado', color: 'secondary', icon: 'Link2Off' },
 ]
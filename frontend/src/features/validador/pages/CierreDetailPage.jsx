@@ -589,6 +589,7 @@ const TablaMovimientos = ({ discrepancias, isLoading }) => {
     { value: '', label: 'Todos' },
     { value: 'falta_en_erp', label: 'Falta en ERP' },
     { value: 'falta_en_cliente', label: 'Falta en Cliente' },
+    { value: 'fechas_diferentes', label: 'Fechas Diferentes' },
   ]
 
   // Filtrar discrepancias
@@ -700,10 +701,10 @@ const TablaMovimientos = ({ discrepancias, isLoading }) => {
                 </td>
                 <td className="py-3 px-4">
                   <Badge 
-                    variant={d.tipo === 'falta_en_cliente' ? 'warning' : 'danger'}
+                    variant={d.tipo === 'falta_en_erp' ? 'danger' : 'warning'}
                     className="text-xs"
                   >
-                    {d.tipo === 'falta_en_cliente' ? 'Falta en Cliente' : 'Falta en ERP'}
+                    {opcionesDonde.find(o => o.value === d.tipo)?.label || d.tipo}
                   </Badge>
                 </td>
                 <td className="py-3 px-4 text-secondary-300 text-sm">